@@ -0,0 +1,118 @@
+"""Load test for the data API: latency percentiles and throughput under concurrency.
+
+Starts scripts/data_api.py on a free port (or targets --url), then runs
+CLIENTS concurrent clients for DURATION seconds. Each client loops over
+random range queries on the main series (a random decade, century or full
+span, resolution=auto) with Accept-Encoding: br, gzip. A --revalidate share
+of the requests repeats an earlier query with its ETag, as a browser
+revalidating its cache would, and should come back 304.
+
+    python benchmarks/bench_api.py --clients 300 --duration 20
+"""
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+import aiohttp
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERIES = {"temperature": (1880, 2024), "co2": (1958, 2024), "sea_level": (1993, 2024)}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def random_query(rng):
+    series = rng.choice(list(SERIES))
+    first, last = SERIES[series]
+    span = rng.choice([1, 10, 100])
+    start = rng.randint(first, max(first, last - span))
+    return f"/api/data?series={series}&from={start}-01-01&to={start + span - 1}-12-31"
+
+async def client(session, url, deadline, revalidate, rng, results):
+    seen = {}
+    while time.perf_counter() < deadline:
+        headers = {"Accept-Encoding": "br, gzip"}
+        if seen and rng.random() < revalidate:
+            path = rng.choice(list(seen))
+            headers["If-None-Match"] = seen[path]
+        else:
+            path = random_query(rng)
+        start = time.perf_counter()
+        async with session.get(url + path, headers=headers, auto_decompress=False) as response:
+            body = await response.read()
+        results.append((time.perf_counter() - start, response.status, len(body)))
+        if response.status == 200:
+            seen[path] = response.headers["ETag"]
+
+async def run(url, clients, duration, revalidate, seed):
+    results = []
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Warm-up: one request per client so connection setup is not timed
+        await asyncio.gather(*(session.get(url + "/api/series") for _ in range(min(clients, 50))))
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(client(session, url, deadline, revalidate, random.Random(seed + i), results)
+                               for i in range(clients)))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+def wait_for(url, process, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit("data_api.py exited before serving")
+        try:
+            with socket.create_connection(url.split("//")[1].split(":"), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.5)
+    sys.exit("data_api.py did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="running server to test (default: start one)")
+    parser.add_argument("--root", default=CODE_DIR, help="project root the started server loads")
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--revalidate", type=float, default=0.3, help="share of conditional requests")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen([sys.executable, os.path.join(CODE_DIR, "scripts", "data_api.py"),
+                                   "--root", args.root, "--port", str(port), "--reload-interval", "0"],
+                                  stdout=subprocess.DEVNULL)
+        wait_for(url, server)
+    try:
+        results, elapsed = asyncio.run(run(url, args.clients, args.duration, args.revalidate, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latency = np.array([r[0] for r in results]) * 1000
+    statuses = np.array([r[1] for r in results])
+    sizes = np.array([r[2] for r in results])
+    print(f"{len(results):,} requests from {args.clients} clients in {elapsed:.1f} s: "
+          f"{len(results) / elapsed:,.0f} req/s")
+    print(f"  latency ms: p50 {np.percentile(latency, 50):.1f}  p90 {np.percentile(latency, 90):.1f}  "
+          f"p99 {np.percentile(latency, 99):.1f}  max {latency.max():.1f}")
+    for status in np.unique(statuses):
+        mask = statuses == status
+        print(f"  {status}: {mask.sum():,} responses, mean body {sizes[mask].mean() / 1024:.1f} KB, "
+              f"p50 {np.percentile(latency[mask], 50):.1f} ms")
+
+if __name__ == "__main__":
+    main()
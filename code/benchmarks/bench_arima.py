@@ -0,0 +1,80 @@
+"""ARIMA temperature forecast: daily forward-filled fit vs native-frequency fit.
+
+Backtests both paths on the cleaned temperature series: fit on everything
+before the last HOLDOUT years, forecast those years and score the annual
+means against the observed ones. Then times the full 30-year forecast the
+pipeline publishes, and updating the cached native fit with one new year of
+data (append) against refitting it.
+
+    python benchmarks/bench_arima.py --holdout 10
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from models.model_training import (arima_forecast_daily, detect_frequency, fit_arima,
+                                   forecast_periods, update_arima)
+
+CLEANED_FILE = os.path.join(CODE_DIR, "data", "cleaned", "cleaned_temperature.csv")
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def native_forecast(series, years):
+    return forecast_periods(fit_arima(series), years)
+
+def score(forecast, actual):
+    """MAE and RMSE of forecast annual means against the observed annual means"""
+    joined = forecast.set_index("Date")["Predicted"].to_frame().join(actual, how="inner")
+    errors = joined["Predicted"] - joined["Temperature"]
+    return float(np.abs(errors).mean()), float(np.sqrt((errors ** 2).mean())), len(joined)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--holdout", type=int, default=10, help="years held out for the backtest")
+    parser.add_argument("--forecast-years", type=int, default=30)
+    args = parser.parse_args()
+    # Both paths can hit statsmodels' convergence warnings on this series
+    warnings.simplefilter("ignore")
+
+    series = pd.read_csv(CLEANED_FILE, parse_dates=["Date"]).set_index("Date")["Temperature"]
+    split = pd.Timestamp(year=series.index[-1].year - args.holdout + 1, month=1, day=1)
+    train = series[series.index < split]
+    actual = series[series.index >= split].resample("YE").mean()
+
+    freq, t_detect = timed(detect_frequency, series)
+    print(f"{len(series):,} daily rows, detected native frequency {freq!r} ({t_detect:.3f} s)")
+
+    print(f"\nbacktest: fit before {split.date()}, forecast {args.holdout} years")
+    print(f"  {'path':<24}{'seconds':>9}{'MAE':>9}{'RMSE':>9}{'years':>7}")
+    for label, func in [("daily (asfreq('D'))", arima_forecast_daily), ("native", native_forecast)]:
+        forecast, elapsed = timed(func, train, args.holdout)
+        mae, rmse, years = score(forecast, actual)
+        print(f"  {label:<24}{elapsed:>9.2f}{mae:>9.3f}{rmse:>9.3f}{years:>7}")
+
+    print(f"\nfull {args.forecast_years}-year forecast")
+    daily, t_daily = timed(arima_forecast_daily, series, args.forecast_years)
+    native, t_native = timed(native_forecast, series, args.forecast_years)
+    print(f"  daily {t_daily:.2f} s, native {t_native:.2f} s, speed-up {t_daily / t_native:.1f}x")
+    print(f"  same dates: {daily['Date'].equals(native['Date'])}, "
+          f"max |daily - native|: {np.abs(daily['Predicted'] - native['Predicted']).max():.3f}")
+
+    # Cached state: one more year of observations on top of a fit to the rest
+    last_year = series[series.index >= pd.Timestamp(year=series.index[-1].year, month=1, day=1)]
+    previous = fit_arima(series[series.index < last_year.index[0]])
+    _, t_append = timed(update_arima, previous, series)
+    _, t_extend = timed(update_arima, previous, series, keep_history=False)
+    _, t_refit = timed(fit_arima, series)
+    print(f"\nupdate with {len(last_year):,} new rows: append {t_append:.3f} s, "
+          f"extend {t_extend:.3f} s, full refit {t_refit:.2f} s")
+
+if __name__ == "__main__":
+    main()
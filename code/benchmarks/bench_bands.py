@@ -0,0 +1,80 @@
+"""Quantile bands: time to build the forecast ensembles of each model.
+
+Fits ARIMA, Prophet and the autoregressive Random Forest on the global
+series (temperature, CO2, sea level) and times the MEMBERS-member ensemble
+and quantile bands of a HORIZON-year forecast for each. The Random Forest
+ensemble is also run the plain way, calling the drawn tree of each member
+one row at a time, to show what the flattened forest saves (both give the
+same paths). Every model must build its bands within BUDGET_S per series.
+
+    python benchmarks/bench_bands.py --members 1000 --horizon 30
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from models.forecasting import MODELS, load_series
+from models.model_training import quantile_bands, random_forest_ensemble
+
+BUDGET_S = 3.0
+SERIES = ("temperature", "co2", "sea_level")
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def random_forest_ensemble_loop(fitted, forecast_years, members, seed=0):
+    """random_forest_ensemble with one tree call per member and step"""
+    rng = np.random.default_rng(seed)
+    trees = [estimator.tree_ for estimator in fitted["model"].estimators_]
+    lags = len(fitted["history"])
+    dates = pd.date_range(fitted["last_date"] + pd.offsets.YearEnd(), periods=forecast_years, freq="YE")
+    histories = [list(fitted["history"]) for _ in range(members)]
+    paths = np.empty((members, forecast_years))
+    for step, date in enumerate(dates):
+        drawn = rng.integers(len(trees), size=members)
+        for member, history in enumerate(histories):
+            X = np.array([history[-lags:] + [date.year]], dtype=np.float32)
+            paths[member, step] = trees[drawn[member]].predict(X)[0, 0]
+            history.append(float(np.float32(paths[member, step])))
+    return dates, paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--horizon", type=int, default=30)
+    args = parser.parse_args()
+
+    series = load_series()
+    print(f"{'series':<12}{'model':<15}{'fit s':>8}{'bands s':>9}{'90% width':>11}")
+    failed = False
+    warnings.simplefilter("ignore")
+    for name in SERIES:
+        for model, spec in MODELS.items():
+            fitted, fit_s = timed(spec.fit, series[name])
+            (dates, ensemble), ensemble_s = timed(spec.ensemble, fitted, args.horizon, args.members, 0)
+            bands, bands_s = timed(quantile_bands, dates, ensemble, (0.05, 0.95))
+            width = (bands[bands["Quantile"] == 0.95]["Value"].to_numpy()
+                     - bands[bands["Quantile"] == 0.05]["Value"].to_numpy())[-1]
+            seconds = ensemble_s + bands_s
+            verdict = "  ok" if seconds <= BUDGET_S else "  OVER"
+            failed = failed or verdict == "  OVER"
+            print(f"{name:<12}{model:<15}{fit_s:>8.2f}{seconds:>9.3f}{width:>11.3f}{verdict}")
+
+    fitted = MODELS["random_forest"].fit(series["temperature"])
+    (_, vectorized), vectorized_s = timed(random_forest_ensemble, fitted, args.horizon, args.members)
+    (_, looped), looped_s = timed(random_forest_ensemble_loop, fitted, args.horizon, args.members)
+    print(f"\nRandom Forest ensemble, temperature: flattened {vectorized_s:.3f}s, per-tree calls {looped_s:.2f}s "
+          f"({looped_s / vectorized_s:.0f}x), same paths: {np.array_equal(vectorized, looped)}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Chart rendering: one blocking figure per chart against charts.render_charts.
+
+Builds trend and decomposition charts for REGIONS synthetic regions
+(2001-2023 annual loss) and times:
+
+    inline      a new figure per chart, tight_layout, savefig (what
+                analyze_temperature did for its one PNG)
+    rendered    render_charts: reused figures, fixed margins, WORKERS
+                processes
+    unchanged   render_charts again on the same data (nothing redrawn)
+
+    python benchmarks/bench_charts.py --regions 200 --workers 4 --formats png svg
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from charts import FORMATS, _pyplot, region_charts, render_charts
+
+def synthetic_regions(regions, seed=0):
+    rng = np.random.default_rng(seed)
+    years = np.arange(2001, 2024)
+    codes = [f"R{i:04d}" for i in range(regions)]
+    loss = np.repeat(10 ** rng.uniform(1, 5, regions), len(years)) * rng.lognormal(0, 0.4, regions * len(years))
+    regional = pd.DataFrame({"Date": pd.to_datetime(np.tile(years, regions).astype(str) + "-12-31"),
+                             "Region": pd.Categorical(np.repeat(codes, len(years))),
+                             "Year": np.tile(years, regions), "Area_Deforested": loss})
+    totals = regional.groupby("Region", observed=True)["Area_Deforested"].sum()
+    slope = rng.normal(0, 100, regions)
+    trends = pd.DataFrame({"Region": pd.Categorical(codes), "Total": totals.to_numpy(), "Slope": slope,
+                           "Intercept": totals.to_numpy() / len(years) - slope * years.mean()})
+    return regional, trends
+
+def inline(charts, output_dir, formats):
+    plt = _pyplot()
+    for chart in charts:
+        if chart.kind == "decomposition":
+            fig, axes = plt.subplots(4, 1, sharex=True, figsize=(8, 6.5))
+            for ax, part in zip(axes, chart.data.columns):
+                ax.plot(chart.data.index, chart.data[part])
+        else:
+            fig, ax = plt.subplots(figsize=(8, 3.5))
+            ax.plot(chart.data.index, chart.data["value"])
+            ax.plot(chart.data.index, chart.data["fit"])
+        fig.tight_layout()
+        for fmt in formats:
+            fig.savefig(os.path.join(output_dir, f"{chart.name}.{fmt}"))
+        plt.close(fig)
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--formats", nargs="+", default=["png"], choices=FORMATS)
+    args = parser.parse_args()
+
+    charts = region_charts(*synthetic_regions(args.regions))
+    output_dir = tempfile.mkdtemp(prefix="skypulse_charts_")
+    try:
+        inline_seconds = timed(lambda: inline(charts, output_dir, args.formats))
+        rendered = timed(lambda: render_charts({"regions": charts}, output_dir, args.formats, args.workers))
+        unchanged = timed(lambda: render_charts({"regions": charts}, output_dir, args.formats, args.workers))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    print(f"\n{len(charts)} charts x {len(args.formats)} formats, {args.workers or os.cpu_count()} workers")
+    print(f"  {'inline':<12}{inline_seconds:>8.2f} s")
+    print(f"  {'rendered':<12}{rendered:>8.2f} s  {inline_seconds / rendered:.1f}x")
+    print(f"  {'unchanged':<12}{unchanged:>8.2f} s")
+
+if __name__ == "__main__":
+    main()
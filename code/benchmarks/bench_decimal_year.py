@@ -0,0 +1,70 @@
+"""Micro-benchmark for the vectorized decimal-year conversion.
+
+Times decimal_year_to_datetime64 / datetime64_to_decimal_year on N values
+(10M by default) and the original per-row datetime code on a sample, and
+checks both agree on that sample.
+
+    python benchmarks/bench_decimal_year.py --size 10000000 --legacy-sample 200000
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from data_preparation.decimal_year import decimal_year_to_datetime64, datetime64_to_decimal_year
+
+def legacy_decimal_year_to_date(decimal_year):
+    """Per-row conversion previously used by co2_data_formatting.py"""
+    year = int(decimal_year)
+    remainder = decimal_year - year
+    start = datetime(year, 1, 1)
+    days = (start.replace(year=year + 1) - start).days * remainder
+    date = start + timedelta(days=days)
+    return date.strftime("%Y-%m-%d")
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10_000_000)
+    parser.add_argument("--legacy-sample", type=int, default=200_000,
+                        help="values pushed through the per-row code (extrapolated to --size)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    values = rng.uniform(1850.0, 2100.0, args.size)
+
+    dates, t_forward = timed(decimal_year_to_datetime64, values)
+    _, t_forward_us = timed(decimal_year_to_datetime64, values, unit="us")
+    roundtrip, t_inverse = timed(datetime64_to_decimal_year, decimal_year_to_datetime64(values, unit="us"))
+    _, t_series = timed(decimal_year_to_datetime64, pd.Series(values))
+
+    sample = values[:args.legacy_sample]
+    legacy, t_legacy = timed(pd.Series(sample).apply, legacy_decimal_year_to_date)
+    legacy_projected = t_legacy * args.size / len(sample)
+
+    mismatches = int((pd.to_datetime(legacy).to_numpy().astype("datetime64[D]") != dates[:len(sample)]).sum())
+    max_roundtrip_error = float(np.max(np.abs(roundtrip - values)))
+
+    print(f"values:                          {args.size:,}")
+    print(f"decimal -> datetime64[D]:        {t_forward:8.3f} s  ({args.size / t_forward:,.0f} values/s)")
+    print(f"decimal -> datetime64[us]:       {t_forward_us:8.3f} s")
+    print(f"datetime64[us] -> decimal:       {t_inverse:8.3f} s")
+    print(f"decimal -> datetime Series:      {t_series:8.3f} s")
+    print(f"legacy per-row (projected):      {legacy_projected:8.3f} s  "
+          f"(measured {t_legacy:.3f} s on {len(sample):,})")
+    print(f"speed-up vs legacy:              {legacy_projected / t_forward:8.1f}x")
+    print(f"mismatches vs legacy on sample:  {mismatches}")
+    print(f"max round-trip error (years):    {max_roundtrip_error:.2e}")
+
+if __name__ == "__main__":
+    main()
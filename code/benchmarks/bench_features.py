@@ -0,0 +1,88 @@
+"""Random Forest feature building: exact-Date join against merge_asof broadcast.
+
+Generates daily temperature, monthly CO2 and REGIONS x annual deforestation
+rows, then compares the original features (left join of deforestation onto
+temperature x CO2 on exact Date) with merge_features + feature_matrix: build
+time, rows, how many rows carry a deforestation value, and the time to fit
+FOLDS forests on the rows before each fold from DataFrame columns versus
+from slices of the float32 matrix.
+
+    python benchmarks/bench_features.py --regions 5000 --folds 5
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from models.model_training import feature_matrix, fit_regression_forest, merge_features
+
+def synthetic_inputs(regions, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("1880-01-01", "2024-12-31", freq="D")
+    months = pd.date_range("1958-03-01", "2024-12-01", freq="MS") + pd.Timedelta(days=14)
+    temperature = pd.DataFrame({"Date": days, "Temperature": np.repeat(
+        rng.normal(0, 0.2, len(pd.date_range(days[0], days[-1], freq="MS"))), days.days_in_month[days.day == 1])})
+    co2 = pd.DataFrame({"Date": months, "CO2": 315 + 0.12 * np.arange(len(months)) + rng.normal(0, 0.5, len(months))})
+    years = np.arange(2001, 2024)
+    deforestation = pd.DataFrame({
+        "Region": np.repeat([f"R{i:05d}" for i in range(regions)], len(years)),
+        "Date": pd.to_datetime(np.tile(years, regions).astype(str) + "-12-31"),
+        "Area_Deforested": rng.lognormal(8, 2, regions * len(years))})
+    return temperature, co2, deforestation
+
+def original_features(temperature, co2, deforestation):
+    merged = temperature.merge(co2, on="Date", how="inner").merge(deforestation, on="Date", how="left")
+    merged["Area_Deforested"] = merged["Area_Deforested"].fillna(0)
+    merged["Year"] = merged["Date"].dt.year
+    merged["Month"] = merged["Date"].dt.month
+    return merged
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def fold_bounds(dates, folds):
+    origins = np.array([f"{year}-01-01" for year in range(2000, 2000 + 5 * folds, 5)], dtype="datetime64[ns]")
+    return np.searchsorted(dates, origins)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, default=5_000)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--estimators", type=int, default=100)
+    args = parser.parse_args()
+
+    temperature, co2, deforestation = synthetic_inputs(args.regions)
+    print(f"{len(temperature):,} temperature, {len(co2):,} CO2 and {len(deforestation):,} deforestation rows\n")
+
+    old, old_seconds = timed(lambda: original_features(temperature, co2, deforestation))
+    new, new_seconds = timed(lambda: merge_features(temperature, co2, deforestation))
+    matrix, matrix_seconds = timed(lambda: feature_matrix(new))
+    print(f"  {'features':<26}{'seconds':>8}{'rows':>9}{'with deforestation':>20}")
+    print(f"  {'exact-Date left join':<26}{old_seconds:>8.3f}{len(old):>9,}{(old['Area_Deforested'] > 0).sum():>20,}")
+    print(f"  {'merge_asof + matrix':<26}{new_seconds + matrix_seconds:>8.3f}{len(new):>9,}"
+          f"{(new['Area_Deforested'] > 0).sum():>20,}")
+
+    # Fit one forest per fold on the same features: selected from the frame
+    # (converted to float32 by every fit) versus slices of the matrix
+    def frame_folds():
+        for stop in fold_bounds(matrix.dates, args.folds):
+            train = new.iloc[:stop]
+            RandomForestRegressor(n_estimators=args.estimators, random_state=42).fit(
+                train[matrix.features], train["Temperature"])
+    def matrix_folds():
+        for stop in fold_bounds(matrix.dates, args.folds):
+            fit_regression_forest(matrix.X[:stop], matrix.y[:stop], n_estimators=args.estimators)
+    _, frame_seconds = timed(frame_folds)
+    _, slice_seconds = timed(matrix_folds)
+    print(f"\n{args.folds} fold fits: from DataFrame rows {frame_seconds:.2f} s, "
+          f"from float32 matrix slices {slice_seconds:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Compare the streaming formatters against the original load-everything scripts.
+
+Each raw sample in data/raw is replicated SCALE times into a temporary
+directory, then every formatter is run in a fresh process so its peak RSS
+can be measured on its own.
+
+    python benchmarks/bench_formatters.py --scale 200
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from data_preparation.streaming import run_formatter
+
+RAW_DIR = os.path.join(CODE_DIR, "data", "raw")
+
+def _replicate(src, dst, scale, header_lines=1):
+    """Write header once and the body of src `scale` times"""
+    with open(src, encoding="utf-8") as f:
+        lines = f.read().splitlines(keepends=True)
+    header, body = lines[:header_lines], lines[header_lines:]
+    if body and not body[-1].endswith("\n"):
+        body[-1] += "\n"
+    with open(dst, "w", encoding="utf-8") as out:
+        out.writelines(header)
+        for _ in range(scale):
+            out.writelines(body)
+
+def _make_sea_level(dst, rows):
+    """sea_level_data.csv is not shipped, so synthesize the "D"-prefixed layout"""
+    dates = pd.date_range("1992-12-17", periods=rows, freq="D")
+    df = pd.DataFrame({"Date": "D" + dates.strftime("%m/%d/%Y"), "Value": 0.5})
+    df.to_csv(dst, index=False)
+
+# Original implementations (the scripts run at import time, so they are
+# reproduced here verbatim apart from the file paths)
+def _legacy_co2(input_file, output_file):
+    from datetime import datetime, timedelta
+
+    def decimal_year_to_date(decimal_year):
+        year = int(decimal_year)
+        remainder = decimal_year - year
+        start = datetime(year, 1, 1)
+        days = (start.replace(year=year + 1) - start).days * remainder
+        return (start + timedelta(days=days)).strftime("%Y-%m-%d")
+
+    df = pd.read_csv(input_file)
+    df["Date"] = df["decimal date"].apply(decimal_year_to_date)
+    df[["Date", "average"]].rename(columns={"average": "CO2"}).to_csv(output_file, index=False)
+    return len(df)
+
+def _legacy_sea_level(input_file, output_file):
+    df = pd.read_csv(input_file)
+    df["Date"] = df["Date"].str.replace("D", "", regex=False)
+    df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y").dt.strftime("%Y-%m-%d")
+    df[["Date", "Value"]].rename(columns={"Value": "Sea Level"}).to_csv(output_file, index=False)
+    return len(df)
+
+def _legacy_deforestation(input_file, output_file):
+    data = []
+    with open(input_file, mode="r", newline="") as csvfile:
+        for row in csv.DictReader(csvfile):
+            data.append({
+                "Year": int(row["umd_tree_cover_loss__year"]),
+                "Region": row["iso"],
+                "Area_Deforested": float(row["umd_tree_cover_loss__ha"]),
+            })
+    with open(output_file, mode="w") as jsonfile:
+        json.dump(data, jsonfile, indent=4)
+    return len(data)
+
+def _legacy_temperature(input_file, output_file):
+    df = pd.read_csv(input_file, skiprows=1)
+    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    melted = df.melt(id_vars=["Year"], value_vars=months, var_name="Month", value_name="Temperature")
+    melted["Month"] = melted["Month"].map({m: i + 1 for i, m in enumerate(months)})
+    melted = melted.dropna(subset=["Year", "Month"])
+
+    def generate_dates(row):
+        start_date = pd.Timestamp(year=int(row["Year"]), month=int(row["Month"]), day=1)
+        end_date = start_date + pd.offsets.MonthEnd(1)
+        return pd.date_range(start=start_date, end=end_date, freq="D").strftime("%Y-%m-%d").tolist()
+
+    melted["Date"] = melted.apply(generate_dates, axis=1)
+    exploded = melted.explode("Date")
+    exploded[["Date", "Temperature"]].sort_values("Date").reset_index(drop=True).to_csv(output_file, index=False)
+    return len(df)
+
+LEGACY = {
+    "co2": _legacy_co2,
+    "deforestation": _legacy_deforestation,
+    "sea_level": _legacy_sea_level,
+    "temperature": _legacy_temperature,
+}
+
+def _measure(queue, mode, name, input_file, output_file, chunksize):
+    start = time.perf_counter()
+    if mode == "legacy":
+        rows = LEGACY[name](input_file, output_file)
+    else:
+        rows = run_formatter(name, input_file, output_file, chunksize=chunksize)["rows_in"]
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put({"rows": rows, "seconds": elapsed, "peak_rss_mb": peak_mb})
+
+def run_isolated(mode, name, input_file, output_file, chunksize):
+    queue = mp.Queue()
+    proc = mp.Process(target=_measure, args=(queue, mode, name, input_file, output_file, chunksize))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100, help="times each raw sample is replicated")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="rows per chunk (default: each formatter's own setting)")
+    parser.add_argument("--skip-legacy", action="store_true", help="only run the streaming formatters")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = {
+            "co2": os.path.join(tmp, "co2_emissions.csv"),
+            "deforestation": os.path.join(tmp, "deforestation.csv"),
+            "sea_level": os.path.join(tmp, "sea_level_data.csv"),
+            "temperature": os.path.join(tmp, "temperature.csv"),
+        }
+        _replicate(os.path.join(RAW_DIR, "co2_emissions.csv"), inputs["co2"], args.scale)
+        _replicate(os.path.join(RAW_DIR, "deforestation.csv"), inputs["deforestation"], args.scale)
+        _replicate(os.path.join(RAW_DIR, "temperature.csv"), inputs["temperature"], args.scale, header_lines=2)
+        _make_sea_level(inputs["sea_level"], 400 * args.scale)
+
+        print(f"{'formatter':<14}{'mode':<11}{'rows':>12}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}")
+        modes = ["streaming"] if args.skip_legacy else ["legacy", "streaming"]
+        for name, input_file in inputs.items():
+            for mode in modes:
+                output_file = os.path.join(tmp, f"{name}_{mode}.out")
+                r = run_isolated(mode, name, input_file, output_file, args.chunksize)
+                print(f"{name:<14}{mode:<11}{r['rows']:>12}{r['seconds']:>10.2f}"
+                      f"{r['rows'] / r['seconds']:>12.0f}{r['peak_rss_mb']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Gridded temperature mode on a synthetic 2x2 degree monthly grid since 1880.
+
+Writes a raw float32 grid (trend + seasonal cycle + noise per cell, polar
+rows missing before 1950, scattered single missing months) through
+gridded.create_raw_grid, then:
+
+    check   a small grid processed tile by tile against pandas/scipy on each
+            cell: time interpolation, decadal groupby means, linregress of
+            the annual means, and the cos-latitude weighted global mean
+    scale   the full grid (~25M cell-months) on the process pool (wall
+            time), then once more in a fresh interpreter with workers=1:
+            its peak RSS may grow by at most MEMORY_FACTOR tiles over what
+            importing gridded and reducing one latitude row took (its lazy
+            imports), far below the grid's own size (read from /proc, so
+            Linux only)
+
+    python benchmarks/bench_gridded.py --step 2 --tile-mb 32
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+import gridded
+
+MEMORY_FACTOR = 4
+START, END = "1880-01", "2024-12"
+
+def synthetic_grid(path, step, seed=0):
+    """Write the synthetic grid in chunks of decades; returns its Grid"""
+    rng = np.random.default_rng(seed)
+    lat = np.arange(-90 + step / 2, 90, step)
+    lon = np.arange(-180 + step / 2, 180, step)
+    months = np.arange(np.datetime64(START), np.datetime64(END) + 1)
+    values = gridded.create_raw_grid(path, len(months), START, lat, lon)
+    # Warming faster towards the poles, seasonal cycle stronger towards them too
+    warming = (0.005 + 0.01 * np.abs(lat) / 90)[:, None] * np.ones(len(lon))
+    amplitude = (0.2 + np.abs(lat) / 90)[:, None]
+    polar = np.abs(lat) > 60
+    for start in range(0, len(months), 120):
+        chunk = months[start:start + 120]
+        years = (chunk.astype("datetime64[Y]").astype(np.int64) + 1970 - 1950)[:, None, None]
+        phase = (chunk.astype(np.int64) % 12)[:, None, None] * (2 * np.pi / 12)
+        block = warming * years + amplitude * np.sin(phase) * 0.1 + rng.normal(0, 0.3, (len(chunk), len(lat), len(lon)))
+        block[(years[:, :, 0] < 0) & polar[None, :]] = np.nan
+        block[rng.random(block.shape) < 0.01] = np.nan
+        values[start:start + len(chunk)] = block
+    values.flush()
+    del values
+    return gridded.open_grid(path)
+
+def pandas_reference(grid):
+    """Per-cell pandas/scipy results of the whole (small) grid"""
+    from scipy import stats
+    values = gridded.read_tile(grid, slice(None))
+    months, n_lat, n_lon = values.shape
+    values[(values < gridded.VALID_RANGE[0]) | (values > gridded.VALID_RANGE[1])] = np.nan
+    index = pd.DatetimeIndex(grid.months.astype("datetime64[ns]"))
+    frame = pd.DataFrame(values.reshape(months, -1).astype(np.float64), index=index)
+    # The synthetic gaps are single months, so every interior gap is interpolated
+    frame = frame.interpolate(method="time", limit_area="inside")
+    decadal = frame.groupby((index.year // 10) * 10).mean().to_numpy()
+    annual = frame.resample("YE").mean()
+    slopes = np.full(frame.shape[1], np.nan)
+    for col in annual.columns:
+        series = annual[col].dropna()
+        if len(series) >= 2:
+            slopes[col] = stats.linregress(series.index.year, series.to_numpy()).slope
+    weights = np.repeat(gridded.cell_weights(grid.lat), n_lon)
+    valid = frame.notna().to_numpy()
+    weighted = np.where(valid, frame.to_numpy(), 0) @ weights / (valid @ weights)
+    return decadal, slopes, weighted
+
+def check(tmp, tile_mb):
+    grid = synthetic_grid(os.path.join(tmp, "small.f32"), step=15)
+    output_dir = os.path.join(tmp, "small")
+    # Tiles of one latitude row, so the check covers the tile assembly too
+    monthly = gridded.process_grid(grid, output_dir, workers=1, tile_mb=tile_mb / 1e6)
+    decadal, slopes, weighted = pandas_reference(grid)
+    got_decadal = np.load(os.path.join(output_dir, "decadal_temperature.npy"))
+    got_trends = np.load(os.path.join(output_dir, "temperature_trends.npy"))
+    errors = {
+        "decadal": np.nanmax(np.abs(got_decadal.reshape(len(decadal), -1) - decadal)),
+        "slope": np.nanmax(np.abs(got_trends[0].ravel() - slopes)),
+        "global": np.nanmax(np.abs(monthly["Temperature"].to_numpy() - weighted)),
+    }
+    same_nan = np.array_equal(np.isnan(got_decadal.reshape(len(decadal), -1)), np.isnan(decadal))
+    return errors, same_nan
+
+# Run in a fresh interpreter: VmHWM is the process's peak RSS since exec
+PEAK_SCRIPT = """
+import sys
+sys.path.append({scripts!r})
+import gridded
+
+def peak_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM')) / 1024
+
+grid = gridded.open_grid({path!r})
+gridded.process_tile(grid, slice(0, 1))
+before = peak_mb()
+gridded.process_grid(grid, {output_dir!r}, workers=1, tile_mb={tile_mb!r})
+print(before, peak_mb())
+"""
+
+def peak_rss_mb(path, output_dir, tile_mb):
+    """Peak RSS (MB) of a fresh interpreter before and after processing the grid in-process"""
+    code = PEAK_SCRIPT.format(scripts=os.path.join(CODE_DIR, "scripts"), path=path, output_dir=output_dir,
+                              tile_mb=tile_mb)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    before, after = map(float, result.stdout.split())
+    return before, after
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--step", type=float, default=2, help="cell size in degrees")
+    parser.add_argument("--tile-mb", type=float, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="skypulse_gridded_")
+    try:
+        errors, same_nan = check(tmp, args.tile_mb)
+        print("Check against pandas/scipy per cell (max abs difference): "
+              + ", ".join(f"{name} {error:.2e}" for name, error in errors.items())
+              + f", same missing decades: {same_nan}")
+
+        start = time.perf_counter()
+        grid = synthetic_grid(os.path.join(tmp, "grid.f32"), args.step)
+        written = time.perf_counter() - start
+        size_mb = os.path.getsize(grid.path) / (1 << 20)
+        start = time.perf_counter()
+        monthly = gridded.process_grid(grid, os.path.join(tmp, "gridded"), args.workers, args.tile_mb)
+        seconds = time.perf_counter() - start
+        baseline, peak = peak_rss_mb(grid.path, os.path.join(tmp, "gridded"), args.tile_mb)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    cells = grid.shape[0] * grid.shape[1] * grid.shape[2]
+    print(f"Grid {grid.shape[0]} months x {grid.shape[1]} x {grid.shape[2]} cells = {cells / 1e6:.1f}M values, "
+          f"{size_mb:.0f} MB (written in {written:.1f}s)")
+    print(f"Processed in {seconds:.1f}s ({cells / seconds / 1e6:.1f}M values/s), "
+          f"{gridded.tile_rows(grid, args.tile_mb)} latitude rows per tile")
+    print(f"Peak RSS in-process {peak:.0f} MB: {peak - baseline:.0f} MB over the warm-up "
+          f"(limit {MEMORY_FACTOR * args.tile_mb:.0f} MB, grid {size_mb:.0f} MB)")
+    annual = monthly.set_index("Date")["Temperature"].resample("YE").mean()
+    print(f"Global annual mean {annual.index.year[0]}: {annual.iloc[0]:.2f}, "
+          f"{annual.index.year[-1]}: {annual.iloc[-1]:.2f}")
+    ok = max(errors.values()) < 1e-4 and same_nan and peak - baseline <= MEMORY_FACTOR * args.tile_mb
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
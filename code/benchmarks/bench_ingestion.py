@@ -0,0 +1,144 @@
+"""Ingestion against a local stand-in for the upstream servers.
+
+Serves a copy of data/raw over HTTP (aiohttp static files: ETag,
+Last-Modified, conditional and Range requests, plus LATENCY_MS of delay
+per response) and fetches it into an empty mirror through ingestion.py:
+
+    cold        every source downloaded
+    warm        nothing changed: every source answered 304, nothing read
+    touched     the server rewrote temperature.csv with the same bytes: it is
+                downloaded (new ETag) but the mirrored file is left untouched
+    changed     the server appended to co2_emissions.csv: only it is updated
+    resumed     a temperature download broke off halfway: the rest is fetched
+                with a Range request and appended
+    sequential  the cold fetch one source at a time, to compare with the
+                concurrent one
+
+Each scenario checks its statuses and that the mirror matches the server.
+
+    python benchmarks/bench_ingestion.py --latency-ms 200
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+import ingestion
+
+RAW_DIR = os.path.join(CODE_DIR, "data", "raw")
+
+def start_server(directory, latency_ms):
+    """Serve `directory` under /raw/ from a background thread; returns the base URL"""
+    from aiohttp import web
+
+    @web.middleware
+    async def delay(request, handler):
+        await asyncio.sleep(latency_ms / 1000)
+        return await handler(request)
+
+    app = web.Application(middlewares=[delay])
+    app.router.add_static("/raw/", directory)
+    runner = web.AppRunner(app)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    port = site._server.sockets[0].getsockname()[1]
+    return f"http://127.0.0.1:{port}/raw/"
+
+def timed_fetch(mirror, urls, names=None):
+    start = time.perf_counter()
+    report = ingestion.fetch(mirror, names, urls)
+    return report, time.perf_counter() - start
+
+def same_files(served, mirror, names):
+    return all(ingestion.sha256_file(os.path.join(served, ingestion.SOURCES[name].file_name)).hexdigest()
+               == ingestion.sha256_file(os.path.join(mirror, ingestion.SOURCES[name].file_name)).hexdigest()
+               for name in names)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="skypulse_ingestion_")
+    served, mirror = os.path.join(tmp, "served"), os.path.join(tmp, "mirror")
+    shutil.copytree(RAW_DIR, served)
+    names = [name for name, source in ingestion.SOURCES.items()
+             if os.path.exists(os.path.join(served, source.file_name))]
+    base = start_server(served, args.latency_ms)
+    urls = {name: base + ingestion.SOURCES[name].file_name for name in names}
+    urls.update({name: None for name in ingestion.SOURCES if name not in names})
+    temperature = os.path.join(served, ingestion.SOURCES["temperature"].file_name)
+    mirrored_temperature = os.path.join(mirror, ingestion.SOURCES["temperature"].file_name)
+
+    results = []
+    try:
+        def scenario(label, expected, prepare=None, names_arg=None, target=mirror):
+            if prepare:
+                prepare()
+            report, seconds = timed_fetch(target, urls, names_arg)
+            statuses = {row["Source"]: row["Status"] for row in report if row["URL"]}
+            ok = all(statuses[name] == expected.get(name, "unchanged") for name in statuses)
+            ok = ok and same_files(served, target, statuses)
+            results.append((label, seconds, sum(row["Bytes"] for row in report), statuses, ok))
+            return report
+
+        scenario("cold", {name: "updated" for name in names})
+        scenario("warm", {})
+
+        def touch():
+            with open(temperature, "rb") as f:
+                content = f.read()
+            time.sleep(1)  # Last-Modified has one-second resolution
+            with open(temperature, "wb") as f:
+                f.write(content)
+        mtime = os.stat(mirrored_temperature).st_mtime_ns
+        scenario("touched", {"temperature": "unchanged"}, touch)
+        results[-1] = results[-1][:4] + (results[-1][4] and os.stat(mirrored_temperature).st_mtime_ns == mtime,)
+
+        def append():
+            with open(os.path.join(served, ingestion.SOURCES["co2"].file_name), "a") as f:
+                f.write("2025,1,2025.0411,426.65,425.55,-1,-9.99,-0.99\n")
+        scenario("changed", {"co2": "updated"}, append)
+
+        def interrupt():
+            # What an aborted transfer leaves behind: half the file and the response validators
+            with open(temperature, "rb") as f:
+                content = f.read()
+            with open(mirrored_temperature + ".part", "wb") as f:
+                f.write(content[:len(content) // 2])
+            os.remove(mirrored_temperature)
+            manifest = ingestion.load_mirror(mirror)
+            record = manifest["temperature"]
+            record["partial"] = {"url": urls["temperature"], "etag": record["etag"],
+                                 "last_modified": record["last_modified"]}
+            ingestion.save_mirror(mirror, manifest)
+        scenario("resumed", {"temperature": "updated"}, interrupt, ["temperature"])
+
+        sequential = os.path.join(tmp, "sequential")
+        start = time.perf_counter()
+        for name in names:
+            ingestion.fetch(sequential, [name], urls)
+        results.append(("sequential", time.perf_counter() - start, None, {}, same_files(served, sequential, names)))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"Stand-in server with {args.latency_ms:.0f} ms latency, sources: {', '.join(names)}")
+    print(f"  {'scenario':<12}{'seconds':>9}{'bytes':>10}  statuses")
+    for label, seconds, received, statuses, ok in results:
+        received = "-" if received is None else f"{received:,}"
+        detail = ", ".join(f"{name} {status}" for name, status in statuses.items())
+        print(f"  {label:<12}{seconds:>9.3f}{received:>10}  {detail}{'' if ok else '  FAILED'}")
+    if not all(ok for *_, ok in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
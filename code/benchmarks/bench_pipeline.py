@@ -0,0 +1,145 @@
+"""Time every pipeline stage on synthetic feeds at several scales, recorded as JSON.
+
+For each SCALE a fresh project root is generated with synthetic.py (raw
+feeds SCALE times the sample data) and the whole refresh of
+scripts/pipeline.py is run on it: formatting, cleaning, trend analysis,
+forecasts and the Random Forest, and the dashboard export. The per-stage
+report (wall and CPU seconds, allocation peak, worker RSS, rows) of every
+scale, plus the commit and library versions, is written to --output. With
+--compare, stage times are checked against an earlier results file and
+any stage slower by more than --tolerance is reported as a regression
+(exit status 1).
+
+Forecasts fit every deforestation region, which grows with the scale:
+--forecast-models trims the model grid and --skip drops stages entirely.
+
+    python benchmarks/bench_pipeline.py --scales 10 100 --forecast-models arima
+    python benchmarks/bench_pipeline.py --scales 10 --compare benchmarks/results/pipeline_1a2b3c4.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import sklearn
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import pipeline
+from synthetic import make_root
+
+RESULTS_DIR = os.path.join(CODE_DIR, "benchmarks", "results")
+
+# Stage times below this are noise, not regressions
+MIN_SECONDS = 0.05
+
+def _skipped(*args, **kwargs):
+    return None
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CODE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "pandas": pd.__version__, "numpy": np.__version__, "sklearn": sklearn.__version__}
+
+def run_scale(scale, workers=None, forecast_models=None, skip=(), trace_memory=True, keep=None, seed=0):
+    """Generate a root at `scale`, run the pipeline on it; returns the run record"""
+    root = keep or tempfile.mkdtemp(prefix=f"skypulse_x{scale}_")
+    try:
+        start = time.perf_counter()
+        rows = make_root(root, scale, seed)
+        generate_seconds = time.perf_counter() - start
+
+        stages = pipeline.build_stages(pipeline.project_paths(root))
+        if forecast_models:
+            forecasts = stages["forecasts"]
+            stages["forecasts"] = forecasts._replace(params=dict(forecasts.params, models=forecast_models))
+        for name in skip:
+            stages[name] = stages[name]._replace(func=_skipped)
+        _, report = pipeline.run_pipeline(stages, workers=workers, trace_memory=trace_memory)
+        for name in skip:
+            report[name]["status"] = "skipped by benchmark"
+        return {"scale": scale, "input_rows": rows, "generate_s": generate_seconds, "stages": report}
+    finally:
+        if keep is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+def compare(results, previous, tolerance):
+    """Print stage time ratios against `previous`; returns the regressed (scale, stage) pairs"""
+    earlier = {run["scale"]: run["stages"] for run in previous["runs"]}
+    regressions = []
+    print(f"\nAgainst {previous['commit']} ({previous['created']}):")
+    print(f"  {'scale':>6}  {'stage':<28}{'before s':>10}{'now s':>10}{'ratio':>8}")
+    for run in results["runs"]:
+        before_stages = earlier.get(run["scale"])
+        if before_stages is None:
+            print(f"  {run['scale']:>6}  (not in the earlier results)")
+            continue
+        for name, now in run["stages"].items():
+            before = before_stages.get(name, {})
+            if "wall_s" not in now or "wall_s" not in before or now["status"] != before["status"]:
+                continue
+            ratio = now["wall_s"] / before["wall_s"] if before["wall_s"] else float("inf")
+            regressed = ratio > tolerance and now["wall_s"] - before["wall_s"] > MIN_SECONDS
+            if regressed:
+                regressions.append((run["scale"], name))
+            print(f"  {run['scale']:>6}  {name:<28}{before['wall_s']:>10.2f}{now['wall_s']:>10.2f}"
+                  f"{ratio:>7.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--workers", type=int, default=None, help="pipeline process pool size")
+    parser.add_argument("--forecast-models", nargs="+", help="models the forecasts stage fits (default: all)")
+    parser.add_argument("--skip", nargs="+", default=[], help="stages replaced by a no-op")
+    parser.add_argument("--no-memory-trace", action="store_true")
+    parser.add_argument("--keep", help="generate and keep the roots under this directory")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/pipeline_<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    unknown = set(args.skip) - set(pipeline.build_stages(pipeline.project_paths(CODE_DIR)))
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    results = {"commit": commit(), "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+               "environment": environment(), "forecast_models": args.forecast_models, "skip": args.skip,
+               "runs": []}
+    for scale in args.scales:
+        keep = os.path.join(args.keep, f"x{scale}") if args.keep else None
+        print(f"=== scale x{scale}")
+        run = run_scale(scale, args.workers, args.forecast_models, args.skip, not args.no_memory_trace, keep)
+        results["runs"].append(run)
+        print("\ninput rows: " + ", ".join(f"{name} {rows:,}" for name, rows in run["input_rows"].items()))
+        pipeline.print_report(run["stages"])
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline_{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than {args.tolerance:.2f}x")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Per-region deforestation engine against a groupby.apply loop on GADM-scale data.
+
+Generates REGIONS synthetic sub-national regions ('BRA.12.3_1' style ids
+under a few hundred countries) with YEARS annual loss values each, where the
+size of a region's loss varies by orders of magnitude, as it does between
+GADM units. Times the per-region IQR filter, trends and annual aggregates
+of analysis/regional.py (serial and with --workers) against the same
+statistics written as groupby(...).apply loops, and checks both agree.
+
+    python benchmarks/bench_regions.py --regions 300000 --years 23 --workers 2
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from analysis.regional import region_iqr_mask, region_trends, regional_annual
+
+def synthetic_regions(regions, years, seed=0):
+    rng = np.random.default_rng(seed)
+    countries = np.array([a + b + c for a, b, c in rng.choice(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"), (300, 3))])
+    ids = pd.unique(np.char.add(np.char.add(rng.choice(countries, regions), "."),
+                                np.char.add(np.char.add(rng.integers(1, 40, regions).astype(str), "."),
+                                            np.char.add(rng.integers(1, 60, regions).astype(str), "_1"))))
+    scale = 10 ** rng.uniform(0, 5, len(ids))
+    trend = rng.normal(0, 0.03, len(ids))
+    year = np.tile(np.arange(2001, 2001 + years), len(ids))
+    region = np.repeat(np.arange(len(ids)), years)
+    loss = scale[region] * np.exp(trend[region] * (year - 2001)) * rng.lognormal(0, 0.3, len(year))
+    # A few spikes per thousand values, so the IQR filter has something to find
+    spikes = rng.random(len(loss)) < 0.003
+    loss[spikes] *= 20
+    return pd.DataFrame({"Region": pd.Categorical.from_codes(region, categories=ids),
+                         "Year": year, "Area_Deforested": loss})
+
+def loop_iqr(df):
+    def outside(values):
+        q1, q3 = values.quantile(0.25), values.quantile(0.75)
+        iqr = q3 - q1
+        flagged = (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+        return flagged & (len(values) >= 4)
+    return df.groupby("Region", observed=True, group_keys=False)["Area_Deforested"].apply(outside) \
+             .reindex(df.index).to_numpy()
+
+def loop_trends(df):
+    def trend(group):
+        slope, intercept = np.polyfit(group["Year"], group["Area_Deforested"], 1)
+        return pd.Series({"Total": group["Area_Deforested"].sum(), "Slope": slope})
+    return df.groupby("Region", observed=True).apply(trend, include_groups=False)
+
+def loop_annual(df):
+    def annual(group):
+        group = group.sort_values("Year")
+        return pd.DataFrame({"Year": group["Year"], "Cumulative": group["Area_Deforested"].cumsum(),
+                             "Change": group["Area_Deforested"].diff()})
+    return df.groupby("Region", observed=True).apply(annual, include_groups=False)
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, default=300_000)
+    parser.add_argument("--years", type=int, default=23)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--loop-regions", type=int, default=5_000,
+                        help="regions the groupby.apply loop runs on (its time is scaled up)")
+    args = parser.parse_args()
+
+    df = synthetic_regions(args.regions, args.years)
+    regions = len(df["Region"].cat.categories)
+    sample = df[df["Region"].cat.codes < args.loop_regions].copy()
+    sample["Region"] = sample["Region"].cat.remove_unused_categories()
+    scale = regions / sample["Region"].nunique()
+    print(f"{len(df):,} rows, {regions:,} regions; loop timed on {sample['Region'].nunique():,} regions "
+          f"and scaled x{scale:.0f}\n")
+    print(f"  {'statistic':<12}{'loop s':>10}{'engine s':>10}{f'{args.workers} workers s':>14}{'speedup':>9}  agree")
+
+    runs = [
+        ("iqr", loop_iqr, lambda d, w: region_iqr_mask(d),
+         lambda a, b: bool((a == b).all())),
+        ("trends", loop_trends, lambda d, w: region_trends(d),
+         lambda a, b: np.allclose(a["Slope"].to_numpy(), b["Slope"].to_numpy(), rtol=1e-6, atol=1e-6)
+                      and np.allclose(a["Total"].to_numpy(), b["Total"].to_numpy())),
+        ("annual", loop_annual, lambda d, w: regional_annual(d, workers=w),
+         lambda a, b: np.allclose(a["Cumulative"].to_numpy(), b["Cumulative"].to_numpy())),
+    ]
+    for label, loop, engine, agree in runs:
+        expected, loop_seconds = timed(lambda: loop(sample))
+        same = agree(expected, engine(sample, None))
+        _, seconds = timed(lambda: engine(df, None))
+        if label == "annual":
+            _, parallel = timed(lambda: engine(df, args.workers))
+            parallel = f"{parallel:.2f}"
+        else:
+            parallel = "-"
+        loop_seconds *= scale
+        print(f"  {label:<12}{loop_seconds:>10.1f}{seconds:>10.2f}{parallel:>14}{loop_seconds / seconds:>8.0f}x  {same}")
+
+    flagged = region_iqr_mask(df)
+    print(f"\nper-region IQR flags {flagged.sum():,} rows ({flagged.mean():.2%}); a single global IQR "
+          f"would flag {global_iqr(df).sum():,}")
+
+def global_iqr(df):
+    values = df["Area_Deforested"]
+    q1, q3 = values.quantile(0.25), values.quantile(0.75)
+    return (values < q1 - 1.5 * (q3 - q1)) | (values > q3 + 1.5 * (q3 - q1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Memory and speed of the compact TimeSeries against the cleaned DataFrames.
+
+For each cleaned series (timeseries.SERIES) loads the (Date, value) frame
+from data/cleaned, encodes it and reports:
+
+    frame bytes / series bytes   deep memory of the DataFrame and the TimeSeries
+    encode                       TimeSeries.from_frame
+    decode                       to_frame (exact values, float64)
+    save / load                  Arrow IPC file, load memory-mapped
+    parquet                      load_dataset of the same columns, for comparison
+
+and checks that to_frame() gives back the frame exactly. The temperature
+series must be at least MIN_TEMPERATURE_RATIO times smaller than its frame.
+
+    python benchmarks/bench_series.py --repeat 20
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+
+from config import project_path
+from storage import load_dataset
+from timeseries import SERIES, TimeSeries
+
+MIN_TEMPERATURE_RATIO = 10
+
+def median_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cleaned-dir", default=project_path("cleaned"))
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'series':<12}{'layout':>7}{'frame bytes':>13}{'series bytes':>14}{'ratio':>7}"
+          f"{'encode ms':>11}{'decode ms':>11}{'save ms':>9}{'load ms':>9}{'parquet ms':>12}  exact")
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="skypulse_series_") as tmp:
+        for name, (dataset, column, decimals) in SERIES.items():
+            df = load_dataset(args.cleaned_dir, dataset, columns=["Date", column])
+            df = df.astype({"Date": "datetime64[ns]"})
+            series = TimeSeries.from_frame(df, column, decimals=decimals)
+            path = os.path.join(tmp, f"{dataset}.arrow")
+
+            encode = median_ms(lambda: TimeSeries.from_frame(df, column, decimals=decimals), args.repeat)
+            decode = median_ms(series.to_frame, args.repeat)
+            save = median_ms(lambda: series.save(path), args.repeat)
+            load = median_ms(lambda: TimeSeries.load(path), args.repeat)
+            parquet = median_ms(lambda: load_dataset(args.cleaned_dir, dataset, columns=["Date", column]),
+                                args.repeat)
+            exact = TimeSeries.load(path).to_frame().equals(df)
+
+            frame_bytes = df.memory_usage(deep=True).sum()
+            ratio = frame_bytes / series.nbytes
+            print(f"{name:<12}{series.layout:>7}{frame_bytes:>13,}{series.nbytes:>14,}{ratio:>6.1f}x"
+                  f"{encode:>11.2f}{decode:>11.2f}{save:>9.2f}{load:>9.2f}{parquet:>12.2f}  {exact}")
+            failed = failed or not exact or (name == "temperature" and ratio < MIN_TEMPERATURE_RATIO)
+    if failed:
+        print(f"FAILED: a round trip differs or temperature is under {MIN_TEMPERATURE_RATIO}x smaller")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
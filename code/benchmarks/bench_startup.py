@@ -0,0 +1,93 @@
+"""Import overhead of each skypulse command against its startup budget.
+
+Refreshes a copy of the project data once with `skypulse run`, so every
+step has its inputs, then runs each command REPEAT times in a fresh
+interpreter under python -X importtime (--workers 1, so the stages' own
+imports are counted too) and reports the median time spent importing:
+
+    pandas      pandas, numpy and pyarrow alone, which every step needs
+    eager       pandas plus the model and plotting libraries every script
+                used to import up front (Prophet, statsmodels,
+                scikit-learn, scipy.stats, matplotlib)
+    <command>   everything the command imported, lazily loaded ones included
+
+Budgets are on the time beyond pandas: importing pandas alone is already
+about 300 ms on a slow machine, so the total can't be under it. A command
+passes when its median import time over pandas is within BUDGET_MS.
+
+    python benchmarks/bench_startup.py --commands format clean export --repeat 5
+"""
+import os
+import sys
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKYPULSE = os.path.join(CODE_DIR, "scripts", "skypulse.py")
+
+# Import budget per command in ms over pandas. analyze draws charts
+# (matplotlib) and train fits models, so they are allowed what those
+# libraries cost.
+BUDGET_MS = {"format": 300, "clean": 300, "export": 300, "analyze": 800, "train": 3000}
+
+EAGER_IMPORTS = ("pandas, prophet, statsmodels.tsa.arima.model, statsmodels.tsa.seasonal, sklearn.ensemble, "
+                 "sklearn.metrics, scipy.stats, matplotlib.pyplot")
+
+def import_ms(command):
+    """Total import time in ms of a fresh interpreter running `command` (from -X importtime)"""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + command, capture_output=True, text=True,
+                            env=dict(os.environ, MPLBACKEND="Agg"))
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{result.stderr[-2000:]}")
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports only: nested ones are inside their parent's cumulative time
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1000
+
+def median_ms(command, repeat):
+    return statistics.median(import_ms(command) for _ in range(repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", nargs="+", default=list(BUDGET_MS), choices=list(BUDGET_MS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="skypulse_startup_")
+    log_dir = os.path.join(root, "logs")
+    try:
+        for directory in ("data", "frontend"):
+            shutil.copytree(os.path.join(CODE_DIR, directory), os.path.join(root, directory))
+        options = ["--root", root, "--workers", "1", "--no-memory-trace", "--log-dir", log_dir]
+        subprocess.run([sys.executable, SKYPULSE, "run"] + options, capture_output=True, check=True)
+
+        rows = [("pandas", median_ms(["-c", "import pandas, pyarrow.parquet"], args.repeat), None),
+                ("eager", median_ms(["-c", f"import {EAGER_IMPORTS}"], args.repeat), None)]
+        for command in args.commands:
+            rows.append((command, median_ms([SKYPULSE, command] + options, args.repeat), BUDGET_MS[command]))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    baseline = rows[0][1]
+    print(f"\nImport time, median of {args.repeat} fresh interpreters")
+    print(f"  {'command':<10}{'imports ms':>12}{'over pandas':>13}{'budget ms':>11}")
+    failed = False
+    for name, ms, budget in rows:
+        verdict = ""
+        if budget is not None:
+            verdict = "  ok" if ms - baseline <= budget else "  OVER"
+            failed = failed or verdict == "  OVER"
+        print(f"  {name:<10}{ms:>12.0f}{ms - baseline:>13.0f}{'-' if budget is None else budget:>11}{verdict}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Load time and memory: read_csv(parse_dates=...) vs the Parquet storage layer.
+
+The cleaned temperature and sea-level samples are tiled SCALE times (with
+dates shifted so the series stays chronological), saved through
+storage.save_dataset, then loaded back in several ways. "peak MB" is what
+tracemalloc sees (Python and NumPy allocations; Arrow's own buffers are not
+tracked), "frame MB" is the size of the resulting DataFrame.
+
+    python benchmarks/bench_storage.py --scale 50
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from storage import load_dataset, save_dataset
+from synthetic import tile_frame
+
+CLEANED_DIR = os.path.join(CODE_DIR, "data", "cleaned")
+
+def measure(label, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    frame_mb = df.memory_usage(deep=True).sum() / 2**20
+    print(f"  {label:<38}{elapsed:>9.3f}{peak:>12.1f}{frame_mb:>11.1f}{len(df):>12,}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=20, help="times each cleaned sample is tiled")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, value_col in [("cleaned_temperature", "Temperature"), ("cleaned_sea_level", "Sea Level")]:
+            df = tile_frame(pd.read_csv(os.path.join(CLEANED_DIR, name + ".csv"), parse_dates=["Date"]), args.scale)
+            save_dataset(df, tmp, name)
+            csv_path = os.path.join(tmp, name + ".csv")
+            parquet_path = os.path.join(tmp, name + ".parquet")
+            last_decade = (df["Date"].max() - pd.DateOffset(years=10), df["Date"].max())
+
+            print(f"\n{name}: {len(df):,} rows, CSV {os.path.getsize(csv_path) / 2**20:.1f} MB, "
+                  f"Parquet {os.path.getsize(parquet_path) / 2**20:.1f} MB")
+            print(f"  {'load':<38}{'seconds':>9}{'peak MB':>12}{'frame MB':>11}{'rows':>12}")
+            baseline = measure("read_csv(parse_dates=['Date'])",
+                               lambda: pd.read_csv(csv_path, parse_dates=["Date"]))
+            full = measure("load_dataset (float64)", lambda: load_dataset(tmp, name))
+            measure("load_dataset (float32)", lambda: load_dataset(tmp, name, float32=True))
+            measure(f"load_dataset columns=[{value_col!r}]",
+                    lambda: load_dataset(tmp, name, columns=[value_col], float32=True))
+            measure("load_dataset last decade",
+                    lambda: load_dataset(tmp, name, start=last_decade[0], end=last_decade[1]))
+            print(f"  full-load speed-up vs read_csv: {baseline / full:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Dashboard payload: full JSON record dumps vs the multi-resolution tiles.
+
+For each tiled series the cleaned sample is tiled SCALE times (dates shifted
+so the series stays chronological) and published both ways: the old
+json_to_csv layout (every row, string values, indent=2) and tiles.write_tiles.
+"first chart" is what a chart needs before it can draw: the whole dump, or
+index.json plus the level picked for the full span. Parse time is json.loads
+of those bytes, a stand-in for the browser's response.json().
+
+    python benchmarks/bench_tiles.py --scale 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from tiles import dated_series, write_tiles
+from synthetic import tile_frame
+
+CLEANED_DIR = os.path.join(CODE_DIR, "data", "cleaned")
+SERIES = [("temperature", "cleaned_temperature", "Temperature"), ("sea_level", "cleaned_sea_level", "Sea Level")]
+
+def legacy_dump(df, path):
+    """What json_to_csv.convert_csv_to_json wrote: csv.DictReader rows, all strings"""
+    records = df.assign(Date=df["Date"].dt.strftime("%Y-%m-%d")).astype(str).to_dict("records")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2)
+
+def load(paths):
+    start = time.perf_counter()
+    size = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        size += len(data)
+        json.loads(data)
+    return size, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10, help="times each cleaned sample is tiled")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"  {'series':<14}{'rows':>10}{'dump KB':>10}{'tiles KB':>10}{'first KB':>10}"
+              f"{'dump ms':>9}{'first ms':>9}{'level':>7}")
+        for name, file_name, value_col in SERIES:
+            df = tile_frame(pd.read_csv(os.path.join(CLEANED_DIR, file_name + ".csv"), parse_dates=["Date"]), args.scale)
+            dump_path = os.path.join(tmp, name + ".json")
+            legacy_dump(df, dump_path)
+            start = time.perf_counter()
+            index = write_tiles(dated_series(df, value_col), tmp, name)
+            write_s = time.perf_counter() - start
+
+            series_dir = os.path.join(tmp, name)
+            tiles_kb = sum(os.path.getsize(os.path.join(root, f))
+                           for root, _, files in os.walk(series_dir) for f in files) / 1024
+            # Full span on first paint: the dashboard shows the yearly level beyond 40 years
+            level = "year" if index["end"] - index["start"] > 40 else "month"
+            dump_bytes, dump_s = load([dump_path])
+            first_bytes, first_s = load([os.path.join(series_dir, "index.json"),
+                                         os.path.join(series_dir, index["levels"][level]["file"])])
+            print(f"  {name:<14}{len(df):>10,}{dump_bytes / 1024:>10.0f}{tiles_kb:>10.0f}{first_bytes / 1024:>10.1f}"
+                  f"{dump_s * 1000:>9.1f}{first_s * 1000:>9.2f}{level:>7}   (tiles written in {write_s:.2f} s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Trend analytics of many series: per-series loops against the batched engine.
+
+Generates monthly values for SERIES keys (regions or grid cells) over
+YEARS years, then times each statistic both ways and checks that every
+batched result matches the per-series one:
+
+    annual means    resample('YE') per key         long_panel
+    OLS trends      stats.linregress per column    ols
+    correlations    DataFrame.corr                 pearson_matrix (matrix products,
+                                                   equal to rounding)
+    decomposition   seasonal_decompose per column  moving_average_decompose
+
+    python benchmarks/bench_trends.py --series 2000 --years 145
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from scipy import stats
+from statsmodels.tsa.seasonal import seasonal_decompose
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(CODE_DIR, "scripts"))
+from analysis.batched import long_panel, moving_average_decompose, ols, pearson_matrix
+
+def synthetic_series(series, years, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.date_range(f"{2025 - years}-01-15", "2024-12-15", freq="MS") + pd.Timedelta(days=14)
+    trend = rng.normal(0.01, 0.005, series)
+    values = (np.arange(len(months))[:, None] * trend / 12 + rng.normal(0, 0.3, (len(months), series)))
+    # Some keys start late, like sub-national records
+    values[:rng.integers(0, 12 * years // 4), rng.random(series) < 0.1] = np.nan
+    df = pd.DataFrame({"Date": np.repeat(months, series), "Key": np.tile([f"K{i:05d}" for i in range(series)],
+                                                                          len(months)),
+                       "Value": values.ravel()})
+    return df.dropna(ignore_index=True)
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=2_000)
+    parser.add_argument("--years", type=int, default=145)
+    parser.add_argument("--corr-series", type=int, default=1_000,
+                        help="columns in the correlation matrix (it grows with the square)")
+    args = parser.parse_args()
+
+    df = synthetic_series(args.series, args.years)
+    print(f"{len(df):,} monthly rows, {args.series:,} series, {args.years} years\n")
+
+    def loop_annual():
+        return pd.DataFrame({key: group.set_index("Date")["Value"].resample("YE").mean()
+                             for key, group in df.groupby("Key", sort=True)})
+    loop, loop_seconds = timed(loop_annual)
+    annual, batch_seconds = timed(lambda: long_panel(df, "Key", "Value"))
+    rows = [("annual means", loop_seconds, batch_seconds,
+             loop.reindex(annual.index).equals(annual.rename_axis(columns=None).rename_axis(index=None)))]
+
+    values = annual.to_numpy()
+    years = annual.index.year.to_numpy(np.float64)
+
+    def loop_ols():
+        fits = []
+        for column in values.T:
+            valid = ~np.isnan(column)
+            fits.append(stats.linregress(years[valid], column[valid]))
+        return np.array([(fit.slope, fit.intercept, fit.rvalue, fit.pvalue) for fit in fits])
+    loop, loop_seconds = timed(loop_ols)
+    batch, batch_seconds = timed(lambda: ols(years, values))
+    rows.append(("OLS trends", loop_seconds, batch_seconds, np.array_equal(loop, np.column_stack(batch[:4]))))
+
+    subset = values[:, :args.corr_series]
+    loop, loop_seconds = timed(lambda: pd.DataFrame(subset).corr().to_numpy())
+    batch, batch_seconds = timed(lambda: pearson_matrix(subset))
+    rows.append((f"correlations ({subset.shape[1]} cols)", loop_seconds, batch_seconds,
+                 f"max diff {np.nanmax(np.abs(loop - batch)):.1e}"))
+
+    complete = values[:, ~np.isnan(values).any(axis=0)]
+    index = annual.index.copy()
+    index.freq = "YE"
+    loop, loop_seconds = timed(lambda: np.column_stack(
+        [seasonal_decompose(pd.Series(column, index=index), period=10).resid.to_numpy() for column in complete.T]))
+    batch, batch_seconds = timed(lambda: moving_average_decompose(complete, 10).resid)
+    rows.append((f"decomposition ({complete.shape[1]} cols)", loop_seconds, batch_seconds,
+                 np.array_equal(loop, batch, equal_nan=True)))
+
+    print(f"  {'statistic':<30}{'loop s':>9}{'batched s':>11}{'speedup':>9}  identical to the loop")
+    for name, loop_seconds, batch_seconds, identical in rows:
+        print(f"  {name:<30}{loop_seconds:>9.3f}{batch_seconds:>11.3f}{loop_seconds / batch_seconds:>8.1f}x  {identical}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Synthetic raw feeds shaped like data/raw, at a multiple of the sample sizes.
+
+Each generator writes one raw file in the layout its formatter reads and
+returns the number of data rows. SCALE multiplies the rows of the sample
+data the way each feed really grows:
+
+    co2_emissions.csv   NOAA columns and decimal dates; SCALE readings per
+                        month over 1958-2024 (flask/in-situ density)
+    temperature.csv     description line, then the wide GISTEMP table
+                        (Year, Jan..Dec, J-D, ...; '***' for missing);
+                        SCALE times the years, back to 1678 at most, since
+                        the formatter's datetime64[ns] dates start in 1677
+    deforestation.csv   GFW columns (iso, umd_tree_cover_loss__*,
+                        gfw_gross_emissions_*); SCALE GADM sub-regions
+                        ('BRA.12_1') per country, 2001-2023
+    sea_level_data.csv  "D"-prefixed dates and Value; SCALE times the
+                        altimetry passes per day, 1992-2024
+
+    python benchmarks/synthetic.py /tmp/skypulse_x10 --scale 10
+"""
+import os
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+SEASONS = ["J-D", "D-N", "DJF", "MAM", "JJA", "SON"]
+
+# Rows of the sample data in data/raw (and data/formatted for sea level)
+BASE_COUNTRIES = 99
+BASE_TEMPERATURE_YEARS = 145
+SEA_LEVEL_PASSES = 10
+FIRST_NS_YEAR = 1678
+
+def _decimal_years(dates):
+    starts = pd.to_datetime(dates.year.astype(str) + "-01-01")
+    lengths = np.where(dates.is_leap_year, 366, 365)
+    return dates.year + (dates - starts).total_seconds() / 86400 / lengths
+
+def write_co2(path, scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("1958-03-01", "2024-12-01", freq="MS")
+    # `scale` evenly spaced readings inside every month
+    step = months.days_in_month.to_numpy() / scale
+    offsets = np.tile(np.arange(scale), len(months)) * np.repeat(step, scale)
+    dates = pd.DatetimeIndex(np.repeat(months.to_numpy(), scale)) + pd.to_timedelta(offsets + step.repeat(scale) / 2,
+                                                                                    unit="D")
+    years = _decimal_years(dates).to_numpy()
+    t = years - 1958
+    deseasonalized = 314.5 + 0.75 * t + 0.0125 * t ** 2
+    average = deseasonalized + 3.0 * np.sin(2 * np.pi * (years - 0.3)) + rng.normal(0, 0.3, len(years))
+    # A few missing readings, flagged the way NOAA does
+    average[rng.random(len(years)) < 0.002] = -99.99
+    df = pd.DataFrame({"year": dates.year, "month": dates.month, "decimal date": np.round(years, 6),
+                       "average": np.round(average, 2), "deseasonalized": np.round(deseasonalized, 2),
+                       "ndays": -1, "sdev": -9.99, "unc": -0.99})
+    df.to_csv(path, index=False)
+    return len(df)
+
+def write_temperature(path, scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    first = max(FIRST_NS_YEAR, 2024 - BASE_TEMPERATURE_YEARS * scale + 1)
+    years = np.arange(first, 2025)
+    monthly = (0.008 * np.clip(years - 1880, -300, None) - 0.25)[:, None] + rng.normal(0, 0.12, (len(years), 12))
+    table = pd.DataFrame(np.round(monthly, 2), columns=MONTHS)
+    table.insert(0, "Year", years)
+    table["J-D"] = table[MONTHS].mean(axis=1).round(2)
+    for season in SEASONS[1:]:
+        table[season] = table["J-D"]
+
+    def fmt(value):
+        # GISTEMP drops the leading zero: -.20, .05
+        return f"{value:.2f}".replace("0.", ".", 1)
+    cells = table[MONTHS + SEASONS].map(fmt)
+    # The current year is still incomplete
+    cells.iloc[-1, 9:] = "***"
+    cells.insert(0, "Year", years)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Land-Ocean: Global Means\n")
+        cells.to_csv(f, index=False)
+    return len(cells)
+
+def write_deforestation(path, scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    countries = pd.unique(np.array(["".join(code) for code in rng.choice(letters, (3 * BASE_COUNTRIES, 3))]))
+    countries = countries[:BASE_COUNTRIES]
+    regions = countries if scale == 1 else np.array([f"{iso}.{k}_1" for iso in countries for k in range(1, scale + 1)])
+    years = np.arange(2001, 2024)
+    size = 10 ** rng.uniform(-1, 5, len(regions))
+    loss = np.repeat(size, len(years)) * rng.lognormal(0, 0.4, len(regions) * len(years))
+    df = pd.DataFrame({"iso": np.repeat(regions, len(years)),
+                       "umd_tree_cover_loss__year": np.tile(years, len(regions)),
+                       "umd_tree_cover_loss__ha": loss,
+                       "gfw_gross_emissions_co2e_all_gases__Mg": loss * rng.uniform(200, 700, len(loss))})
+    df.to_csv(path, index=False, quoting=2)
+    return len(df)
+
+def write_sea_level(path, scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("1992-12-16", "2024-04-14", freq="3D")
+    passes = SEA_LEVEL_PASSES * scale
+    dates = np.repeat(days, passes)
+    years = _decimal_years(pd.DatetimeIndex(dates)).to_numpy()
+    level = 3.3 * (years - 1993) + 40 * np.sin(2 * np.pi * years) + rng.normal(0, 25, len(dates))
+    df = pd.DataFrame({"Date": "D" + pd.DatetimeIndex(dates).strftime("%m/%d/%Y"), "Value": np.round(level, 2)})
+    df.to_csv(path, index=False)
+    return len(df)
+
+# pipeline.DATASETS raw file -> generator
+GENERATORS = {
+    "co2": ("co2_emissions.csv", write_co2),
+    "temperature": ("temperature.csv", write_temperature),
+    "deforestation": ("deforestation.csv", write_deforestation),
+    "sea_level": ("sea_level_data.csv", write_sea_level),
+}
+
+def tile_frame(df, scale):
+    """Repeat a dated frame (e.g. a cleaned sample) `scale` times, shifting each copy past the previous one"""
+    span = df["Date"].max() - df["Date"].min() + pd.Timedelta(days=1)
+    copies = [df.assign(Date=df["Date"] - span * (scale - i)) for i in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+def make_root(root, scale=1, seed=0):
+    """A project root with synthetic data/raw feeds and a copy of the frontend; returns {dataset: rows}"""
+    raw_dir = os.path.join(root, "data", "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+    frontend = os.path.join(root, "frontend")
+    if not os.path.exists(frontend):
+        shutil.copytree(os.path.join(CODE_DIR, "frontend"), frontend,
+                        ignore=shutil.ignore_patterns("public"))
+    return {name: generate(os.path.join(raw_dir, file_name), scale, seed)
+            for name, (file_name, generate) in GENERATORS.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="project root to create")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = make_root(args.root, args.scale, args.seed)
+    for name, count in rows.items():
+        print(f"{GENERATORS[name][0]:<22}{count:>12,} rows")
@@ -24,7 +24,7 @@ def save_tree_to_file(directory, output_file):
     print(f"Directory structure saved to {output_file}")
 
 # Set your project directory path
-project_dir = r"E:\College Hackathon\CLIMATE CHANGE ANALYSIS"  # Change this if needed
+project_dir = os.environ.get("SKYPULSE_ROOT") or os.path.dirname(os.path.abspath(__file__))
 output_file = os.path.join(project_dir, "directory_structure.txt")
 
 # Generate and save the tree structure
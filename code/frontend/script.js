@@ -6,30 +6,75 @@ themeToggle.addEventListener("click", () => {
   body.dataset.theme = body.dataset.theme === "dark" ? "light" : "dark";
 });
 
-// Chart Configurations
-const chartConfigs = {
-  co2: {
-    type: "line",
-    data: { labels: [], datasets: [{ label: "CO₂ Levels (ppm)", data: [], borderColor: "#e74c3c", fill: false }] },
-    options: { responsive: true, scales: { x: { title: { text: "Year" } }, y: { title: { text: "CO₂ (ppm)" } } } }
-  },
-  temperature: {
-    type: "line",
-    data: { labels: [], datasets: [{ label: "Temperature (°C)", data: [], borderColor: "#f1c40f", fill: false }, { label: "Temperature Trend", data: [], borderColor: "#e67e22", borderDash: [5, 5], fill: false }] },
-    options: { responsive: true, scales: { x: { title: { text: "Year" } }, y: { title: { text: "Temperature (°C)" } } } }
-  },
-  deforestation: {
-    type: "line",
-    data: { labels: [], datasets: [{ label: "Forest Area (sq. km)", data: [], borderColor: "#27ae60", fill: false }] },
-    options: { responsive: true, scales: { x: { title: { text: "Year" } }, y: { title: { text: "Area (sq. km)" } } } }
-  },
-  seaLevel: {
+// Charts read the multi-resolution tiles written by scripts/tiles.py:
+// index.json and the yearly level on load, the monthly level and the full
+// resolution tiles (only those in view) once the user zooms in.
+const TILES_PATH = "public/data/tiles";
+
+// The tiles are published with the rest of public/data by the export step.
+// If a series has none (a tile set removed or not exported yet), it is drawn
+// from the dashboard JSON exported next to them, bucketed by year here:
+// tile set -> file under public/data and row -> [date, value]. Rows of a
+// year are summed when `sum` is set (deforestation is one row per region).
+const DATA_PATH = "public/data";
+const FALLBACK = {
+  co2: { file: "predictions/prophet_co2_predictions.json", point: d => [d.Date, +d.Predicted] },
+  temperature: { file: "processed/decadal_temperature.json", point: d => [`${d.Decade}-01-01`, +d.Temperature] },
+  deforestation: { file: "processed/deforestation.json", point: d => [`${d.Year}-01-01`, +d.Area_Deforested], sum: true },
+  sea_level: { file: "processed/sea_level.json", point: d => [d.Date, +d["Sea Level"]] }
+};
+
+// Finest level to show for a visible span (in years)
+function levelForSpan(span) {
+  if (span > 40) return "year";
+  if (span > 4) return "month";
+  return "full";
+}
+
+// Chart Configurations (x is a decimal year; datasets 1 and 2 shade the min-max range of each bucket)
+function tiledConfig(label, color, yTitle, extraDatasets = []) {
+  return {
     type: "line",
-    data: { labels: [], datasets: [{ label: "Sea Level (mm)", data: [], borderColor: "#3498db", fill: false }] },
-    options: { responsive: true, scales: { x: { title: { text: "Year" } }, y: { title: { text: "Sea Level (mm)" } } } }
-  }
+    data: {
+      datasets: [
+        { label, data: [], borderColor: color, fill: false, pointRadius: 0, borderWidth: 1.5 },
+        { label: "Range", data: [], borderWidth: 0, pointRadius: 0, fill: false },
+        { label: "Range", data: [], borderWidth: 0, pointRadius: 0, fill: "-1", backgroundColor: color + "33" },
+        ...extraDatasets
+      ]
+    },
+    options: {
+      responsive: true,
+      animation: false,
+      parsing: false,
+      normalized: true,
+      scales: {
+        x: { type: "linear", title: { display: true, text: "Year" }, ticks: { callback: v => Math.floor(v) } },
+        y: { title: { display: true, text: yTitle } }
+      },
+      plugins: {
+        legend: { labels: { filter: item => item.text !== "Range" } },
+        zoom: {
+          zoom: { wheel: { enabled: true }, pinch: { enabled: true }, mode: "x" },
+          pan: { enabled: true, mode: "x" }
+        }
+      }
+    }
+  };
+}
+
+const chartConfigs = {
+  co2: tiledConfig("CO₂ Levels (ppm)", "#e74c3c", "CO₂ (ppm)"),
+  temperature: tiledConfig("Temperature (°C)", "#f1c40f", "Temperature (°C)", [
+    { label: "Temperature Trend", data: [], borderColor: "#e67e22", borderDash: [5, 5], fill: false, pointRadius: 0 }
+  ]),
+  deforestation: tiledConfig("Area Deforested (sq. km)", "#27ae60", "Area (sq. km)"),
+  seaLevel: tiledConfig("Sea Level (mm)", "#3498db", "Sea Level (mm)")
 };
 
+// chart key -> tile set
+const tileSets = { co2: "co2", temperature: "temperature", deforestation: "deforestation", seaLevel: "sea_level" };
+
 // Initialize Charts
 const charts = {
   co2: new Chart(document.getElementById("co2Chart"), chartConfigs.co2),
@@ -38,81 +83,127 @@ const charts = {
   seaLevel: new Chart(document.getElementById("seaLevelChart"), chartConfigs.seaLevel)
 };
 
-// Function to Calculate Yearly Mean Values
-function calculateYearlyMean(data, valueKey) {
-  const yearlyData = {};
+// Fetched tile files, shared by every chart and zoom level
+const tileCache = new Map();
 
-  data.forEach(entry => {
-    const year = new Date(entry.Date).getFullYear();
-    const value = parseFloat(entry[valueKey]);
+function fetchTile(path) {
+  if (!tileCache.has(path)) {
+    tileCache.set(path, fetch(`${TILES_PATH}/${path}`).then(response => {
+      if (!response.ok) throw new Error(`${path}: HTTP ${response.status}`);
+      return response.json();
+    }));
+  }
+  return tileCache.get(path);
+}
 
-    if (!yearlyData[year]) yearlyData[year] = { sum: 0, count: 0 };
-    yearlyData[year].sum += value;
-    yearlyData[year].count += 1;
-  });
+// A tile index with only a year level, computed from the fallback JSON of a series
+async function fallbackIndex(name) {
+  const { file, point, sum } = FALLBACK[name];
+  const response = await fetch(`${DATA_PATH}/${file}`);
+  if (!response.ok) throw new Error(`${file}: HTTP ${response.status}`);
+  const years = new Map();
+  for (const row of await response.json()) {
+    const [date, value] = point(row);
+    const year = parseInt(String(date).slice(0, 4), 10);
+    if (Number.isNaN(year) || !Number.isFinite(value)) continue;
+    if (!years.has(year)) years.set(year, []);
+    years.get(year).push(value);
+  }
+  const x = [...years.keys()].sort((a, b) => a - b);
+  const bucket = { x, mean: [], min: [], max: [], n: [] };
+  for (const year of x) {
+    const values = sum ? [years.get(year).reduce((a, v) => a + v, 0)] : years.get(year);
+    bucket.mean.push(values.reduce((a, v) => a + v, 0) / values.length);
+    bucket.min.push(Math.min(...values));
+    bucket.max.push(Math.max(...values));
+    bucket.n.push(years.get(year).length);
+  }
+  return { series: name, start: x[0], end: x[x.length - 1], levels: { year: { points: x.length, bucket } } };
+}
 
-  return Object.keys(yearlyData).map(year => ({
-    year: parseInt(year),
-    meanValue: yearlyData[year].sum / yearlyData[year].count
-  }));
+// Tile index of a series, or the fallback index when no tiles were published
+function fetchIndex(name) {
+  const path = `${name}/index.json`;
+  if (!tileCache.has(path)) {
+    tileCache.set(path, fetch(`${TILES_PATH}/${path}`).then(response => {
+      if (response.status === 404) return fallbackIndex(name);
+      if (!response.ok) throw new Error(`${path}: HTTP ${response.status}`);
+      return response.json();
+    }));
+  }
+  return tileCache.get(path);
 }
 
 // Function to Calculate Linear Regression (For Temperature Trend)
-function calculateTrend(data) {
-  const x = data.map((_, i) => i);
-  const y = data;
-  const n = x.length;
-
-  const sumX = x.reduce((a, b) => a + b, 0);
-  const sumY = y.reduce((a, b) => a + b, 0);
-  const sumXY = x.reduce((a, _, i) => a + x[i] * y[i], 0);
-  const sumXX = x.reduce((a, _, i) => a + x[i] * x[i], 0);
+function calculateTrend(points) {
+  const n = points.length;
+  const sumX = points.reduce((a, p) => a + p.x, 0);
+  const sumY = points.reduce((a, p) => a + p.y, 0);
+  const sumXY = points.reduce((a, p) => a + p.x * p.y, 0);
+  const sumXX = points.reduce((a, p) => a + p.x * p.x, 0);
 
   const slope = (n * sumXY - sumX * sumY) / (n * sumXX - sumX * sumX);
   const intercept = (sumY - slope * sumX) / n;
 
-  return y.map((_, i) => intercept + slope * i);
+  return points.map(p => ({ x: p.x, y: intercept + slope * p.x }));
+}
+
+// Points of the chosen level between min and max, as { line, low, high }
+async function loadLevel(name, index, level, min, max) {
+  if (level === "full") {
+    const tiles = index.levels.full.tiles.filter(t => t.end > min && t.start <= max);
+    const parts = await Promise.all(tiles.map(t => fetchTile(`${name}/${t.file}`)));
+    const line = parts.flatMap(part => part.x.map((x, i) => ({ x, y: part.y[i] })));
+    return { line, low: [], high: [] };
+  }
+  const bucket = index.levels[level].bucket || await fetchTile(`${name}/${index.levels[level].file}`);
+  const at = key => bucket.x.map((x, i) => ({ x, y: bucket[key][i] }));
+  return { line: at("mean"), low: at("min"), high: at("max") };
+}
+
+// Pick the resolution for the visible range of a chart and (re)draw it
+async function updateChart(key) {
+  const chart = charts[key];
+  const name = tileSets[key];
+  const index = await fetchIndex(name);
+  const scale = chart.scales.x;
+  const zoomed = chart.isZoomedOrPanned && chart.isZoomedOrPanned();
+  const min = zoomed ? scale.min : index.start;
+  const max = zoomed ? scale.max : index.end;
+
+  // Fall back to the finest level the series has
+  const order = ["year", "month", "full"];
+  let level = levelForSpan(max - min);
+  while (!index.levels[level]) level = order[order.indexOf(level) - 1];
+  if (chart.$level === level && chart.$loaded && chart.$loaded[0] <= min && chart.$loaded[1] >= max) return;
+
+  const { line, low, high } = await loadLevel(name, index, level, min, max);
+  chart.$level = level;
+  chart.$loaded = level === "full" ? [min, max] : [-Infinity, Infinity];
+  chart.data.datasets[0].data = line;
+  chart.data.datasets[1].data = low;
+  chart.data.datasets[2].data = high;
+  if (key === "temperature") chart.data.datasets[3].data = calculateTrend(line);
+  chart.update("none");
+}
+
+function onZoom({ chart }) {
+  const key = Object.keys(charts).find(k => charts[k] === chart);
+  updateChart(key).catch(error => console.error("Error fetching data:", error));
 }
 
 // Fetch and Update Data
 async function fetchAndUpdateData() {
+  Object.values(charts).forEach(chart => {
+    chart.options.plugins.zoom.zoom.onZoomComplete = onZoom;
+    chart.options.plugins.zoom.pan.onPanComplete = onZoom;
+    chart.canvas.addEventListener("dblclick", () => {
+      chart.resetZoom();
+      onZoom({ chart });
+    });
+  });
   try {
-    // Fetch CO2 Data (Yearly Mean)
-    const co2Response = await fetch("public/data/predictions/prophet_co2_predictions.json");
-    const co2Data = await co2Response.json();
-    const yearlyCO2 = calculateYearlyMean(co2Data, "Predicted");
-    
-    charts.co2.data.labels = yearlyCO2.map(d => d.year);
-    charts.co2.data.datasets[0].data = yearlyCO2.map(d => d.meanValue);
-    charts.co2.update();
-
-    // Fetch Temperature Data & Calculate Trend
-    const tempResponse = await fetch("public/data/processed/decadal_temperature.json");
-    const tempData = await tempResponse.json();
-    const temperatures = tempData.map(d => d.Temperature);
-
-    charts.temperature.data.labels = tempData.map(d => d.Decade);
-    charts.temperature.data.datasets[0].data = temperatures;
-    charts.temperature.data.datasets[1].data = calculateTrend(temperatures);
-    charts.temperature.update();
-
-    // Fetch Deforestation Data (Keep Raw Data)
-    const deforestationResponse = await fetch("public/data/processed/deforestation.json");
-    const deforestationData = await deforestationResponse.json();
-
-    charts.deforestation.data.labels = deforestationData.map(d => d.Year);
-    charts.deforestation.data.datasets[0].data = deforestationData.map(d => d.Area_Deforested);
-    charts.deforestation.update();
-
-    // Fetch Sea Level Data (Yearly Mean)
-    const seaLevelResponse = await fetch("public/data/processed/sea_level.json");
-    const seaLevelData = await seaLevelResponse.json();
-    const yearlySeaLevels = calculateYearlyMean(seaLevelData, "Sea Level");
-
-    charts.seaLevel.data.labels = yearlySeaLevels.map(d => d.year);
-    charts.seaLevel.data.datasets[0].data = yearlySeaLevels.map(d => d.meanValue);
-    charts.seaLevel.update();
-
+    await Promise.all(Object.keys(charts).map(updateChart));
   } catch (error) {
     console.error("Error fetching data:", error);
   }
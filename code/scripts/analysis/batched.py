@@ -0,0 +1,235 @@
+import os
+import sys
+import argparse
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import load_dataset
+from config import project_path
+
+# Batched trend analytics on 2-D arrays: rows are periods, columns are
+# series (the global temperature/CO2/sea level means, or one column per
+# region or grid cell). The calendar means are computed once into a panel
+# and every statistic then runs over all of its columns at once:
+#   calendar_means / long_panel - annual (or decadal) means of many series
+#   ols                         - least-squares trend of every column
+#                                 (stats.linregress)
+#   pearson_matrix              - pairwise-complete correlation matrix
+#                                 (DataFrame.corr)
+#   moving_average_decompose    - additive moving-average decomposition
+#                                 (statsmodels seasonal_decompose)
+# ols and the decomposition follow the arithmetic of the routine in
+# brackets, so a column's result is identical to running it on that
+# column alone; the correlations agree to rounding (exactly with exact=True).
+# Missing values are NaN: each column's trend only uses its own valid
+# periods, each correlation the periods both columns have.
+# trend_analysis.py computes its single-series outputs through these.
+
+cleaned_path = project_path('cleaned')
+
+OLS = namedtuple('OLS', ['slope', 'intercept', 'rvalue', 'pvalue', 'stderr', 'intercept_stderr', 'n'])
+Decomposition = namedtuple('Decomposition', ['observed', 'trend', 'seasonal', 'resid'])
+
+def calendar_means(dates, values, years=1):
+    """Mean of each value column per calendar period of `years` years.
+
+    Annual means are indexed by Dec 31 (like resample('YE')) and cover
+    every year from the first to the last date, NaN where a year has no
+    data; longer periods are indexed by their first year (1880, 1890, ...
+    for decades). The means come from one grouped reduction over all
+    columns, so they equal resample('YE').mean() and the decadal groupby
+    of each column.
+    """
+    dates = pd.DatetimeIndex(dates)
+    values = pd.DataFrame(values)
+    values.index = dates
+    if years == 1:
+        return values.resample('YE').mean()
+    start = (dates.year // years) * years
+    return values.groupby(start.rename('Start')).mean()
+
+def panel(frames):
+    """Annual means of several {name: frame with Date and the value column `name`} as one wide frame.
+
+    Each column keeps its own span (the years resample('YE') gives it),
+    the index is the union of the years.
+    """
+    columns = {name: calendar_means(df['Date'], df[[name]])[name] for name, df in frames.items()}
+    return pd.DataFrame(columns).rename_axis('Date')
+
+def long_panel(df, key_col, value_col, date_col='Date'):
+    """Annual means of a long (date, key, value) table: one column per key.
+
+    Thousands of regions or grid cells are reduced in one pass grouped on
+    (period, key code) instead of one resample per key.
+    """
+    keys = df[key_col] if isinstance(df[key_col].dtype, pd.CategoricalDtype) else df[key_col].astype('category')
+    dates = pd.DatetimeIndex(df[date_col])
+    means = (pd.DataFrame({'Year': dates.year, 'Key': keys.to_numpy(), 'Value': df[value_col].to_numpy(np.float64)})
+             .groupby(['Year', 'Key'], observed=True, sort=True)['Value'].mean()
+             .unstack('Key'))
+    first, last = means.index.min(), means.index.max()
+    means = means.reindex(range(first, last + 1))
+    means.index = pd.to_datetime([f"{year}-12-31" for year in means.index])
+    means.index.name = date_col
+    means.columns.name = key_col
+    return means
+
+def _as_columns(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[:, None] if values.ndim == 1 else values
+
+def _series_major(values):
+    # One contiguous row per series: numpy reduces each row with the same
+    # pairwise summation as a 1-D array, which keeps the results bit for
+    # bit equal to the single-series routines
+    return np.ascontiguousarray(_as_columns(values).T)
+
+def _ols_complete(x, y):
+    """linregress arithmetic for series-major x and y without NaN, all of the same length"""
+    n = y.shape[1]
+    # (series, [x, y], rows), the layout np.cov(x, y) works on
+    pairs = np.stack([x, y], axis=1)
+    means = pairs.sum(axis=2) / n
+    centred = pairs - means[:, :, None]
+    cov = centred @ centred.transpose(0, 2, 1) * (1 / n)
+    ssxm, ssxym, ssym = cov[:, 0, 0], cov[:, 0, 1], cov[:, 1, 1]
+    xmean, ymean = means[:, 0], means[:, 1]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.clip(ssxym / np.sqrt(ssxm * ssym), -1.0, 1.0)
+        r = np.where((ssxm == 0) | (ssym == 0), np.where(ssxym == 0, np.nan, 0.0), r)
+        slope = ssxym / ssxm
+        intercept = ymean - slope * xmean
+        if n == 2:
+            # Two points fit exactly
+            pvalue = np.where(y[:, 0] == y[:, 1], 1.0, 0.0)
+            stderr = intercept_stderr = np.zeros(len(y))
+        else:
+            df = n - 2
+            tiny = 1.0e-20
+            t = r * np.sqrt(df / ((1.0 - r + tiny) * (1.0 + r + tiny)))
+            # Student's t CDF straight from scipy.special: the same values
+            # as stats.t.sf without importing scipy.stats (over half a second)
+            from scipy import special
+            pvalue = 2 * special.stdtr(df, -np.abs(t))
+            stderr = np.sqrt((1 - r ** 2) * ssym / ssxm / df)
+            intercept_stderr = stderr * np.sqrt(ssxm + xmean ** 2)
+    result = np.stack([slope, intercept, r, pvalue, stderr, intercept_stderr])
+    # A constant x has no fit
+    result[:, ssxm == 0] = np.nan
+    return result
+
+def ols(x, y):
+    """Least-squares fit of every column of y on x (one shared 1-D x or one column per series).
+
+    Returns an OLS of arrays, one entry per column, with the slope,
+    intercept, r, two-sided p-value and standard errors of stats.linregress.
+    Rows where x or the column is NaN are left out of that column's fit;
+    columns with fewer than two points or a constant x are NaN. Columns
+    are fitted in batches of equal valid length, so every sum runs over
+    the same values in the same order as linregress on that column alone.
+    """
+    y = _series_major(y)
+    x = np.broadcast_to(_series_major(x), y.shape)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    n = valid.sum(axis=1)
+    result = np.full((6, len(y)), np.nan)
+    for length in np.unique(n[n >= 2]):
+        batch = np.flatnonzero(n == length)
+        keep = valid[batch]
+        result[:, batch] = _ols_complete(x[batch][keep].reshape(len(batch), length),
+                                         y[batch][keep].reshape(len(batch), length))
+    return OLS(*result, n)
+
+def pearson_matrix(values, exact=False):
+    """Pairwise-complete Pearson correlation of the columns (NaN where a pair has under two rows).
+
+    By default the sums come from matrix products over the masked,
+    mean-centred columns, which handles thousands of series in one pass
+    and agrees with DataFrame.corr to rounding. exact=True returns
+    DataFrame.corr's own matrix (its one-pass update per pair is already
+    compiled, and faster than redoing it in NumPy) for outputs that must
+    not change by a bit.
+    """
+    values = _as_columns(values)
+    if exact:
+        return pd.DataFrame(values).corr().to_numpy()
+    valid = ~np.isnan(values)
+    mask = valid.astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Centre on the column means first so the products below stay small
+        centred = np.where(valid, values - np.nanmean(values, axis=0), 0)
+        n = mask.T @ mask
+        sum_x = centred.T @ mask
+        sum_xx = (centred * centred).T @ mask
+        # Sums over the rows both columns have, centred on that pair's means
+        cov = centred.T @ centred - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x * sum_x / n
+        corr = np.clip(cov / np.sqrt(var_x * var_x.T), -1.0, 1.0)
+    corr[n < 2] = np.nan
+    return corr
+
+def moving_average_decompose(values, period):
+    """Additive decomposition of every column: centred moving-average trend, mean seasonal cycle, residual.
+
+    Same filter, arithmetic and seasonal averaging as statsmodels'
+    seasonal_decompose (two-sided, no trend extrapolation), so the first and
+    last period // 2 trend values are NaN. Arrays come back as
+    (periods, series) like the input.
+    """
+    series = _series_major(values)
+    rows = series.shape[1]
+    if period % 2 == 0:
+        weights = np.array([0.5] + [1.0] * (period - 1) + [0.5]) / period
+    else:
+        weights = np.repeat(1.0 / period, period)
+    if rows < len(weights):
+        raise ValueError(f"{rows} rows are too few for period {period}")
+
+    # Accumulated tap by tap in the order np.convolve sums a window
+    windows = np.lib.stride_tricks.sliding_window_view(series, len(weights), axis=1)
+    filtered = windows[:, :, 0] * weights[0]
+    for tap in range(1, len(weights)):
+        filtered = filtered + windows[:, :, tap] * weights[tap]
+    trend = np.full(series.shape, np.nan)
+    half = len(weights) // 2
+    trend[:, half:half + filtered.shape[1]] = filtered
+
+    detrended = series - trend
+    with np.errstate(invalid='ignore'):
+        period_averages = np.stack([np.nanmean(np.ascontiguousarray(detrended[:, i::period]), axis=1)
+                                    for i in range(period)], axis=1)
+    period_averages -= np.mean(period_averages, axis=1)[:, None]
+    seasonal = np.tile(period_averages, rows // period + 1)[:, :rows]
+    resid = detrended - seasonal
+    return Decomposition(*(part.T for part in (series, trend, seasonal, resid)))
+
+def panel_trends(annual):
+    """Trend per column of an annual panel (index of Dec 31 dates): slope per year, R2, p-value and span"""
+    years = annual.index.year.to_numpy(np.float64)
+    fit = ols(years, annual.to_numpy(np.float64))
+    valid = annual.notna().to_numpy()
+    first = np.where(valid.any(axis=0), years[np.argmax(valid, axis=0)], np.nan)
+    last = np.where(valid.any(axis=0), years[len(years) - 1 - np.argmax(valid[::-1], axis=0)], np.nan)
+    return pd.DataFrame({'Years': fit.n, 'First_Year': first, 'Last_Year': last, 'Slope': fit.slope,
+                         'Intercept': fit.intercept, 'R2': fit.rvalue ** 2, 'P_Value': fit.pvalue,
+                         'Std_Err': fit.stderr}, index=annual.columns)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Annual trends and correlations of the cleaned series")
+    parser.add_argument('--period', type=int, default=10, help="decomposition period in years")
+    args = parser.parse_args()
+
+    annual = panel({
+        'Temperature': load_dataset(cleaned_path, 'cleaned_temperature'),
+        'CO2': load_dataset(cleaned_path, 'cleaned_co2'),
+        'Sea Level': load_dataset(cleaned_path, 'cleaned_sea_level'),
+    })
+    print("Annual trends:")
+    print(panel_trends(annual).to_string())
+    print("\nCorrelations over the common years:")
+    common = annual.dropna()
+    print(pd.DataFrame(pearson_matrix(common.to_numpy(), exact=True), index=common.columns, columns=common.columns).to_string())
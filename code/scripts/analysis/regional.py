@@ -0,0 +1,214 @@
+import os
+import re
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import load_dataset, save_dataset
+from config import project_path
+
+# Grouped processing of the per-region deforestation data.
+#
+# Regions are a categorical column, so every per-region statistic is
+# computed on the integer codes with one sort or np.bincount over the whole
+# table instead of a Python loop over regions. That keeps country-level
+# data (about a hundred ISO3 codes) and GADM level 1/2 data (hundreds of
+# thousands of ids such as 'BRA.12_1' or 'BRA.12.3_1') on the same code
+# path:
+#   region_iqr_mask    - IQR outliers judged within each region, so large
+#                        countries are not outliers just for being large
+#   region_trends      - per-region least-squares trend of annual loss
+#   regional_annual    - per-region annual aggregates (the table the
+#                        dashboard and model_training consume)
+# Every statistic depends on one region's rows only, so with workers > 1
+# the regions are split across a process pool.
+
+cleaned_path = project_path('cleaned')
+processed_path = project_path('processed')
+
+# ISO3 country code, optionally with GADM sub-national levels and version
+REGION_CODE = re.compile(r'^[A-Z]{3}(\.\d+){0,2}(_\d+)?$')
+
+def region_index(regions):
+    """Regions as a Categorical with sorted categories (codes are the region index)"""
+    if isinstance(regions, pd.Series) and isinstance(regions.dtype, pd.CategoricalDtype):
+        return regions.cat.remove_unused_categories().cat.as_ordered().values
+    return pd.Categorical(regions, ordered=True)
+
+def valid_region_mask(regions, allowed=None):
+    """True for rows whose region is a well-formed code (and in `allowed`, if given).
+
+    Each distinct code is checked once, then broadcast through the codes.
+    """
+    index = region_index(regions)
+    categories = index.categories.astype(str)
+    valid = np.fromiter((REGION_CODE.match(code) is not None for code in categories), bool, len(categories))
+    if allowed is not None:
+        valid &= categories.isin(list(allowed))
+    # Missing regions have code -1 and are never valid
+    return np.append(valid, False)[index.codes]
+
+def _sorted_groups(codes, values):
+    """Order of the rows by (group, value), with each group's start and size"""
+    order = np.lexsort((values, codes))
+    counts = np.bincount(codes, minlength=codes.max() + 1 if len(codes) else 0)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return order, starts, counts
+
+def group_quantiles(codes, values, quantiles):
+    """Linear-interpolation quantiles of values within each group code (NaN for empty groups)"""
+    order, starts, counts = _sorted_groups(codes, values)
+    ordered = values[order]
+    result = []
+    for q in quantiles:
+        position = q * np.maximum(counts - 1, 0)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, np.maximum(counts - 1, 0))
+        fraction = position - below
+        last = len(ordered) - 1
+        low, high = ordered[np.minimum(starts + below, last)], ordered[np.minimum(starts + above, last)]
+        result.append(np.where(counts > 0, low + (high - low) * fraction, np.nan))
+    return result
+
+def region_iqr_mask(df, value_col='Area_Deforested', region_col='Region', k=1.5, min_count=4):
+    """True for rows outside [Q1 - k*IQR, Q3 + k*IQR] of their own region.
+
+    Regions with fewer than min_count values are never flagged.
+    """
+    index = region_index(df[region_col])
+    codes = index.codes.astype(np.int64)
+    values = df[value_col].to_numpy(np.float64)
+    valid = (codes >= 0) & ~np.isnan(values)
+    flagged = np.zeros(len(df), dtype=bool)
+    if not valid.any():
+        return flagged
+    q1, q3 = group_quantiles(codes[valid], values[valid], (0.25, 0.75))
+    counts = np.bincount(codes[valid], minlength=len(q1))
+    iqr = q3 - q1
+    row_codes = codes[valid]
+    outside = ((values[valid] < (q1 - k * iqr)[row_codes]) | (values[valid] > (q3 + k * iqr)[row_codes]))
+    flagged[valid] = outside & (counts[row_codes] >= min_count)
+    return flagged
+
+def region_trends(df, value_col='Area_Deforested', region_col='Region', year_col='Year'):
+    """Per-region totals and least-squares trend of the annual values.
+
+    Slope is in units per year, from sums over year-centred values (stable
+    even for long records); R2 is NaN for regions with a single year.
+    """
+    index = region_index(df[region_col])
+    codes = index.codes.astype(np.int64)
+    keep = codes >= 0
+    codes, index = codes[keep], index[keep]
+    x = df[year_col].to_numpy(np.float64)[keep]
+    y = df[value_col].to_numpy(np.float64)[keep]
+    groups = len(index.categories)
+
+    count = np.bincount(codes, minlength=groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.bincount(codes, x, groups) / count
+        mean_y = np.bincount(codes, y, groups) / count
+        dx, dy = x - mean_x[codes], y - mean_y[codes]
+        sxx = np.bincount(codes, dx * dx, groups)
+        sxy = np.bincount(codes, dx * dy, groups)
+        syy = np.bincount(codes, dy * dy, groups)
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+        r2 = np.where((sxx > 0) & (syy > 0), sxy * sxy / (sxx * syy), np.nan)
+
+    # Year of the largest value per region: last row of each group sorted by value
+    order, starts, sizes = _sorted_groups(codes, y)
+    peak_year = np.where(sizes > 0, x[order[np.maximum(starts + sizes - 1, 0)]], np.nan)
+    first = np.full(groups, np.inf)
+    last = np.full(groups, -np.inf)
+    np.minimum.at(first, codes, x)
+    np.maximum.at(last, codes, x)
+
+    trends = pd.DataFrame({
+        'Region': pd.Categorical.from_codes(np.arange(groups), dtype=index.dtype),
+        'Years': count, 'First_Year': first, 'Last_Year': last,
+        'Total': mean_y * count, 'Mean': mean_y,
+        'Slope': slope, 'Intercept': mean_y - slope * mean_x, 'R2': r2, 'Peak_Year': peak_year,
+    })
+    trends = trends[trends['Years'] > 0].reset_index(drop=True)
+    return trends.astype({'First_Year': 'int64', 'Last_Year': 'int64', 'Peak_Year': 'int64'})
+
+def _region_years(df, value_col='Area_Deforested', region_col='Region', year_col='Year'):
+    """Loss per region and year with its running total and change on the previous year"""
+    annual = (pd.DataFrame({region_col: region_index(df[region_col]), year_col: df[year_col].to_numpy(),
+                            value_col: df[value_col].to_numpy(np.float64)})
+              .groupby([region_col, year_col], observed=True, sort=True)[value_col].sum()
+              .reset_index())
+    by_region = annual.groupby(region_col, observed=True, sort=False)[value_col]
+    annual['Cumulative'] = by_region.cumsum()
+    annual['Change'] = annual[value_col] - by_region.shift()
+    return annual
+
+def regional_annual(df, value_col='Area_Deforested', region_col='Region', year_col='Year', workers=None):
+    """One row per region and year: loss, cumulative loss, change on the previous year and share of the world total.
+
+    Date is the year end, like model_training.prepare_deforestation gives.
+    """
+    annual = process_regions(_region_years, df, workers, value_col=value_col, region_col=region_col, year_col=year_col)
+    # The world total needs every region, so it comes after the per-region part
+    world = annual.groupby(year_col)[value_col].transform('sum')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        annual['Share'] = annual[value_col] / world
+    annual.insert(0, 'Date', pd.to_datetime(annual[year_col].astype(str) + '-12-31'))
+    return annual
+
+def _partition(df, region_col, parts):
+    """Split rows into `parts` frames with disjoint regions"""
+    codes = region_index(df[region_col]).codes
+    return [df[codes % parts == part] for part in range(parts)]
+
+def process_regions(func, df, workers=None, **kwargs):
+    """func(df, **kwargs) over the regions, on a process pool when workers > 1.
+
+    func must only combine rows of the same region; its results for the
+    parts are merged back into one mask (row order) or frame (region order).
+    """
+    if not workers or workers <= 1:
+        return func(df, **kwargs)
+    region_col = kwargs.get('region_col', 'Region')
+    parts = _partition(df, region_col, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_call, [(func, part, kwargs) for part in parts]))
+    if isinstance(results[0], np.ndarray):
+        # Row masks: put each part's rows back in place
+        combined = np.empty(len(df), dtype=results[0].dtype)
+        codes = region_index(df[region_col]).codes
+        for part, result in enumerate(results):
+            combined[codes % workers == part] = result
+        return combined
+    combined = pd.concat(results, ignore_index=True)
+    # Each part has its own categories; restore one region index
+    combined[region_col] = region_index(combined[region_col].astype(str))
+    sort = [col for col in (region_col, 'Year') if col in combined.columns]
+    return combined.sort_values(sort, ignore_index=True)
+
+def _call(args):
+    func, df, kwargs = args
+    return func(df, **kwargs)
+
+def analyze_regions(df, output_dir=processed_path, workers=None):
+    """Per-region annual aggregates and trends, saved to output_dir unless it is None"""
+    annual = regional_annual(df, workers=workers)
+    trends = process_regions(region_trends, df, workers)
+    if output_dir:
+        save_dataset(annual, output_dir, 'regional_deforestation')
+        save_dataset(trends, output_dir, 'deforestation_trends')
+    return annual, trends
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-region deforestation aggregates and trends")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    deforestation = load_dataset(cleaned_path, 'cleaned_deforestation')
+    annual, trends = analyze_regions(deforestation, workers=args.workers)
+    print(f"{len(trends)} regions, {len(annual)} region-years")
+    print("Fastest growing loss (ha/year):")
+    print(trends.nlargest(10, 'Slope')[['Region', 'Years', 'Total', 'Slope', 'R2', 'Peak_Year']].to_string(index=False))
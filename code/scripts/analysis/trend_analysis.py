@@ -1,127 +1,224 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-from statsmodels.tsa.seasonal import seasonal_decompose
-import matplotlib.pyplot as plt
 import os
+import sys
 
-# Get absolute path to project root
-project_root = r'E:\College Hackathon\CLIMATE CHANGE ANALYSIS'
-cleaned_path = os.path.join(project_root, 'data', 'cleaned')
-processed_path = os.path.join(project_root, 'data', 'processed')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import load_dataset, save_dataset
+from instrumentation import instrumented, log_exception
+from analysis import batched
+from charts import Chart, decomposition_frame, render_charts
+from config import project_path
+from timeseries import as_frame
 
-# Create directories if they don't exist
-os.makedirs(cleaned_path, exist_ok=True)
+# Project directories (see config.py)
+cleaned_path = project_path('cleaned')
+processed_path = project_path('processed')
 
-# Load cleaned datasets with absolute paths
-def load_data():
+# Load cleaned datasets with absolute paths (Parquet when available, see storage.py)
+def load_data(start=None, end=None):
     return {
-        'temperature': pd.read_csv(os.path.join(cleaned_path, 'cleaned_temperature.csv'), parse_dates=['Date']),
-        'co2': pd.read_csv(os.path.join(cleaned_path, 'cleaned_co2.csv'), parse_dates=['Date']),
-        'sea_level': pd.read_csv(os.path.join(cleaned_path, 'cleaned_sea_level.csv'), parse_dates=['Date']),
-        'deforestation': pd.read_csv(os.path.join(cleaned_path, 'cleaned_deforestation.csv'))
+        'temperature': load_dataset(cleaned_path, 'cleaned_temperature', start=start, end=end),
+        'co2': load_dataset(cleaned_path, 'cleaned_co2', start=start, end=end),
+        'sea_level': load_dataset(cleaned_path, 'cleaned_sea_level', start=start, end=end),
+        'deforestation': load_dataset(cleaned_path, 'cleaned_deforestation')
     }
 
-def analyze_temperature(temp_df):
+# compute_* functions return results without writing anything, so the
+# pipeline runner can pass them on in memory. The analyze_* functions below
+# wrap them and save to output_dir (pass output_dir=None to skip writing).
+# Series inputs are cleaned frames or TimeSeries (timeseries.py).
+# The statistics themselves come from the batched engine (batched.py); the
+# annual means of all three series can be computed once with
+# compute_annual_means and shared by the correlations and decomposition.
+
+def compute_decadal_temperature(temp_df):
+    """Mean temperature per decade (Decade, Temperature)"""
+    temp_df = as_frame(temp_df)
+    decadal = batched.calendar_means(temp_df['Date'], temp_df[['Temperature']], years=10)
+    return decadal.rename_axis('Decade').reset_index()
+
+def compute_annual_means(temp_df, co2_df, sea_df):
+    """Annual means of the three series side by side (Date, Temperature, CO2, Sea Level)"""
+    frames = {'Temperature': as_frame(temp_df), 'CO2': as_frame(co2_df), 'Sea Level': as_frame(sea_df)}
+    return batched.panel(frames).reset_index()
+
+def decompose_annual_temperature(annual):
+    """Additive decomposition of the annual mean temperature (10-year period)"""
+    temp_series = annual.set_index('Date')['Temperature']
+    temp_series = temp_series.loc[temp_series.first_valid_index():temp_series.last_valid_index()].asfreq('YE')
+    parts = batched.moving_average_decompose(temp_series.to_numpy(), period=10)
+    series = lambda name: pd.Series(getattr(parts, name)[:, 0], index=temp_series.index, name=name)
+    # Only the result container comes from statsmodels, imported when needed
+    from statsmodels.tsa.seasonal import DecomposeResult
+    return DecomposeResult(temp_series, series('seasonal'), series('trend'), series('resid'))
+
+def decompose_temperature(temp_df):
+    """Additive decomposition of the annual mean temperature (10-year period)"""
+    temp_df = as_frame(temp_df)
+    annual = batched.calendar_means(temp_df['Date'], temp_df[['Temperature']])
+    return decompose_annual_temperature(annual.reset_index())
+
+def _annual_means(co2_df):
+    co2_annual = batched.calendar_means(co2_df['Date'], co2_df.drop(columns='Date')).reset_index()
+    co2_annual['Year'] = co2_annual['Date'].dt.year
+    return co2_annual
+
+def _linear_trend(co2_annual):
+    fit = batched.ols(co2_annual['Year'].to_numpy(np.float64), co2_annual['CO2'].to_numpy(np.float64))
+    return fit.slope[0], fit.intercept[0]
+
+def compute_annual_co2(co2_df):
+    """Annual mean CO2 with its linear trend: (co2_annual, slope, intercept)"""
+    co2_annual = _annual_means(as_frame(co2_df))
+
+    # Linear trend calculation
+    slope, intercept = _linear_trend(co2_annual)
+    return co2_annual, slope, intercept
+
+# update_* functions take the previous output plus an input that only had
+# rows appended (from row `appended_from` on) and recompute just the affected
+# tail: every year/decade from the first appended date onwards.
+
+def update_annual_co2(previous_annual, co2_df, appended_from):
+    """Incremental compute_annual_co2 for an append-only CO2 frame"""
+    first_new = co2_df['Date'].iloc[appended_from:].min()
+    if pd.isna(first_new):
+        slope, intercept = _linear_trend(previous_annual)
+        return previous_annual, slope, intercept
+
+    year_start = pd.Timestamp(year=first_new.year, month=1, day=1)
+    tail_annual = _annual_means(co2_df[co2_df['Date'] >= year_start])
+    kept = previous_annual[previous_annual['Date'] < year_start]
+    co2_annual = pd.concat([kept, tail_annual[kept.columns]], ignore_index=True)
+
+    slope, intercept = _linear_trend(co2_annual)
+    return co2_annual, slope, intercept
+
+def update_decadal_temperature(previous_decadal, temp_df, appended_from):
+    """Incremental compute_decadal_temperature for an append-only temperature frame"""
+    first_new = temp_df['Date'].iloc[appended_from:].min()
+    if pd.isna(first_new):
+        return previous_decadal
+
+    decade_start = (first_new.year // 10) * 10
+    tail = temp_df[temp_df['Date'] >= pd.Timestamp(year=decade_start, month=1, day=1)]
+    kept = previous_decadal[previous_decadal['Decade'] < decade_start]
+    return pd.concat([kept, compute_decadal_temperature(tail)], ignore_index=True)
+
+def annual_correlations(annual):
+    """Correlation matrix of the annual means over the years every series covers"""
+    columns = ['Temperature', 'CO2', 'Sea Level']
+    series = annual.set_index('Date')[columns]
+    start = max(series[col].first_valid_index() for col in columns)
+    end = min(series[col].last_valid_index() for col in columns)
+    common = series.loc[start:end]
+    return pd.DataFrame(batched.pearson_matrix(common.to_numpy(), exact=True), index=columns, columns=columns)
+
+def compute_correlations(temp_df, co2_df, sea_df):
+    """Correlation matrix of the annual temperature, CO2 and sea level means"""
+    return annual_correlations(compute_annual_means(temp_df, co2_df, sea_df))
+
+def compute_co2_temp_regression(temp_df, co2_df):
+    """Regress temperature on CO2: (merged frame with Predicted, stats dict)"""
+    merged = as_frame(temp_df).merge(as_frame(co2_df), on='Date', how='inner')
+
+    fit = batched.ols(merged['CO2'].to_numpy(np.float64), merged['Temperature'].to_numpy(np.float64))
+    slope, intercept = fit.slope[0], fit.intercept[0]
+
+    # Create trend line
+    merged['Predicted'] = slope * merged['CO2'] + intercept
+    return merged, {
+        'slope': slope,
+        'intercept': intercept,
+        'r_squared': fit.rvalue[0]**2,
+        'p_value': fit.pvalue[0],
+        'std_err': fit.stderr[0]
+    }
+
+@instrumented
+def analyze_temperature(temp_df, output_dir=processed_path):
     try:
-        # Time series decomposition
-        temp_series = temp_df.set_index('Date')['Temperature']
-        decomposition = seasonal_decompose(temp_series.resample('YE').mean(), model='additive', period=10)
-        
         # Calculate decadal trends
-        temp_df['Decade'] = (temp_df['Date'].dt.year // 10) * 10
-        decadal_avg = temp_df.groupby('Decade')['Temperature'].mean().reset_index()
-        
+        decadal_avg = compute_decadal_temperature(temp_df)
+
         # Save results
-        decomposition.plot().savefig(os.path.join(processed_path, 'temp_decomposition.png'))
-        decadal_avg.to_csv(os.path.join(processed_path, 'decadal_temperature.csv'), index=False)
-        
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            # Drawn headless (charts.py), into output_dir/charts/temperature/
+            chart = Chart('temp_decomposition', 'decomposition', 'Temperature: 10-year seasonal decomposition',
+                          decomposition_frame(decompose_temperature(temp_df)))
+            render_charts({'temperature': [chart]}, os.path.join(output_dir, 'charts'), workers=1)
+            save_dataset(decadal_avg, output_dir, 'decadal_temperature')
+
         return decadal_avg
     except Exception as e:
+        log_exception(e)
         print(f"Error in temperature analysis: {str(e)}")
         return None
 
-def analyze_co2(co2_df):
+@instrumented
+def analyze_co2(co2_df, output_dir=processed_path):
     try:
-        # Calculate annual average
-        co2_annual = co2_df.resample('YE', on='Date').mean().reset_index()
-        
-        # Linear trend calculation
-        co2_annual['Year'] = co2_annual['Date'].dt.year
-        slope, intercept, _, _, _ = stats.linregress(co2_annual['Year'], co2_annual['CO2'])
-        
+        co2_annual, slope, intercept = compute_annual_co2(co2_df)
+
         # Save results
-        co2_annual.to_csv(os.path.join(processed_path, 'annual_co2.csv'), index=False)
+        if output_dir is not None:
+            save_dataset(co2_annual, output_dir, 'annual_co2')
         return slope, intercept
     except Exception as e:
+        log_exception(e)
         print(f"Error in CO2 analysis: {str(e)}")
         return None, None
 
-def calculate_correlations(temp_df, co2_df, sea_df):
+@instrumented
+def calculate_correlations(temp_df, co2_df, sea_df, output_dir=processed_path):
     try:
-        # Prepare dataframes
-        temp_annual = temp_df.resample('YE', on='Date').mean().reset_index()
-        co2_annual = co2_df.resample('YE', on='Date').mean().reset_index()
-        sea_level_annual = sea_df.resample('YE', on='Date').mean().reset_index()
-        
-        # Merge datasets
-        merged = temp_annual.merge(co2_annual, on='Date').merge(sea_level_annual, on='Date')
-        
-        # Calculate correlation matrix
-        corr_matrix = merged[['Temperature', 'CO2', 'Sea Level']].corr()
-        
+        corr_matrix = compute_correlations(temp_df, co2_df, sea_df)
+
         # Save results
-        corr_matrix.to_csv(os.path.join(processed_path, 'correlation_matrix.csv'))
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            corr_matrix.to_csv(os.path.join(output_dir, 'correlation_matrix.csv'))
         return corr_matrix
     except Exception as e:
+        log_exception(e)
         print(f"Error in correlation calculation: {str(e)}")
         return None
 
-def co2_temp_regression(temp_df, co2_df):
+@instrumented
+def co2_temp_regression(temp_df, co2_df, output_dir=processed_path):
     try:
-        # Merge CO2 and Temperature data
-        merged = temp_df.merge(co2_df, on='Date', how='inner')
-        
-        # Calculate linear regression
-        slope, intercept, r_value, p_value, std_err = stats.linregress(
-            merged['CO2'], merged['Temperature']
-        )
-        
-        # Create trend line
-        merged['Predicted'] = slope * merged['CO2'] + intercept
-        
+        merged, results = compute_co2_temp_regression(temp_df, co2_df)
+
         # Save results
-        merged.to_csv(os.path.join(processed_path, 'co2_temp_regression.csv'), index=False)
-        return {
-            'slope': slope,
-            'intercept': intercept,
-            'r_squared': r_value**2,
-            'p_value': p_value,
-            'std_err': std_err
-        }
+        if output_dir is not None:
+            save_dataset(merged, output_dir, 'co2_temp_regression')
+        return results
     except Exception as e:
+        log_exception(e)
         print(f"Error in regression analysis: {str(e)}")
         return None
 
 if __name__ == "__main__":
     data = load_data()
-    
+
     print("Analyzing temperature trends...")
     temp_results = analyze_temperature(data['temperature'])
-    
+
     print("\nAnalyzing CO2 trends...")
     co2_slope, co2_intercept = analyze_co2(data['co2'])
-    
+
     print("\nCalculating correlations...")
     correlations = calculate_correlations(data['temperature'], data['co2'], data['sea_level'])
-    
+
     print("\nRunning CO2-Temperature regression...")
     regression_results = co2_temp_regression(data['temperature'], data['co2'])
-    
+
     if all([temp_results is not None, co2_slope is not None, correlations is not None, regression_results is not None]):
         print("\nAnalysis complete!")
         print(f"CO2 annual increase rate: {co2_slope:.2f} ppm/year")
         print(f"CO2-Temperature R-squared: {regression_results['r_squared']:.3f}")
         print(f"Files saved to: {processed_path}")
     else:
-        print("\nAnalysis completed with some errors. Check output files.")
\ No newline at end of file
+        print("\nAnalysis completed with some errors. Check output files.")
@@ -0,0 +1,254 @@
+import os
+import io
+import json
+import time
+import hashlib
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Non-interactive backend before anything imports pyplot: rendering never
+# needs a display and never blocks on a GUI event loop
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from analysis import batched
+from incremental import load_manifest, save_manifest
+from storage import load_dataset
+
+# Headless chart rendering for the dashboard.
+#
+# A Chart is a name, a kind ('decomposition' or 'trend'), a title and the
+# small frame it plots (indexed by year-end date). The numeric work (annual means,
+# decompositions, trends) is done up front with the batched engine; drawing
+# runs on a process pool of its own, so figures never hold up the analysis.
+# Charts are written under <charts dir>/<group>/<name>.<format> in any of
+# FORMATS (png, compact svg with text kept as text, lossy webp), with:
+#   _charts.json  - fingerprint of every written file (data, kind, title,
+#                   format, dpi and STYLE_VERSION); a chart whose
+#                   fingerprint is unchanged is not drawn again
+#   index.json    - the charts by group with their files, for the dashboard
+# Bump STYLE_VERSION when the drawing code changes so everything redraws.
+
+Chart = namedtuple('Chart', ['name', 'kind', 'title', 'data'])
+
+FORMATS = ('png', 'svg', 'webp')
+STYLE_VERSION = 1
+MANIFEST_NAME = '_charts.json'
+WEBP_QUALITY = 80
+# Years the series and region decompositions repeat over
+DECOMPOSITION_PERIOD = 10
+
+# Fixed margins instead of tight_layout, which measures every tick label
+# and took about half of the drawing time
+MARGINS = {'left': 0.14, 'right': 0.97, 'top': 0.93, 'bottom': 0.07}
+
+SERIES_UNITS = {'Temperature': 'Temperature anomaly (°C)', 'CO2': 'CO2 (ppm)', 'Sea Level': 'Sea level (mm)'}
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    # Text stays text in SVGs (a fraction of the size of glyph paths), with
+    # stable element ids so an unchanged chart gives an unchanged file
+    plt.rcParams.update({'svg.fonttype': 'none', 'svg.hashsalt': 'skypulse'})
+    return plt
+
+def decomposition_frame(result):
+    """observed/trend/seasonal/resid columns of a seasonal decomposition result"""
+    return pd.DataFrame({part: getattr(result, part) for part in ('observed', 'trend', 'seasonal', 'resid')})
+
+# Each worker keeps one figure per kind and only swaps the data, titles and
+# limits for the next chart: building the axes and ticks from scratch cost
+# about a third of the drawing time
+_FIGURES = {}
+
+def _decomposition_figure(plt):
+    fig, axes = plt.subplots(4, 1, sharex=True, figsize=(8, 6.5))
+    lines = {}
+    for ax, part in zip(axes, ('observed', 'trend', 'seasonal', 'resid')):
+        if part == 'resid':
+            lines[part], = ax.plot([], [], marker='o', linestyle='none', markersize=3)
+            ax.axhline(0, color='grey', linewidth=0.8)
+        else:
+            lines[part], = ax.plot([], [])
+        ax.set_ylabel(part.capitalize() if part != 'resid' else 'Residual')
+    fig.subplots_adjust(**MARGINS, hspace=0.15)
+    return fig, axes, lines
+
+def _trend_figure(plt):
+    fig, ax = plt.subplots(figsize=(8, 3.5))
+    lines = {'value': ax.plot([], [], marker='o', markersize=3, label='Annual')[0],
+             'fit': ax.plot([], [], linestyle='--', label='Linear trend')[0]}
+    ax.legend(loc='upper left')
+    fig.subplots_adjust(**dict(MARGINS, top=0.9, bottom=0.12))
+    return fig, [ax], lines
+
+FIGURES = {'decomposition': _decomposition_figure, 'trend': _trend_figure}
+
+def _draw(plt, chart):
+    if chart.kind not in _FIGURES:
+        _FIGURES[chart.kind] = FIGURES[chart.kind](plt)
+    fig, axes, lines = _FIGURES[chart.kind]
+    # Annual points: plain years on the x axis, no date conversion
+    years = chart.data.index.year.to_numpy()
+    for column, line in lines.items():
+        line.set_data(years, chart.data[column].to_numpy())
+    for ax in axes:
+        ax.relim()
+        ax.autoscale_view()
+    axes[0].set_title(chart.title)
+    return fig
+
+def _save(fig, path, fmt, dpi):
+    if fmt == 'webp':
+        # Via Pillow (a matplotlib dependency) so the quality can be set
+        from PIL import Image
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+        buffer.seek(0)
+        Image.open(buffer).save(path + '.tmp', format='WEBP', quality=WEBP_QUALITY, method=6)
+    else:
+        metadata = {'Date': None} if fmt == 'svg' else {'Software': None}
+        fig.savefig(path + '.tmp', format=fmt, dpi=dpi, metadata=metadata)
+    os.replace(path + '.tmp', path)
+
+def _render(job):
+    """Draw one chart and save it in every requested format (runs in a worker)"""
+    chart, paths, dpi = job
+    fig = _draw(_pyplot(), chart)
+    for fmt, path in paths.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _save(fig, path, fmt, dpi)
+    return list(paths.values())
+
+def chart_fingerprint(chart, fmt, dpi):
+    """sha256 of everything a chart file depends on"""
+    digest = hashlib.sha256(json.dumps([chart.kind, chart.title, fmt, dpi, STYLE_VERSION,
+                                        [str(c) for c in chart.data.columns]]).encode())
+    digest.update(pd.util.hash_pandas_object(chart.data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def render_charts(charts, output_dir, formats=('png',), workers=None, dpi=100, force=False):
+    """Write {group: [Chart]} under output_dir, redrawing only charts whose fingerprint changed.
+
+    Stale drawings run on a pool of `workers` processes (one per CPU by
+    default, inline with workers=1). Files of charts no longer produced are
+    removed. Returns the index written to index.json.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown chart formats {sorted(unknown)}. Available: {FORMATS}")
+    start = time.perf_counter()
+    previous = load_manifest(output_dir, MANIFEST_NAME)
+    manifest, index, jobs = {}, {}, []
+    for group, group_charts in charts.items():
+        index[group] = []
+        for chart in group_charts:
+            files, stale = {}, {}
+            for fmt in formats:
+                file_name = f"{group}/{chart.name}.{fmt}"
+                files[fmt] = file_name
+                manifest[file_name] = chart_fingerprint(chart, fmt, dpi)
+                path = os.path.join(output_dir, file_name)
+                if force or previous.get(file_name) != manifest[file_name] or not os.path.exists(path):
+                    stale[fmt] = path
+            if stale:
+                jobs.append((chart, stale, dpi))
+            index[group].append({'name': chart.name, 'kind': chart.kind, 'title': chart.title, 'files': files})
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        for job in jobs:
+            _render(job)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            # Chunks amortize sending the small frames over many charts
+            list(pool.map(_render, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+    for file_name in set(previous) - set(manifest):
+        path = os.path.join(output_dir, file_name)
+        if os.path.exists(path):
+            os.remove(path)
+    save_manifest(output_dir, manifest, MANIFEST_NAME)
+    with open(os.path.join(output_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    total = sum(len(group_charts) for group_charts in index.values())
+    print(f"Charts: {len(jobs)} of {total} drawn ({', '.join(formats)}), "
+          f"{total - len(jobs)} unchanged, in {time.perf_counter() - start:.2f}s")
+    return index
+
+# Chart builders: the numbers for every chart of a group in one batched pass
+
+def _trend_frame(dates, values, slope, intercept):
+    return pd.DataFrame({'value': values, 'fit': slope * dates.year + intercept}, index=dates)
+
+def series_charts(annual, period=DECOMPOSITION_PERIOD):
+    """Decomposition and trend charts of each series of an annual means frame (Date + one column per series)"""
+    annual = annual.set_index('Date')
+    charts = []
+    for column in annual.columns:
+        values = annual[column]
+        values = values.loc[values.first_valid_index():values.last_valid_index()]
+        name = column.lower().replace(' ', '_')
+        unit = SERIES_UNITS.get(column, column)
+        if len(values) > period and values.notna().all():
+            parts = batched.moving_average_decompose(values.to_numpy(), period)
+            frame = pd.DataFrame({part: getattr(parts, part)[:, 0] for part in parts._fields}, index=values.index)
+            charts.append(Chart(f"{name}_decomposition", 'decomposition',
+                                f"{unit}: {period}-year seasonal decomposition", frame))
+        fit = batched.ols(values.index.year.to_numpy(np.float64), values.to_numpy())
+        charts.append(Chart(f"{name}_trend", 'trend', f"{unit}: {fit.slope[0]:+.3g} per year",
+                            _trend_frame(values.index, values.to_numpy(), fit.slope[0], fit.intercept[0])))
+    return charts
+
+def region_charts(regional, trends, max_regions=None, period=DECOMPOSITION_PERIOD):
+    """Trend chart per region, plus a decomposition where the region has a complete record longer than `period`.
+
+    With max_regions only the regions with the largest total loss are drawn.
+    """
+    if max_regions is not None:
+        trends = trends.nlargest(max_regions, 'Total')
+    regions = trends['Region'].astype(str)
+    annual = batched.long_panel(regional[regional['Region'].astype(str).isin(set(regions))],
+                                'Region', 'Area_Deforested')
+    annual.columns = annual.columns.astype(str)
+    annual = annual[regions]
+
+    # One decomposition call for every region with a complete record
+    complete = annual.columns[annual.notna().all().to_numpy()] if len(annual) > period else annual.columns[:0]
+    decompositions = {}
+    if len(complete):
+        parts = batched.moving_average_decompose(annual[complete].to_numpy(), period)
+        for j, region in enumerate(complete):
+            decompositions[region] = pd.DataFrame({part: getattr(parts, part)[:, j] for part in parts._fields},
+                                                  index=annual.index)
+
+    charts = []
+    for region, slope, intercept in zip(regions, trends['Slope'], trends['Intercept']):
+        values = annual[region].dropna()
+        charts.append(Chart(f"{region}_trend", 'trend',
+                            f"{region} tree cover loss (ha): {slope:+,.0f} per year",
+                            _trend_frame(values.index, values.to_numpy(), slope, intercept)))
+        if region in decompositions:
+            charts.append(Chart(f"{region}_decomposition", 'decomposition',
+                                f"{region} tree cover loss (ha): {period}-year decomposition", decompositions[region]))
+    return charts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the trend and decomposition charts from the processed data")
+    parser.add_argument('processed_dir', help="data/processed directory (annual_means, regional_deforestation, ...)")
+    parser.add_argument('output_dir')
+    parser.add_argument('--formats', nargs='+', default=['png'], choices=FORMATS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-regions', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="redraw unchanged charts too")
+    args = parser.parse_args()
+
+    charts = {'series': series_charts(load_dataset(args.processed_dir, 'annual_means')),
+              'regions': region_charts(load_dataset(args.processed_dir, 'regional_deforestation'),
+                                       load_dataset(args.processed_dir, 'deforestation_trends'),
+                                       args.max_regions)}
+    render_charts(charts, args.output_dir, args.formats, args.workers, force=args.force)
@@ -0,0 +1,37 @@
+import os
+
+# Project locations shared by every script.
+#
+# The project root is the directory holding data/, frontend/ and scripts/.
+# It defaults to the checkout this file lives in and can be moved with
+# SKYPULSE_ROOT (the pipeline and the skypulse CLI set it from --root), so
+# the scripts run from any machine without editing path constants. This
+# module only uses the standard library: importing it costs nothing.
+
+DEFAULT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def project_root():
+    return os.environ.get('SKYPULSE_ROOT') or DEFAULT_ROOT
+
+def project_paths(root=None):
+    """Every data directory of the project under `root` (default: project_root())"""
+    root = root or project_root()
+    public_data = os.path.join(root, 'frontend', 'public', 'data')
+    return {
+        'raw': os.path.join(root, 'data', 'raw'),
+        'formatted': os.path.join(root, 'data', 'formatted'),
+        'cleaned': os.path.join(root, 'data', 'cleaned'),
+        'processed': os.path.join(root, 'data', 'processed'),
+        'predictions': os.path.join(root, 'data', 'predictions'),
+        'models': os.path.join(root, 'models'),
+        'logs': os.path.join(root, 'logs'),
+        'frontend_processed': os.path.join(public_data, 'processed'),
+        'frontend_predictions': os.path.join(public_data, 'predictions'),
+        'frontend_tiles': os.path.join(public_data, 'tiles'),
+        'frontend_charts': os.path.join(public_data, 'charts'),
+        'frontend_json': os.path.join(public_data, 'json'),
+    }
+
+def project_path(name, *parts):
+    """A directory from project_paths() (or a file under it)"""
+    return os.path.join(project_paths()[name], *parts)
@@ -0,0 +1,320 @@
+import os
+import sys
+import gzip
+import json
+import asyncio
+import hashlib
+import argparse
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import project_root
+from storage import load_dataset
+from tiles import dated_series, deforestation_totals, lttb
+
+# HTTP data service for the dashboard.
+#
+#   GET /api/series
+#   GET /api/data?series=co2&from=1990-01-01&to=1999-12-31&resolution=month&max_points=500
+#
+# The cleaned datasets (and the forecast store, as <model>:<series>) are
+# loaded once into sorted date/value arrays with their monthly and yearly
+# aggregates, so a query is two binary searches and a slice. resolution is
+# full, month, year or auto (the dashboard's choice for the span); full
+# slices can be LTTB-downsampled to max_points. Every body is compressed
+# once (gzip, and brotli when installed) and cached by the rows it covers,
+# with a strong ETag per encoding and Cache-Control, so a client that
+# already has the data gets a 304. The files are re-checked every
+# --reload-interval seconds and changed ones are reloaded. ETags hash the
+# body, so they only change when the data a query covers does.
+
+PROJECT_ROOT = project_root()
+
+# series -> (data directory, dataset, function turning the frame into a dated series)
+SOURCES = {
+    'temperature': ('cleaned', 'cleaned_temperature', lambda df: dated_series(df, 'Temperature')),
+    'co2': ('cleaned', 'cleaned_co2', lambda df: dated_series(df, 'CO2')),
+    'sea_level': ('cleaned', 'cleaned_sea_level', lambda df: dated_series(df, 'Sea Level')),
+    'deforestation': ('cleaned', 'cleaned_deforestation', deforestation_totals),
+}
+FORECASTS = ('predictions', 'forecasts')
+
+RESOLUTIONS = {'year': 'Y', 'month': 'M'}
+CACHE_CONTROL = 'public, max-age=60, must-revalidate'
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 512
+
+# Dates (datetime64[D]) and values of one resolution, sorted by date
+Level = namedtuple('Level', ['dates', 'values', 'low', 'high', 'count'])
+
+def build_levels(series):
+    """Full-resolution arrays of a dated series plus its month and year aggregates"""
+    series = series.dropna().sort_index()
+    levels = {'full': Level(series.index.values.astype('datetime64[D]'), series.to_numpy(np.float64),
+                            None, None, None)}
+    for name, freq in RESOLUTIONS.items():
+        stats = series.groupby(series.index.to_period(freq)).agg(['mean', 'min', 'max', 'count'])
+        levels[name] = Level(stats.index.start_time.values.astype('datetime64[D]'),
+                             stats['mean'].to_numpy(np.float64), stats['min'].to_numpy(np.float64),
+                             stats['max'].to_numpy(np.float64), stats['count'].to_numpy(np.int64))
+    return levels
+
+def auto_resolution(span_days):
+    """Same thresholds as the dashboard's levelForSpan"""
+    years = span_days / 365.25
+    if years > 40:
+        return 'year'
+    if years > 4:
+        return 'month'
+    return 'full'
+
+def _file_state(directory, name):
+    """(path, mtime, size) of the file a dataset loads from, or None"""
+    for extension in ('.parquet', '.csv'):
+        path = os.path.join(directory, name + extension)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            return path, stat.st_mtime_ns, stat.st_size
+    return None
+
+class DataStore:
+    """Indexed series of one project root, reloaded when their files change"""
+
+    def __init__(self, root=PROJECT_ROOT, cache_entries=4096):
+        self.root = root
+        self.cache_entries = cache_entries
+        self.series = {}
+        self._files = {}
+        self._cache = OrderedDict()
+
+    def _dataset_files(self):
+        files = {}
+        for directory, name in [source[:2] for source in SOURCES.values()] + [FORECASTS]:
+            files[name] = _file_state(os.path.join(self.root, 'data', directory), name)
+        return files
+
+    def load_changes(self):
+        """Load the datasets whose files changed, leaving the served state alone.
+
+        Returns (files, series, cache, reloaded names) for swap(), or None
+        if nothing changed. Only reads the store, so it can run in a thread
+        while requests are served.
+        """
+        files = self._dataset_files()
+        changed = {name for name, state in files.items() if state != self._files.get(name)}
+        if not changed:
+            return None
+        series = dict(self.series)
+        reloaded = []
+        for series_name, (directory, name, to_series) in SOURCES.items():
+            if name in changed:
+                if files[name] is None:
+                    series.pop(series_name, None)
+                    continue
+                df = load_dataset(os.path.join(self.root, 'data', directory), name)
+                series[series_name] = build_levels(to_series(df))
+                reloaded.append(series_name)
+        if FORECASTS[1] in changed and files[FORECASTS[1]] is not None:
+            store = load_dataset(os.path.join(self.root, 'data', FORECASTS[0]), FORECASTS[1])
+            for (series_name, model), rows in store.groupby(['Series', 'Model'], observed=True):
+                rows = rows[rows['Horizon'] == rows['Horizon'].max()]
+                series[f"{model}:{series_name}"] = build_levels(dated_series(rows, 'Predicted'))
+                reloaded.append(f"{model}:{series_name}")
+        # Cached bodies of the reloaded series are stale: start a new cache
+        # with the whole-series responses compressed up front
+        cache = OrderedDict()
+        for name in series:
+            for resolution in series[name]:
+                self._query(series, cache, name, resolution=resolution)
+        return files, series, cache, reloaded
+
+    def swap(self, changes):
+        """Serve the state load_changes() built; returns the reloaded series names"""
+        self._files, self.series, self._cache, reloaded = changes
+        return reloaded
+
+    def refresh(self):
+        """Reload datasets whose files changed; returns the names of the reloaded series"""
+        changes = self.load_changes()
+        return self.swap(changes) if changes else []
+
+    def catalog(self):
+        rows = []
+        for name, levels in sorted(self.series.items()):
+            full = levels['full']
+            rows.append({'series': name, 'rows': len(full.dates),
+                         'from': str(full.dates[0]) if len(full.dates) else None,
+                         'to': str(full.dates[-1]) if len(full.dates) else None,
+                         'resolutions': ['full'] + list(RESOLUTIONS)})
+        return rows
+
+    def query(self, name, start=None, end=None, resolution='auto', max_points=None):
+        """Cached Response for a range query; raises KeyError / ValueError for bad parameters"""
+        return self._query(self.series, self._cache, name, start, end, resolution, max_points)
+
+    def _query(self, series, cache, name, start=None, end=None, resolution='auto', max_points=None):
+        levels = series[name]
+        full = levels['full']
+        lo = 0 if start is None else int(np.searchsorted(full.dates, start, side='left'))
+        hi = len(full.dates) if end is None else int(np.searchsorted(full.dates, end, side='right'))
+        if resolution == 'auto':
+            span = (full.dates[hi - 1] - full.dates[lo]).astype(int) if hi > lo else 0
+            resolution = auto_resolution(span)
+        if resolution not in levels:
+            raise ValueError(f"unknown resolution '{resolution}'")
+        level = levels[resolution]
+        if resolution != 'full':
+            # The bucket the range starts in and every bucket starting inside it
+            lo = 0 if start is None else max(int(np.searchsorted(level.dates, start, side='right')) - 1, 0)
+            hi = len(level.dates) if end is None else int(np.searchsorted(level.dates, end, side='right'))
+            max_points = None
+
+        # Queries covering the same rows share one cached response
+        key = (name, resolution, lo, hi, max_points)
+        response = cache.get(key)
+        if response is None:
+            response = self._render(name, resolution, level, lo, hi, max_points)
+            cache[key] = response
+            while len(cache) > self.cache_entries:
+                cache.popitem(last=False)
+        cache.move_to_end(key)
+        return response
+
+    def _render(self, name, resolution, level, lo, hi, max_points):
+        dates, values = level.dates[lo:hi], level.values[lo:hi]
+        payload = {'series': name, 'resolution': resolution}
+        if resolution == 'full':
+            if max_points and len(dates) > max_points:
+                kept = lttb(dates.astype(np.int64), values, max_points)
+                dates, values = dates[kept], values[kept]
+            payload.update({'date': dates.astype(str).tolist(), 'value': np.round(values, 4).tolist()})
+        else:
+            payload.update({'date': dates.astype(str).tolist(), 'mean': np.round(values, 4).tolist(),
+                            'min': np.round(level.low[lo:hi], 4).tolist(),
+                            'max': np.round(level.high[lo:hi], 4).tolist(),
+                            'n': level.count[lo:hi].tolist()})
+        return encode(json.dumps(payload, separators=(',', ':')).encode())
+
+# A rendered body in each encoding with its strong ETags
+Response = namedtuple('Response', ['etag', 'bodies'])
+
+def encode(body):
+    """Compress a body once per encoding; ETags differ per encoding as RFC 9110 requires for strong tags"""
+    # The tag is a hash of the content, so rewriting identical data keeps it
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    bodies = {'identity': (f'"{digest}"', body)}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        bodies['gzip'] = (f'"{digest}-gz"', gzip.compress(body, compresslevel=6, mtime=0))
+        if brotli is not None:
+            bodies['br'] = (f'"{digest}-br"', brotli.compress(body, quality=5))
+    return Response(digest, bodies)
+
+def _accepted(accept_encoding):
+    """Codings of an Accept-Encoding header, without those refused with q=0"""
+    accepted = set()
+    for token in accept_encoding.split(','):
+        coding, _, weight = token.partition(';')
+        if weight.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def send(request, response):
+    """304 if the client's ETag matches, otherwise the best encoding the client accepts"""
+    accepted = _accepted(request.headers.get('Accept-Encoding', ''))
+    encoding = next((e for e in ('br', 'gzip') if e in accepted and e in response.bodies), 'identity')
+    etag, body = response.bodies[encoding]
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+
+    # Any representation of the same data counts as a match
+    if_none_match = request.headers.get('If-None-Match', '')
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if '*' in tags or any(tag.strip('"').split('-')[0] == response.etag for tag in tags if tag):
+        return web.Response(status=304, headers=headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return web.Response(body=body, headers=headers, content_type='application/json')
+
+def _error(status, message):
+    return web.json_response({'error': message}, status=status)
+
+def _date_param(query, name):
+    value = query.get(name)
+    if not value:
+        return None
+    try:
+        return np.datetime64(pd.Timestamp(value).date(), 'D')
+    except ValueError:
+        raise ValueError(f"'{name}' is not a date: {value!r}")
+
+async def series_handler(request):
+    store = request.app['store']
+    return send(request, encode(json.dumps(store.catalog(), separators=(',', ':')).encode()))
+
+async def data_handler(request):
+    store = request.app['store']
+    query = request.query
+    name = query.get('series')
+    if name not in store.series:
+        return _error(404, f"unknown series {name!r}; see /api/series")
+    try:
+        start, end = _date_param(query, 'from'), _date_param(query, 'to')
+        if start is not None and end is not None and start > end:
+            raise ValueError("'from' is after 'to'")
+        max_points = int(query['max_points']) if query.get('max_points') else None
+        response = store.query(name, start, end, query.get('resolution', 'auto'), max_points)
+    except ValueError as e:
+        return _error(400, str(e))
+    return send(request, response)
+
+async def _watch(app):
+    """Re-check the dataset files in the background"""
+    store, interval = app['store'], app['reload_interval']
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Load in a thread, then swap the new state in on the loop so
+            # handlers never see the series or cache half-updated
+            changes = await asyncio.get_running_loop().run_in_executor(None, store.load_changes)
+            reloaded = store.swap(changes) if changes else []
+            if reloaded:
+                print(f"Reloaded: {', '.join(reloaded)}")
+        except Exception as e:
+            print(f"Reload failed: {e}")
+
+async def _start_watch(app):
+    app['watch'] = asyncio.create_task(_watch(app))
+
+async def _stop_watch(app):
+    app['watch'].cancel()
+
+def make_app(root=PROJECT_ROOT, reload_interval=5.0):
+    store = DataStore(root)
+    print(f"Loaded {len(store.refresh())} series from {os.path.join(root, 'data')}")
+    app = web.Application()
+    app['store'] = store
+    app['reload_interval'] = reload_interval
+    app.router.add_get('/api/series', series_handler)
+    app.router.add_get('/api/data', data_handler)
+    if reload_interval:
+        app.on_startup.append(_start_watch)
+        app.on_cleanup.append(_stop_watch)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the cleaned datasets and forecasts over HTTP")
+    parser.add_argument('--root', default=PROJECT_ROOT, help="project root holding data/")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--reload-interval', type=float, default=5.0,
+                        help="seconds between checks for changed data files (0 disables)")
+    args = parser.parse_args()
+    web.run_app(make_app(args.root, args.reload_interval), host=args.host, port=args.port,
+                access_log=None)
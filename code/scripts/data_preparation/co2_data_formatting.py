@@ -1,29 +1,26 @@
-import pandas as pd
-from datetime import datetime, timedelta
+import os
+import sys
 
-# Function to convert decimal year to date
-def decimal_year_to_date(decimal_year):
-    year = int(decimal_year)
-    remainder = decimal_year - year
-    start = datetime(year, 1, 1)
-    days = (start.replace(year=year + 1) - start).days * remainder
-    date = start + timedelta(days=days)
-    return date.strftime("%Y-%m-%d")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import project_path
+from data_preparation.decimal_year import decimal_year_to_datetime64
+from data_preparation.streaming import stream_format
 
 # Define input and output file paths
-input_file = r"E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\raw\co2_emissions.csv"
-output_file = r"E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\formatted\co2_reformatted.csv"
+input_file = project_path('raw', 'co2_emissions.csv')
+output_file = project_path('formatted', 'co2_reformatted.csv')
 
-# Load the dataset
-df = pd.read_csv(input_file)
+# Streaming formatter plug-in settings (see streaming.py)
+# comment: the NOAA download starts with '#' header lines
+READ_OPTIONS = {"usecols": ["decimal date", "average"], "comment": "#"}
+OUTPUT_FORMAT = "csv"
 
-# Convert decimal date to YYYY-MM-DD
-df["Date"] = df["decimal date"].apply(decimal_year_to_date)
+def transform_chunk(chunk):
+    """Convert decimal date to YYYY-MM-DD and keep the CO2 average"""
+    return chunk.assign(Date=decimal_year_to_datetime64(chunk["decimal date"]))[
+        ["Date", "average"]
+    ].rename(columns={"average": "CO2"})
 
-# Extract relevant columns and rename
-result = df[["Date", "average"]].rename(columns={"average": "CO2"})
-
-# Save the cleaned data to CSV
-result.to_csv(output_file, index=False)
-
-print(f"Data successfully reformatted and saved to {output_file}")
+if __name__ == "__main__":
+    stream_format(input_file, output_file, transform_chunk, READ_OPTIONS, OUTPUT_FORMAT)
+    print(f"Data successfully reformatted and saved to {output_file}")
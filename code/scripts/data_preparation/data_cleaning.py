@@ -1,118 +1,159 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
-from scipy.stats import zscore
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import project_path
+from storage import save_dataset
+from instrumentation import instrumented, log_exception
+from data_preparation.outliers import remove_outliers
+from analysis.regional import region_iqr_mask, region_index, valid_region_mask
 
 # Define paths
-# PROCESSED_DATA_PATH = "e:/College Hackathon/CLIMATE CHANGE ANALYSIS/data/processed/"
-CLEANED_DATA_PATH = "e:/College Hackathon/CLIMATE CHANGE ANALYSIS/data/cleaned/"
-os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
+CLEANED_DATA_PATH = project_path('cleaned')
+
+# The clean_*_frame functions take an already loaded DataFrame (with a
+# datetime 'Date' column where applicable) and return the cleaned frame, so
+# the pipeline runner can hand data between stages without touching disk.
+# The clean_*_data functions keep the file-based behaviour of this script.
+#
+# Every clean_* function takes `outliers`, the options of the rolling outlier
+# engine (data_preparation/outliers.py), e.g.
+#   {'window': '30D', 'method': 'mad', 'threshold': 3.5, 'group_col': 'Mission'}
+# applied after the dataset's own rules. None uses the dataset's default
+# (sea level: 3 sigma from the trailing 30-day window, no rolling filter for
+# the others) and False turns the rolling filter off.
+
+SEA_LEVEL_OUTLIERS = {'window': '30D', 'method': 'zscore', 'threshold': 3.0}
+
+def _rolling_outliers(df, value_col, outliers, default=None):
+    """Drop the rows the rolling outlier engine flags"""
+    outliers = default if outliers is None else outliers
+    if not outliers:
+        return df
+    options = dict(outliers)
+    # Frames indexed by Date use the index as the window axis
+    if df.index.name == 'Date':
+        options.setdefault('on', None)
+    return remove_outliers(df, value_col, **options)
+
+def clean_co2_frame(df, outliers=None):
+    """Interpolate gaps and drop physically impossible CO2 values"""
+    # Set 'Date' column as the index
+    df = df.set_index('Date')
+
+    # Handle missing values with time-based interpolation
+    df['CO2'] = df['CO2'].interpolate(method='time')
+
+    # Remove physically impossible values (modern CO2 range: 300-5000 ppm)
+    df = df[(df['CO2'] > 250) & (df['CO2'] < 5000)]
+    return _rolling_outliers(df, 'CO2', outliers)
+
+def clean_deforestation_frame(df, outliers=None, regions=None):
+    """Keep valid regions and drop negative values and per-region IQR outliers"""
+    # Region codes as a categorical index; ISO3 or GADM ids (optionally only `regions`)
+    df = df.assign(Region=region_index(df['Region']))
+    df = df[valid_region_mask(df['Region'], regions)]
+
+    # Remove negative deforestation values
+    df = df[df['Area_Deforested'] >= 0]
+
+    # Handle outliers using IQR within each region (a country's loss is
+    # judged against its own years, not against every other country)
+    df = df[~region_iqr_mask(df, 'Area_Deforested', 'Region')]
+    df = df.assign(Region=df['Region'].cat.remove_unused_categories())
+    return _rolling_outliers(df, 'Area_Deforested', outliers)
+
+def clean_sea_level_frame(df, outliers=None):
+    """Interpolate gaps and drop values more than 3 sigma from the rolling mean"""
+    # Set 'Date' column as the index
+    df = df.set_index('Date')
+
+    # Convert empty strings to NaN and interpolate
+    df['Sea Level'] = pd.to_numeric(df['Sea Level'], errors='coerce')
+    df['Sea Level'] = df['Sea Level'].interpolate(method='time')
 
-def clean_co2_data(file_path):
+    # Remove extreme outliers (±3σ from the trailing 30-day window; the feed
+    # has several passes per day, so the window is by time, not by rows)
+    return _rolling_outliers(df, 'Sea Level', outliers, default=SEA_LEVEL_OUTLIERS)
+
+def clean_temperature_frame(df, outliers=None):
+    """Interpolate gaps and drop values outside the plausible anomaly range"""
+    # Set 'Date' column as the index
+    df = df.set_index('Date')
+
+    # Handle missing values with time-based interpolation
+    df['Temperature'] = df['Temperature'].interpolate(method='time')
+
+    # Remove physically impossible values (global temperature anomaly range)
+    df = df[(df['Temperature'] > -5) & (df['Temperature'] < 5)]
+    return _rolling_outliers(df, 'Temperature', outliers)
+
+@instrumented
+def clean_co2_data(file_path, outliers=None):
     """Clean CO2 dataset with enhanced outlier detection and date handling"""
     try:
-        df = pd.read_csv(file_path, parse_dates=['Date'])
-        
-        # Set 'Date' column as the index
-        df.set_index('Date', inplace=True)
-        
-        # Handle missing values with time-based interpolation
-        df['CO2'] = df['CO2'].interpolate(method='time')
-        
-        # Remove physically impossible values (modern CO2 range: 300-5000 ppm)
-        df = df[(df['CO2'] > 250) & (df['CO2'] < 5000)]
-        
+        df = clean_co2_frame(pd.read_csv(file_path, parse_dates=['Date']), outliers)
+
         # Save cleaned data
-        df.to_csv(os.path.join(CLEANED_DATA_PATH, "cleaned_co2.csv"))
+        save_dataset(df.reset_index(), CLEANED_DATA_PATH, "cleaned_co2")
         print("CO2 data cleaned successfully. Records:", len(df))
-        
+        return df
+
     except Exception as e:
+        log_exception(e)
         print(f"Error cleaning CO2 data: {str(e)}")
 
-def clean_deforestation_data(file_path):
+@instrumented
+def clean_deforestation_data(file_path, outliers=None):
     """Clean deforestation data with regional validation and improved outlier handling"""
     try:
-        df = pd.read_json(file_path)
-        
-        # Validate regions (example using ISO3 country codes)
-        valid_regions = ['AGO', 'ARG', 'AUS', 'BDI', 'BES', 'BGD', 'BHS', 'BLZ', 'BOL', 'BRA', 'BRN'
-                         , 'BTN', 'CAF', 'CHN', 'CIV', 'CMR', 'COD', 'COG', 'COL', 'CRI', 'CUB', 'CYM',
-                         'DMA', 'DOM', 'ECU', 'ETH', 'FJI', 'GAB', 'GHA', 'GIN', 'GLP', 'GNB', 'GNQ', 'GTM',
-                         'GUF', 'GUY', 'HND', 'HTI', 'IDN', 'IND', 'JAM', 'KEN', 'KHM', 'KNA', 'LAO', 'LBR',
-                         'LCA', 'LKA', 'MAF', 'MDG', 'MDV', 'MEX', 'MMR', 'MOZ', 'MSR', 'MTQ', 'MWI', 'MYS',
-                         'NGA', 'NIC', 'NPL', 'PAN', 'PER', 'PHL', 'PLW', 'PNG', 'PRI', 'PRY', 'RWA', 'SLB',
-                         'SLE', 'SLV', 'SSD', 'SUR', 'SXM', 'TCA', 'TGO', 'THA', 'TTO', 'TWN', 'TZA', 'UGA',
-                         'USA', 'VCT', 'VEN', 'VGB', 'VIR', 'VNM', 'VUT', 'ZAF', 'ZMB', 'ZWE', 'BEN', 'SEN',
-                         'SGP', 'UMI', 'ABW', 'ATG', 'GMB']  # Add all valid codes
-                         
-        df = df[df['Region'].isin(valid_regions)]
-        
-        # Remove negative deforestation values
-        df = df[df['Area_Deforested'] >= 0]
-        
-        # Handle outliers using IQR (more robust for skewed data)
-        Q1 = df['Area_Deforested'].quantile(0.25)
-        Q3 = df['Area_Deforested'].quantile(0.75)
-        IQR = Q3 - Q1
-        df = df[~((df['Area_Deforested'] < (Q1 - 1.5 * IQR)) | 
-                 (df['Area_Deforested'] > (Q3 + 1.5 * IQR)))]
+        df = clean_deforestation_frame(pd.read_json(file_path), outliers)
 
         # Save cleaned data
-        df.to_csv(os.path.join(CLEANED_DATA_PATH, "cleaned_deforestation.csv"), index=False)
+        save_dataset(df, CLEANED_DATA_PATH, "cleaned_deforestation")
         print("Deforestation data cleaned successfully. Records:", len(df))
-        
+        return df
+
     except Exception as e:
+        log_exception(e)
         print(f"Error cleaning deforestation data: {str(e)}")
 
-def clean_sea_level_data(file_path):
+@instrumented
+def clean_sea_level_data(file_path, outliers=None):
     """Clean sea level data with enhanced missing value handling"""
     try:
-        df = pd.read_csv(file_path, parse_dates=['Date'])
-        
-        # Set 'Date' column as the index
-        df.set_index('Date', inplace=True)
-        
-        # Convert empty strings to NaN and interpolate
-        df['Sea Level'] = pd.to_numeric(df['Sea Level'], errors='coerce')
-        df['Sea Level'] = df['Sea Level'].interpolate(method='time')
-        
-        # Remove extreme outliers (±3σ from rolling 30-day mean)
-        rolling_mean = df['Sea Level'].rolling(window=30, min_periods=1).mean()
-        rolling_std = df['Sea Level'].rolling(window=30, min_periods=1).std()
-        df = df[abs(df['Sea Level'] - rolling_mean) < 3 * rolling_std]
-        
+        df = clean_sea_level_frame(pd.read_csv(file_path, parse_dates=['Date']), outliers)
+
         # Save cleaned data
-        df.to_csv(os.path.join(CLEANED_DATA_PATH, "cleaned_sea_level.csv"))
+        save_dataset(df.reset_index(), CLEANED_DATA_PATH, "cleaned_sea_level")
         print("Sea level data cleaned successfully. Records:", len(df))
-        
+        return df
+
     except Exception as e:
+        log_exception(e)
         print(f"Error cleaning sea level data: {str(e)}")
 
-def clean_temperature_data(file_path):
+@instrumented
+def clean_temperature_data(file_path, outliers=None):
     """Clean temperature data with improved date handling and validation"""
     try:
-        df = pd.read_csv(file_path, parse_dates=['Date'])
-        
-        # Set 'Date' column as the index
-        df.set_index('Date', inplace=True)
-        
-        # Handle missing values with time-based interpolation
-        df['Temperature'] = df['Temperature'].interpolate(method='time')
-        
-        # Remove physically impossible values (global temperature anomaly range)
-        df = df[(df['Temperature'] > -5) & (df['Temperature'] < 5)]
-        
+        df = clean_temperature_frame(pd.read_csv(file_path, parse_dates=['Date']), outliers)
+
         # Save cleaned data
-        df.to_csv(os.path.join(CLEANED_DATA_PATH, "cleaned_temperature.csv"))
+        save_dataset(df.reset_index(), CLEANED_DATA_PATH, "cleaned_temperature")
         print("Temperature data cleaned successfully. Records:", len(df))
-        
+        return df
+
     except Exception as e:
+        log_exception(e)
         print(f"Error cleaning temperature data: {str(e)}")
 
 if __name__ == "__main__":
     # Input paths
-    DATA_PATH = "e:/College Hackathon/CLIMATE CHANGE ANALYSIS/data/formatted/"
-    
+    DATA_PATH = project_path('formatted')
+
     # Clean all datasets
     clean_co2_data(os.path.join(DATA_PATH, "co2_reformatted.csv"))
     clean_deforestation_data(os.path.join(DATA_PATH, "deforestation.json"))
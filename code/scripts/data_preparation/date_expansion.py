@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Month columns of the wide GISTEMP-style tables (Year, Jan..Dec, ...)
+MONTH_COLUMNS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                 "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def month_starts(years, months):
+    """Build datetime64[D] first-of-month dates from paired year/month arrays"""
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    # datetime64[M] counts months since 1970-01
+    return ((years - 1970) * 12 + (months - 1)).astype("datetime64[M]").astype("datetime64[D]")
+
+def month_lengths(dates):
+    """Number of days in the month of each date (leap years handled by numpy)"""
+    months = np.asarray(dates).astype("datetime64[M]")
+    return ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+
+def expand_monthly_to_daily(dates, values):
+    """Repeat every monthly value on each day of its month.
+
+    Returns (daily_dates, daily_values) where daily_dates is datetime64[D].
+    Works on any number of value columns: `values` may be 1-D or (n_months, k).
+    """
+    starts = np.asarray(dates).astype("datetime64[M]").astype("datetime64[D]")
+    lengths = month_lengths(starts)
+
+    # Day offset inside each month: position in output minus start of its block
+    block_start = np.cumsum(lengths) - lengths
+    offsets = np.arange(lengths.sum()) - np.repeat(block_start, lengths)
+
+    daily_dates = np.repeat(starts, lengths) + offsets
+    daily_values = np.repeat(np.asarray(values), lengths, axis=0)
+    return daily_dates, daily_values
+
+def wide_monthly_to_long(df, value_name, year_col="Year", month_cols=MONTH_COLUMNS,
+                         id_cols=None, resolution="D"):
+    """Convert a wide Year x Jan..Dec table into a long Date/value frame.
+
+    The Jan..Dec block is read as one (n_rows, 12) array, so no melt/explode
+    is needed. resolution="M" emits one row per month (first-of-month dates),
+    resolution="D" repeats each monthly value on every day of the month.
+    Optional id_cols (station, grid cell, ...) are carried along and the
+    output is sorted by id then date.
+    """
+    if resolution not in ("D", "M"):
+        raise ValueError(f"Unsupported resolution: {resolution!r} (use 'D' or 'M')")
+    id_cols = list(id_cols or [])
+
+    # Drop rows without a usable year and order chronologically per id
+    years = pd.to_numeric(df[year_col], errors="coerce")
+    df = df[years.notna()].assign(**{year_col: years[years.notna()].astype(np.int64)})
+    df = df.sort_values(id_cols + [year_col], kind="stable")
+
+    n_rows, n_months = len(df), len(month_cols)
+    years = df[year_col].to_numpy(dtype=np.int64)
+    # Non-numeric placeholders such as "***" become NaN
+    values = df[month_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+
+    month_numbers = np.arange(1, n_months + 1)
+    dates = month_starts(np.repeat(years, n_months), np.tile(month_numbers, n_rows))
+    values = values.ravel()
+    row_index = np.repeat(np.arange(n_rows), n_months)
+
+    if resolution == "D":
+        lengths = month_lengths(dates)
+        dates, values = expand_monthly_to_daily(dates, values)
+        row_index = np.repeat(row_index, lengths)
+
+    result = {col: df[col].to_numpy()[row_index] for col in id_cols}
+    result["Date"] = dates.astype("datetime64[ns]")
+    result[value_name] = values
+    return pd.DataFrame(result)
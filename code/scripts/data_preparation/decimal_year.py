@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# Decimal-year <-> datetime64 conversion shared by the decimal-date feeds
+# (NOAA CO2 "decimal date", ice-core CO2, satellite altimetry).
+# A decimal year Y.f maps to Jan 1 of Y plus f * (days in Y), so leap years
+# stretch over 366 days exactly like the original per-row datetime code.
+
+_MICROSECONDS_PER_DAY = 86_400_000_000
+
+def _year_bounds(years):
+    """Start of each year and its length in days, as datetime64[us] and int64"""
+    starts = (years - 1970).astype("datetime64[Y]")
+    year_days = ((starts + 1).astype("datetime64[D]") - starts.astype("datetime64[D]")).astype(np.int64)
+    return starts.astype("datetime64[us]"), year_days
+
+def decimal_year_to_datetime64(decimal_years, unit="D"):
+    """Convert decimal years (e.g. 1958.2027) to datetime64 values.
+
+    Accepts scalars, NumPy arrays or pandas Series (a Series comes back as a
+    datetime Series with the same index). unit="D" truncates to the calendar
+    day, which matches the YYYY-MM-DD strings the CO2 formatter used to write;
+    finer units ("s", "ms", "us") keep the time of day. NaN maps to NaT.
+    """
+    index = decimal_years.index if isinstance(decimal_years, pd.Series) else None
+    values = np.asarray(decimal_years, dtype=np.float64)
+    valid = np.isfinite(values)
+    safe = np.where(valid, values, 1970.0)
+
+    years = np.floor(safe).astype(np.int64)
+    starts, year_days = _year_bounds(years)
+
+    # Offset rounded to whole microseconds, like datetime.timedelta(days=...)
+    offsets = np.rint(year_days * (safe - years) * _MICROSECONDS_PER_DAY).astype(np.int64)
+    result = (starts + offsets.astype("timedelta64[us]")).astype(f"datetime64[{unit}]")
+    result = np.where(valid, result, np.datetime64("NaT", unit))
+
+    if index is not None:
+        # pandas has no day unit; midnight timestamps print as plain dates
+        return pd.Series(result.astype("datetime64[s]" if unit == "D" else result.dtype), index=index)
+    return result
+
+def datetime64_to_decimal_year(dates):
+    """Convert datetime64 values (or a datetime Series) back to decimal years.
+
+    Inverse of decimal_year_to_datetime64: the fraction is the elapsed share
+    of the calendar year, so Jan 1 is Y.0 in both 365- and 366-day years.
+    """
+    index = dates.index if isinstance(dates, pd.Series) else None
+    values = np.asarray(dates, dtype="datetime64[us]")
+    valid = ~np.isnat(values)
+
+    years = values.astype("datetime64[Y]").astype(np.int64) + 1970
+    years = np.where(valid, years, 1970)
+    starts, year_days = _year_bounds(years)
+
+    elapsed = (values - starts).astype(np.int64)
+    result = years + elapsed / (year_days * _MICROSECONDS_PER_DAY)
+    result = np.where(valid, result, np.nan)
+
+    if index is not None:
+        return pd.Series(result, index=index)
+    return result
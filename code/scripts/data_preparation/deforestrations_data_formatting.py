@@ -1,27 +1,31 @@
-import csv
-import json
+import os
+import sys
 
-# Define the input and output file paths
-input_file = r'E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\raw\deforestation.csv'
-output_file = r'E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\formatted\deforestation_data.json'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import project_path
+from data_preparation.streaming import stream_format
 
-# Initialize an empty list to store the data
-data = []
+# Define the input and output file paths
+input_file = project_path('raw', 'deforestation.csv')
+output_file = project_path('formatted', 'deforestation_data.json')
 
-# Open and read the CSV file
-with open(input_file, mode='r', newline='') as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        # Extract relevant fields and convert to desired format
-        record = {
-            'Year': int(row['umd_tree_cover_loss__year']),
-            'Region': row['iso'],
-            'Area_Deforested': float(row['umd_tree_cover_loss__ha'])
-        }
-        data.append(record)
+# Streaming formatter plug-in settings (see streaming.py)
+READ_OPTIONS = {
+    "usecols": ["iso", "umd_tree_cover_loss__year", "umd_tree_cover_loss__ha"],
+    "dtype": {"iso": str, "umd_tree_cover_loss__year": "int64", "umd_tree_cover_loss__ha": "float64"},
+    "keep_default_na": False,
+    "float_precision": "round_trip",
+}
+OUTPUT_FORMAT = "json"
 
-# Write the data to a JSON file
-with open(output_file, mode='w') as jsonfile:
-    json.dump(data, jsonfile, indent=4)
+def transform_chunk(chunk):
+    """Extract relevant fields and rename them to Year/Region/Area_Deforested"""
+    return chunk.rename(columns={
+        'umd_tree_cover_loss__year': 'Year',
+        'iso': 'Region',
+        'umd_tree_cover_loss__ha': 'Area_Deforested',
+    })[['Year', 'Region', 'Area_Deforested']]
 
-print(f'Data has been successfully converted and saved to {output_file}.')
+if __name__ == "__main__":
+    stream_format(input_file, output_file, transform_chunk, READ_OPTIONS, OUTPUT_FORMAT)
+    print(f'Data has been successfully converted and saved to {output_file}.')
@@ -0,0 +1,249 @@
+import os
+import sys
+import bisect
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_preparation.streaming import DEFAULT_CHUNKSIZE, stream_format
+
+# Rolling-window outlier detection shared by the clean_* functions.
+#
+# A row is an outlier when it lies at least `threshold` spreads from the
+# centre of its trailing window:
+#   zscore - mean and sample standard deviation
+#   mad    - median and scaled median absolute deviation (robust to the
+#            outliers it is looking for)
+# The window is either a duration ('30D', over the `on` dates) or a row
+# count (int). Duration windows cover (t - window, t] and include every row
+# stamped t, so rows sharing a timestamp share one window whatever their
+# order in the file. With group_col the windows never cross groups (one
+# satellite mission or region does not judge another). Rows whose window
+# has fewer than min_periods values, or no spread at all, are never flagged.
+#
+# Both statistics are updated as the window slides (each row enters and
+# leaves once): mean/std through pandas' compensated online rolling
+# aggregations, median/MAD on a sorted window, exactly.
+#
+# OutlierFilter applies the same rule to a stream of chunks: it carries the
+# rows a later window can still reach, and holds back rows of the last
+# timestamp until the next chunk shows whether more rows share it, so
+# streamed results equal a single pass.
+
+MAD_SCALE = 1.4826  # MAD of a normal distribution -> its standard deviation
+
+METHODS = ('zscore', 'mad')
+
+def _is_count(window):
+    return isinstance(window, (int, np.integer))
+
+def _window_bounds(keys, window):
+    """[lo, hi) row range of each row's trailing window over sorted keys"""
+    n = len(keys)
+    if _is_count(window):
+        hi = np.arange(1, n + 1)
+        return np.maximum(hi - window, 0), hi
+    width = pd.Timedelta(window).value
+    return np.searchsorted(keys, keys - width, side='right'), np.searchsorted(keys, keys, side='right')
+
+def _zscore_stats(keys, values, window, hi):
+    """Mean, sample standard deviation and valid count of every window.
+
+    pandas' rolling aggregations update the window online (Kahan-compensated
+    sums and a Welford-style variance), so this is O(n) and stable. Its
+    window for row j stops at j, so each row reads the statistics of the
+    last row sharing its key, whose window is exactly (lo, hi).
+    """
+    if _is_count(window):
+        rolling = pd.Series(values).rolling(window, min_periods=1)
+    else:
+        rolling = pd.Series(values, index=pd.DatetimeIndex(keys)).rolling(pd.Timedelta(window), min_periods=1)
+    last = hi - 1
+    return (rolling.mean().to_numpy()[last], rolling.std().to_numpy()[last],
+            rolling.count().to_numpy().astype(np.int64)[last])
+
+def _kth_distance(window, split, center, k):
+    """k-th smallest |v - center| (0-based) over the sorted window.
+
+    Distances left of `split` grow leftwards and those right of it grow
+    rightwards, so this is the k-th element of two sorted runs, found by
+    binary search on how many come from the left run.
+    """
+    n_left, n_right = split, len(window) - split
+    low, high = max(0, k + 1 - n_right), min(k + 1, n_left)
+    while True:
+        i = (low + high) // 2
+        j = k + 1 - i
+        if i < n_left and j > 0 and window[split + j - 1] - center > center - window[split - 1 - i]:
+            low = i + 1
+        elif i > 0 and j < n_right and center - window[split - i] > window[split + j] - center:
+            high = i - 1
+        else:
+            left = center - window[split - i] if i > 0 else -np.inf
+            right = window[split + j - 1] - center if j > 0 else -np.inf
+            return max(left, right)
+
+def _mad_stats(values, lo, hi):
+    """Median, scaled MAD and valid count of every window.
+
+    The window is kept as a sorted list while it slides, so each row is
+    inserted and removed once; the median and MAD of a window are then
+    two lookups and a binary search. Rows sharing a window (same
+    timestamp) are computed once.
+    """
+    n = len(values)
+    center, spread, count = np.full(n, np.nan), np.full(n, np.nan), np.zeros(n, dtype=np.int64)
+    values, lo, hi = values.tolist(), lo.tolist(), hi.tolist()
+    window = []
+    start = stop = 0
+    previous = None
+    for row in range(n):
+        bounds = (lo[row], hi[row])
+        if bounds == previous:
+            center[row], spread[row], count[row] = center[row - 1], spread[row - 1], count[row - 1]
+            continue
+        previous = bounds
+        for value in values[stop:bounds[1]]:
+            if value == value:
+                bisect.insort(window, value)
+        for value in values[start:bounds[0]]:
+            if value == value:
+                del window[bisect.bisect_left(window, value)]
+        start, stop = bounds
+
+        size = len(window)
+        count[row] = size
+        if size == 0:
+            continue
+        mid = size // 2
+        median = window[mid] if size % 2 else (window[mid - 1] + window[mid]) / 2
+        split = bisect.bisect_left(window, median)
+        if size % 2:
+            mad = _kth_distance(window, split, median, mid)
+        else:
+            mad = (_kth_distance(window, split, median, mid - 1) + _kth_distance(window, split, median, mid)) / 2
+        center[row], spread[row] = median, MAD_SCALE * mad
+    return center, spread, count
+
+def outlier_mask(df, value_col, window='30D', method='zscore', threshold=3.0, on='Date',
+                 group_col=None, min_periods=2):
+    """Boolean array, True for the outlier rows of df (in df's row order).
+
+    on names the date column (None: the index) used by duration windows and
+    to order the rows; count windows follow the row order within each group.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method {method!r}. Available: {METHODS}")
+    n = len(df)
+    values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(np.float64)
+    if _is_count(window):
+        keys = np.arange(n, dtype=np.int64)
+    else:
+        dates = df.index if on is None else df[on]
+        keys = pd.DatetimeIndex(dates).as_unit('ns').asi8
+
+    # Rows ordered by group, then key (stable, so equal keys keep file order)
+    groups = (pd.factorize(df[group_col])[0] if group_col is not None else np.zeros(n, dtype=np.int64))
+    order = np.lexsort((keys, groups))
+    boundaries = np.flatnonzero(np.diff(groups[order])) + 1
+
+    flagged = np.zeros(n, dtype=bool)
+    for rows in np.split(order, boundaries):
+        lo, hi = _window_bounds(keys[rows], window)
+        if method == 'zscore':
+            center, spread, count = _zscore_stats(keys[rows], values[rows], window, hi)
+        else:
+            center, spread, count = _mad_stats(values[rows], lo, hi)
+        with np.errstate(invalid='ignore'):
+            flagged[rows] = ((count >= min_periods) & (spread > 0)
+                             & (np.abs(values[rows] - center) >= threshold * spread))
+    return flagged
+
+def remove_outliers(df, value_col, **options):
+    """df without the rows outlier_mask flags"""
+    return df[~outlier_mask(df, value_col, **options)]
+
+class OutlierFilter:
+    """remove_outliers for a stream of chunks, in time order (per group for count windows).
+
+    filter(chunk) returns the rows of the chunks seen so far that are
+    settled as kept; flush() returns the rest once the stream ends.
+    """
+
+    def __init__(self, value_col, window='30D', method='zscore', threshold=3.0, on='Date',
+                 group_col=None, min_periods=2):
+        self.value_col = value_col
+        self.options = dict(window=window, method=method, threshold=threshold, on=on,
+                            group_col=group_col, min_periods=min_periods)
+        # Already judged rows later windows can still reach, and rows not yet judged
+        self._context = None
+        self._pending = None
+
+    def _keys(self, df):
+        return df.index if self.options['on'] is None else df[self.options['on']]
+
+    def _run(self, chunk, final):
+        parts = [part for part in (self._context, self._pending, chunk) if part is not None]
+        if not parts:
+            return None
+        combined = pd.concat(parts) if len(parts) > 1 else parts[0]
+        if combined.empty:
+            return combined
+        n_context = 0 if self._context is None else len(self._context)
+        flagged = outlier_mask(combined, self.value_col, **self.options)
+        body, body_flagged = combined.iloc[n_context:], flagged[n_context:]
+
+        window = self.options['window']
+        if _is_count(window):
+            hold = np.zeros(len(body), dtype=bool)
+            group_col = self.options['group_col']
+            self._context = (combined.groupby(group_col, sort=False, observed=True).tail(window - 1)
+                             if group_col else combined.tail(window - 1))
+        else:
+            keys = pd.DatetimeIndex(self._keys(combined))
+            last = keys.max()
+            # Another chunk may still add rows stamped `last` to these windows
+            hold = np.zeros(len(body), dtype=bool) if final else np.asarray(keys[n_context:] == last)
+            reach = np.asarray(keys > last - pd.Timedelta(window))
+            reach[n_context:] &= ~hold
+            self._context = combined[reach]
+        self._pending = None if final or not hold.any() else body[hold]
+        return body[~hold & ~body_flagged]
+
+    def filter(self, chunk):
+        return self._run(chunk, final=False)
+
+    def flush(self):
+        result = self._run(None, final=True)
+        self._context = self._pending = None
+        return result
+
+def stream_outliers(input_file, output_file, value_col, chunksize=DEFAULT_CHUNKSIZE, **options):
+    """Remove outliers from a time-ordered CSV without loading it whole; returns stream_format's stats"""
+    outlier_filter = OutlierFilter(value_col, **options)
+    on = options.get('on', 'Date')
+    read_options = {'parse_dates': [on]} if on and not _is_count(options.get('window', '30D')) else {}
+    return stream_format(input_file, output_file, outlier_filter.filter, read_options=read_options,
+                         chunksize=chunksize, flush=outlier_filter.flush)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove rolling-window outliers from a time-ordered CSV")
+    parser.add_argument('input_file')
+    parser.add_argument('output_file')
+    parser.add_argument('value_col')
+    parser.add_argument('--window', default='30D', help="duration ('30D') or row count ('30')")
+    parser.add_argument('--method', choices=METHODS, default='zscore')
+    parser.add_argument('--threshold', type=float, default=3.0)
+    parser.add_argument('--on', default='Date', help="date column")
+    parser.add_argument('--group', help="column whose groups are filtered separately")
+    parser.add_argument('--min-periods', type=int, default=2)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    window = int(args.window) if args.window.isdigit() else args.window
+    stats = stream_outliers(args.input_file, args.output_file, args.value_col, chunksize=args.chunksize,
+                            window=window, method=args.method, threshold=args.threshold, on=args.on,
+                            group_col=args.group, min_periods=args.min_periods)
+    print(f"{stats['rows_in']} rows -> {stats['rows_out']} kept ({stats['rows_per_second']:.0f} rows/s), "
+          f"saved to {args.output_file}")
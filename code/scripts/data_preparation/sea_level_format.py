@@ -1,20 +1,24 @@
+import os
+import sys
 import pandas as pd
 
-# Define input and output file paths
-input_file = r"E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\raw\sea_level_data.csv"
-output_file = r"E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\formatted\reformatted_sea_level.csv"
-
-# Load the dataset
-df = pd.read_csv(input_file)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import project_path
+from data_preparation.streaming import stream_format
 
-# Clean the Date column (remove "D" and reformat)
-df["Date"] = df["Date"].str.replace("D", "", regex=False)
-df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y").dt.strftime("%Y-%m-%d")
+# Define input and output file paths
+input_file = project_path('raw', 'sea_level_data.csv')
+output_file = project_path('formatted', 'reformatted_sea_level.csv')
 
-# Select and rename columns
-result = df[["Date", "Value"]].rename(columns={"Value": "Sea Level"})
+# Streaming formatter plug-in settings (see streaming.py)
+READ_OPTIONS = {"usecols": ["Date", "Value"], "dtype": {"Date": str}}
+OUTPUT_FORMAT = "csv"
 
-# Save the cleaned data to CSV
-result.to_csv(output_file, index=False)
+def transform_chunk(chunk):
+    """Clean the "D"-prefixed dates and rename Value to Sea Level"""
+    dates = pd.to_datetime(chunk["Date"].str.replace("D", "", regex=False), format="%m/%d/%Y")
+    return pd.DataFrame({"Date": dates, "Sea Level": chunk["Value"]})
 
-print(f"Data successfully reformatted and saved to {output_file}")
+if __name__ == "__main__":
+    stream_format(input_file, output_file, transform_chunk, READ_OPTIONS, OUTPUT_FORMAT)
+    print(f"Data successfully reformatted and saved to {output_file}")
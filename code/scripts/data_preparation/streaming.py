@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+import importlib
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Rows read from the raw file per chunk. Peak memory is bounded by one chunk
+# (plus its transformed output), not by the size of the raw file.
+DEFAULT_CHUNKSIZE = 100_000
+
+# Formatter plug-ins. Each module exposes:
+#   READ_OPTIONS     - keyword arguments for pd.read_csv
+#   OUTPUT_FORMAT    - "csv" or "json" (JSON array of records)
+#   transform_chunk  - function(raw chunk DataFrame) -> formatted DataFrame
+# and optionally CHUNKSIZE when one raw row expands into many output rows.
+FORMATTERS = {
+    "co2": "data_preparation.co2_data_formatting",
+    "deforestation": "data_preparation.deforestrations_data_formatting",
+    "sea_level": "data_preparation.sea_level_format",
+    "temperature": "data_preparation.temparature_data_format",
+}
+
+class _CsvChunkWriter:
+    """Append DataFrame chunks to a CSV file, writing the header once"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.header_written = False
+
+    def write(self, chunk):
+        chunk.to_csv(self.handle, header=not self.header_written, index=False)
+        self.header_written = True
+
+    def close(self):
+        pass
+
+class _JsonArrayChunkWriter:
+    """Append DataFrame chunks to a JSON array of records (same layout as json.dump(..., indent=4))"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.records_written = False
+
+    def write(self, chunk):
+        if chunk.empty:
+            return
+        # Serialize the chunk as a list, then strip the surrounding brackets
+        body = json.dumps(chunk.to_dict("records"), indent=4)[2:-2]
+        self.handle.write(",\n" if self.records_written else "[\n")
+        self.handle.write(body)
+        self.records_written = True
+
+    def close(self):
+        self.handle.write("\n]" if self.records_written else "[]")
+
+_WRITERS = {"csv": _CsvChunkWriter, "json": _JsonArrayChunkWriter}
+
+def stream_format(input_file, output_file, transform, read_options=None,
+                  output_format="csv", chunksize=DEFAULT_CHUNKSIZE, flush=None):
+    """Format a raw CSV file chunk by chunk and append the results to output_file.
+
+    The output is written to a temporary file and moved into place at the end,
+    so a failed run never leaves a half-written formatted file behind.
+    flush, if given, is called after the last chunk and returns the rows a
+    stateful transform still held back.
+    Returns a dict with row counts and throughput.
+    """
+    if output_format not in _WRITERS:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+
+    start = time.perf_counter()
+    rows_in = rows_out = 0
+    partial_file = output_file + ".part"
+
+    try:
+        with open(partial_file, "w", newline="", encoding="utf-8") as handle:
+            writer = _WRITERS[output_format](handle)
+            for chunk in pd.read_csv(input_file, chunksize=chunksize, **(read_options or {})):
+                result = transform(chunk)
+                writer.write(result)
+                rows_in += len(chunk)
+                rows_out += len(result)
+            if flush is not None:
+                result = flush()
+                if result is not None:
+                    writer.write(result)
+                    rows_out += len(result)
+            writer.close()
+        os.replace(partial_file, output_file)
+    finally:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "seconds": elapsed,
+        "rows_per_second": rows_in / elapsed if elapsed > 0 else float("inf"),
+    }
+
+def load_formatter(name):
+    """Import a formatter plug-in by its registry name"""
+    if name not in FORMATTERS:
+        raise KeyError(f"Unknown formatter {name!r}. Available: {sorted(FORMATTERS)}")
+    return importlib.import_module(FORMATTERS[name])
+
+def run_formatter(name, input_file, output_file, chunksize=None):
+    """Run a registered formatter plug-in in streaming mode"""
+    formatter = load_formatter(name)
+    chunksize = chunksize or getattr(formatter, "CHUNKSIZE", DEFAULT_CHUNKSIZE)
+    stats = stream_format(input_file, output_file, formatter.transform_chunk,
+                          read_options=formatter.READ_OPTIONS,
+                          output_format=formatter.OUTPUT_FORMAT,
+                          chunksize=chunksize)
+    print(f"{name}: {stats['rows_in']} raw rows -> {stats['rows_out']} formatted rows "
+          f"({stats['rows_per_second']:.0f} rows/s), saved to {output_file}")
+    return stats
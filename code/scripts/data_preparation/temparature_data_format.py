@@ -1,62 +1,36 @@
-import pandas as pd
+import os
+import sys
 
-# Define input and output file paths
-input_file = r"E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\raw\temperature.csv"
-output_file = r"E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\formatted\temperature_formatted.csv"
-
-# Load the data, skipping the header description
-df = pd.read_csv(input_file, skiprows=1)
-
-# Melt the dataframe to convert months into rows
-melted = df.melt(
-    id_vars=["Year"],
-    value_vars=["Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
-    var_name="Month",
-    value_name="Temperature"
-)
-
-# Map month abbreviations to numbers (e.g., "Jan" → 1)
-month_to_num = {
-    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4,
-    "May": 5, "Jun": 6, "Jul": 7, "Aug": 8,
-    "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
-}
-melted["Month"] = melted["Month"].map(month_to_num)
-
-# Drop rows with missing Year/Month and convert to integers
-melted = melted.dropna(subset=["Year", "Month"])
-
-# Debugging: Check for non-integer values in Year and Month
-print("Unique Year values before conversion:", melted["Year"].unique())
-print("Unique Month values before conversion:", melted["Month"].unique())
-
-# Convert Year and Month to integers
-melted["Year"] = melted["Year"].astype(int)
-melted["Month"] = melted["Month"].astype(int)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import project_path
+from data_preparation.date_expansion import MONTH_COLUMNS, wide_monthly_to_long
+from data_preparation.streaming import stream_format
 
-# Debugging: Verify conversion
-print("Unique Year values after conversion:", melted["Year"].unique())
-print("Unique Month values after conversion:", melted["Month"].unique())
-
-# Generate daily dates for each month using pandas
-def generate_dates(row):
-    try:
-        start_date = pd.Timestamp(year=int(row["Year"]), month=int(row["Month"]), day=1)
-        end_date = start_date + pd.offsets.MonthEnd(1)
-        dates = pd.date_range(start=start_date, end=end_date, freq="D")
-        return dates.strftime("%Y-%m-%d").tolist()
-    except Exception as e:
-        print(f"Error generating dates for row: {row}. Error: {e}")
-        return []
-
-melted["Date"] = melted.apply(generate_dates, axis=1)
-
-# Explode the dates into rows and finalize
-exploded = melted.explode("Date")
-result = exploded[["Date", "Temperature"]].sort_values("Date").reset_index(drop=True)
-
-# Save to CSV
-result.to_csv(output_file, index=False)
-
-print(f"Data successfully reformatted and saved to {output_file}")
\ No newline at end of file
+# Define input and output file paths
+input_file = project_path('raw', 'temperature.csv')
+output_file = project_path('formatted', 'temperature_formatted.csv')
+
+# "D" repeats each monthly anomaly on every day of the month (what the
+# cleaning/analysis stages expect today), "M" keeps one row per month
+RESOLUTION = "D"
+
+# Streaming formatter plug-in settings (see streaming.py). The first line of
+# the raw file is a description, not the header. Rows are years, so chunks
+# stay chronological as long as the raw table is ordered by year.
+READ_OPTIONS = {"skiprows": 1, "usecols": ["Year"] + MONTH_COLUMNS}
+OUTPUT_FORMAT = "csv"
+# Each year row expands to ~365 daily rows
+CHUNKSIZE = 1_000
+
+def format_temperature(df, resolution=RESOLUTION):
+    """Turn the wide GISTEMP table (Year, Jan..Dec) into a Date/Temperature series"""
+    return wide_monthly_to_long(df, "Temperature", year_col="Year",
+                                month_cols=MONTH_COLUMNS, resolution=resolution)
+
+def transform_chunk(chunk):
+    return format_temperature(chunk)
+
+if __name__ == "__main__":
+    stats = stream_format(input_file, output_file, transform_chunk, READ_OPTIONS,
+                          OUTPUT_FORMAT, chunksize=CHUNKSIZE)
+    print(f"Data successfully reformatted and saved to {output_file}. Records: {stats['rows_out']}")
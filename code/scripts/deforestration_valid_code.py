@@ -1,17 +1,21 @@
-import pandas as pd
 import os
+import sys
 
-# Load the deforestation JSON file into a DataFrame
-file_path = "e:/College Hackathon/CLIMATE CHANGE ANALYSIS/data/formatted/deforestation.json"
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from storage import load_dataset
+from config import project_path
+from analysis.regional import region_index, valid_region_mask
 
-# Check if the file exists
-if not os.path.exists(file_path):
-    print(f"Error: The file deforestation.json does not exist at the path {file_path}")
-else:
-    df = pd.read_json(file_path)
+# Region codes of the cleaned deforestation dataset. Only the Region column
+# is read, and the codes come from its categorical index rather than a
+# scan of every record.
+cleaned_path = project_path('cleaned')
 
-    # Extract unique region codes (valid codes) and convert them to a list
-    valid_codes = df["Region"].unique().tolist()
+if __name__ == "__main__":
+    regions = region_index(load_dataset(cleaned_path, 'cleaned_deforestation', columns=['Region'])['Region'])
+    valid = valid_region_mask(regions.categories)
 
     # Print the valid region codes as a list
-    print("Valid region codes:", valid_codes)
+    print("Valid region codes:", regions.categories[valid].tolist())
+    if not valid.all():
+        print("Malformed region codes:", regions.categories[~valid].tolist())
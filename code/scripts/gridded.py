@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from analysis import batched
+from config import project_path
+
+# Gridded temperature anomalies (e.g. 2x2 degree cells, monthly since 1880:
+# ~25M values) processed out of core.
+#
+# A grid is a (month, lat, lon) array read through a memory map, never
+# loaded whole:
+#   raw binary  <name>.<ext> plus a <name>.json sidecar (see create_raw_grid)
+#               with its shape, dtype, first month, coordinates and missing
+#               value
+#   NetCDF      classic (v3) files, through scipy.io.netcdf_file(mmap=True).
+#               NetCDF-4/HDF5 files (GISTEMP's own) can't be mapped: convert
+#               them first, e.g. `nccopy -k classic in.nc out.nc`
+#
+# process_grid splits the grid into bands of latitude rows small enough for
+# --tile-mb and hands them to a process pool; each worker maps the file
+# itself, so only the tile it reads is in memory. Per tile and per cell:
+#   cleaning   the rules of clean_temperature_frame per cell: missing and
+#              implausible values (outside VALID_RANGE) are dropped, gaps of
+#              up to MAX_GAP months are interpolated in time
+#   decadal    mean of the monthly values per decade (1880, 1890, ...)
+#   trends     least-squares trend of the annual means (batched.ols)
+#   global     area-weighted (cos latitude) sums of every month
+# The decadal and trend grids are written as memory-mappable .npy files
+# under data/processed/gridded, and the area-weighted global monthly mean
+# is returned. The pipeline (--temperature-grid) formats that mean like the
+# GISTEMP table, so cleaning, the decadal/annual analytics and the
+# forecasts run on it unchanged.
+
+Grid = namedtuple('Grid', ['path', 'kind', 'variable', 'shape', 'dtype', 'months', 'lat', 'lon',
+                           'scale', 'offset', 'missing'])
+
+VALID_RANGE = (-20.0, 20.0)   # a cell's monthly anomaly, wider than the global mean's +-5
+MAX_GAP = 2                   # months interpolated inside a cell's series
+TILE_MB = 64
+TREND_FIELDS = ('Slope', 'P_Value', 'R2', 'Years')
+
+def _coordinate(spec, n):
+    """Coordinate values from a sidecar entry: a list, or {"start", "step"}"""
+    if isinstance(spec, dict):
+        return spec['start'] + spec['step'] * np.arange(n, dtype=np.float64)
+    return np.asarray(spec, dtype=np.float64)
+
+def create_raw_grid(path, months, start, lat, lon, dtype='float32', missing=None):
+    """Writable memory-mapped (month, lat, lon) raw grid at `path`, with its sidecar.
+
+    `start` is the first month ('1880-01'); lat and lon are the cell
+    centres (a sidecar written by hand may give {"start", "step"} instead).
+    Missing cells are NaN or `missing`.
+    """
+    shape = (months, len(lat), len(lon))
+    sidecar = {'shape': list(shape), 'dtype': dtype, 'start': str(start), 'lat': list(map(float, lat)),
+               'lon': list(map(float, lon)), 'missing': missing}
+    with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f)
+    return np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+
+# CF time units -> pandas Timedelta unit
+TIME_UNITS = {'days': 'D', 'hours': 'h', 'minutes': 'min', 'seconds': 's'}
+
+def _time_months(variable):
+    """datetime64[M] of a NetCDF time variable ("days since 1800-01-01", ...)"""
+    unit, _, base = variable.units.decode().partition(' since ')
+    offsets = pd.to_timedelta(np.asarray(variable[:], dtype=np.float64), unit=TIME_UNITS[unit.strip()])
+    return (pd.Timestamp(base.strip()) + offsets).to_numpy().astype('datetime64[M]')
+
+def _open_netcdf(path, variable=None):
+    from scipy.io import netcdf_file
+    with netcdf_file(path, mmap=True) as nc:
+        if variable is None:
+            variable = next(name for name, var in nc.variables.items() if len(var.dimensions) == 3)
+        var = nc.variables[variable]
+        time_dim, lat_dim, lon_dim = var.dimensions
+        attributes = var._attributes
+        grid = Grid(path, 'netcdf', variable, var.shape, var.data.dtype.str,
+                    _time_months(nc.variables[time_dim]),
+                    np.array(nc.variables[lat_dim][:], dtype=np.float64),
+                    np.array(nc.variables[lon_dim][:], dtype=np.float64),
+                    float(attributes.get('scale_factor', 1.0)), float(attributes.get('add_offset', 0.0)),
+                    attributes.get('_FillValue', attributes.get('missing_value')))
+        del var, attributes
+    return grid
+
+def open_grid(path, variable=None):
+    """Grid description of a NetCDF (.nc) or raw binary file (with a .json sidecar); nothing is read yet"""
+    if path.endswith('.nc'):
+        return _open_netcdf(path, variable)
+    with open(os.path.splitext(path)[0] + '.json', encoding='utf-8') as f:
+        sidecar = json.load(f)
+    shape = tuple(sidecar['shape'])
+    expected = int(np.prod(shape)) * np.dtype(sidecar['dtype']).itemsize
+    if os.path.getsize(path) != expected:
+        raise ValueError(f"{path} has {os.path.getsize(path):,} bytes, its sidecar shape needs {expected:,}")
+    start = np.datetime64(sidecar['start'], 'M')
+    return Grid(path, 'raw', None, shape, sidecar['dtype'], start + np.arange(shape[0]),
+                _coordinate(sidecar['lat'], shape[1]), _coordinate(sidecar['lon'], shape[2]),
+                1.0, 0.0, sidecar.get('missing'))
+
+def read_tile(grid, rows):
+    """float32 anomalies of the latitude rows `rows` (a slice), missing values as NaN"""
+    if grid.kind == 'raw':
+        raw = np.array(np.memmap(grid.path, dtype=grid.dtype, mode='r', shape=grid.shape)[:, rows])
+    else:
+        from scipy.io import netcdf_file
+        with netcdf_file(grid.path, mmap=True) as nc:
+            var = nc.variables[grid.variable]
+            raw = np.array(var.data[:, rows])
+            # scipy can't close the file while views of its map are alive
+            del var
+    tile = raw.astype(np.float32)
+    if grid.missing is not None:
+        tile[raw == grid.missing] = np.nan
+    if grid.scale != 1.0 or grid.offset != 0.0:
+        tile = tile * np.float32(grid.scale) + np.float32(grid.offset)
+    return tile
+
+def fill_gaps(values, days, max_gap=MAX_GAP):
+    """Interpolate each column's runs of at most `max_gap` NaN rows linearly in time (in place).
+
+    days are the rows' times as numbers. Leading, trailing and longer gaps stay NaN.
+    """
+    n = len(values)
+    valid = ~np.isnan(values)
+    rows = np.arange(n)[:, None]
+    previous = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    following = np.minimum.accumulate(np.where(valid, rows, n)[::-1], axis=0)[::-1]
+    fill = ~valid & (previous >= 0) & (following < n) & (following - previous - 1 <= max_gap)
+    row, col = np.nonzero(fill)
+    before, after = previous[row, col], following[row, col]
+    fraction = (days[row] - days[before]) / (days[after] - days[before])
+    values[row, col] = values[before, col] + (values[after, col] - values[before, col]) * fraction
+    return values
+
+def _period_means(values, periods):
+    """Mean of the non-NaN rows of every column per run of equal `periods` values: (run starts, means)"""
+    starts = np.flatnonzero(np.diff(periods, prepend=periods[0] - 1))
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0), starts, axis=0, dtype=np.float64)
+    counts = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return starts, np.where(counts > 0, sums / counts, np.nan)
+
+def cell_weights(lat):
+    """Relative area of the cells of each latitude row (cos latitude)"""
+    return np.cos(np.deg2rad(lat))
+
+def process_tile(grid, rows, valid_range=VALID_RANGE, max_gap=MAX_GAP):
+    """Clean one band of latitude rows and reduce it.
+
+    Returns (rows, decadal means (decade, row, lon), trends (TREND_FIELDS,
+    row, lon), weighted sums per month, weights per month).
+    """
+    tile = read_tile(grid, rows)
+    months, n_rows, n_lon = tile.shape
+    values = tile.reshape(months, n_rows * n_lon)
+    del tile
+    with np.errstate(invalid='ignore'):
+        values[(values < valid_range[0]) | (values > valid_range[1])] = np.nan
+    days = grid.months.astype('datetime64[D]').astype(np.float64)
+    fill_gaps(values, days, max_gap)
+
+    years = grid.months.astype('datetime64[Y]').astype(np.int64) + 1970
+    _, decadal = _period_means(values, years // 10)
+    starts, annual = _period_means(values, years)
+    fit = batched.ols(years[starts].astype(np.float64), annual)
+    trends = np.stack([fit.slope, fit.pvalue, fit.rvalue ** 2, fit.n])
+
+    weights = np.repeat(cell_weights(grid.lat[rows]), n_lon)
+    valid = ~np.isnan(values)
+    weighted = np.where(valid, values, 0) @ weights
+    total = valid @ weights
+    shape = (n_rows, n_lon)
+    return (rows, decadal.reshape(-1, *shape).astype(np.float32), trends.reshape(-1, *shape).astype(np.float32),
+            weighted, total)
+
+def tile_rows(grid, tile_mb=TILE_MB):
+    """Latitude rows per tile so a tile's working arrays stay within about tile_mb"""
+    # float32 values plus the int64 gap indices and float64 sums of a cell-month
+    per_row = grid.shape[0] * grid.shape[2] * 32
+    return max(1, int(tile_mb * (1 << 20) // per_row))
+
+def process_grid(grid, output_dir=None, workers=None, tile_mb=TILE_MB, valid_range=VALID_RANGE, max_gap=MAX_GAP):
+    """Reduce a whole grid tile by tile: returns the area-weighted global monthly mean (Date, Temperature).
+
+    With output_dir, decadal_temperature.npy (decade, lat, lon),
+    temperature_trends.npy (TREND_FIELDS, lat, lon) and grid.json (their
+    axes) are written there. workers=1 runs the tiles in this process; the
+    pool never has more processes than tiles.
+    """
+    months, n_lat, n_lon = grid.shape
+    step = tile_rows(grid, tile_mb)
+    tiles = [slice(start, min(start + step, n_lat)) for start in range(0, n_lat, step)]
+    years = grid.months.astype('datetime64[Y]').astype(np.int64) + 1970
+    decades = np.unique(years // 10) * 10
+
+    decadal = trends = None
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        decadal = np.lib.format.open_memmap(os.path.join(output_dir, 'decadal_temperature.npy.tmp'), mode='w+',
+                                            dtype=np.float32, shape=(len(decades), n_lat, n_lon))
+        trends = np.lib.format.open_memmap(os.path.join(output_dir, 'temperature_trends.npy.tmp'), mode='w+',
+                                           dtype=np.float32, shape=(len(TREND_FIELDS), n_lat, n_lon))
+    weighted, total = np.zeros(months), np.zeros(months)
+
+    def collect(result):
+        rows, tile_decadal, tile_trends, tile_weighted, tile_total = result
+        if output_dir:
+            decadal[:, rows] = tile_decadal
+            trends[:, rows] = tile_trends
+        weighted[:] += tile_weighted
+        total[:] += tile_total
+
+    workers = min(workers or os.cpu_count() or 1, len(tiles))
+    if workers == 1:
+        for rows in tiles:
+            collect(process_tile(grid, rows, valid_range, max_gap))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(process_tile, [grid] * len(tiles), tiles, [valid_range] * len(tiles),
+                                   [max_gap] * len(tiles)):
+                collect(result)
+
+    if output_dir:
+        decadal.flush()
+        trends.flush()
+        del decadal, trends
+        for name in ('decadal_temperature.npy', 'temperature_trends.npy'):
+            os.replace(os.path.join(output_dir, name + '.tmp'), os.path.join(output_dir, name))
+        axes = {'source': os.path.abspath(grid.path), 'decades': decades.tolist(), 'lat': grid.lat.tolist(),
+                'lon': grid.lon.tolist(), 'trend_fields': list(TREND_FIELDS), 'trend_units': 'per year'}
+        with open(os.path.join(output_dir, 'grid.json'), 'w', encoding='utf-8') as f:
+            json.dump(axes, f)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(total > 0, weighted / total, np.nan)
+    return pd.DataFrame({'Date': grid.months.astype('datetime64[ns]'), 'Temperature': mean})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decadal means, trends and global mean of a gridded anomaly file")
+    parser.add_argument('grid', help="NetCDF classic (.nc) or raw binary file with a .json sidecar")
+    parser.add_argument('--variable', help="NetCDF variable (default: the first 3-D one)")
+    parser.add_argument('--output-dir', default=project_path('processed', 'gridded'))
+    parser.add_argument('--workers', type=int, default=None, help="process pool size (1 runs in-process)")
+    parser.add_argument('--tile-mb', type=float, default=TILE_MB, help="working memory per tile")
+    args = parser.parse_args()
+
+    grid = open_grid(args.grid, args.variable)
+    print(f"{grid.path}: {grid.shape[0]} months x {grid.shape[1]} x {grid.shape[2]} cells, "
+          f"{str(grid.months[0])} to {str(grid.months[-1])}, {tile_rows(grid, args.tile_mb)} rows per tile")
+    monthly = process_grid(grid, args.output_dir, args.workers, args.tile_mb)
+    monthly.to_csv(os.path.join(args.output_dir, 'global_temperature.csv'), index=False)
+    annual = batched.calendar_means(monthly['Date'], monthly[['Temperature']])
+    print(f"Global mean {annual.index.year[0]}-{annual.index.year[-1]}: "
+          f"{annual['Temperature'].iloc[0]:.2f} -> {annual['Temperature'].iloc[-1]:.2f}")
+    print(f"Decadal means and trends written to {args.output_dir}")
@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import pandas as pd
+
+from timeseries import TimeSeries
+
+# Content fingerprints for incremental pipeline runs.
+#
+# Every persisted stage output records, in a _fingerprints.json manifest next
+# to it, the fingerprint of its inputs and parameters plus the fingerprint of
+# the output itself. A stage whose combined input fingerprint matches the
+# manifest is skipped. Frames are fingerprinted from pandas row hashes, so we
+# can also tell when a new input is the old one with rows appended.
+
+MANIFEST_NAME = '_fingerprints.json'
+
+def _row_hashes(df):
+    # Hash datetimes at one resolution so a CSV round trip doesn't change them
+    datetimes = [c for c in df.columns if str(df[c].dtype).startswith('datetime64')]
+    if datetimes:
+        df = df.astype({c: 'datetime64[ns]' for c in datetimes})
+    index = not isinstance(df.index, pd.RangeIndex)
+    return pd.util.hash_pandas_object(df, index=index).to_numpy()
+
+def frame_fingerprint(df, rows=None):
+    """sha256 of the column layout and row hashes (optionally of the first `rows` rows)"""
+    hashes = _row_hashes(df if rows is None else df.iloc[:rows])
+    digest = hashlib.sha256(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(str(df.index.name).encode())
+    digest.update(hashes.tobytes())
+    return digest.hexdigest()
+
+def file_fingerprint(path, cached=None, block_size=1 << 20):
+    """sha256 of a file's bytes, reusing `cached` when size and mtime are unchanged.
+
+    Returns a dict {size, mtime_ns, sha256}; a missing file fingerprints as None.
+    """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    if cached and cached.get('size') == stat.st_size and cached.get('mtime_ns') == stat.st_mtime_ns:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+def value_fingerprint(value):
+    """Fingerprint any stage result: frames by content, files by bytes, the rest by repr"""
+    if isinstance(value, pd.DataFrame):
+        return frame_fingerprint(value)
+    if isinstance(value, TimeSeries):
+        header = [value.name, value.layout, value.decimals, len(value.days), len(value.values)]
+        digest = hashlib.sha256(json.dumps(header).encode())
+        for array in (value.days, value.values, value.lengths, value.offsets):
+            if array is not None:
+                digest.update(array.tobytes())
+        return digest.hexdigest()
+    if isinstance(value, str) and os.path.isfile(value):
+        return file_fingerprint(value)['sha256']
+    return hashlib.sha256(repr(value).encode()).hexdigest()
+
+def stage_fingerprint(name, params, input_fingerprints, source_fingerprints):
+    """Combined fingerprint of everything a stage's output depends on"""
+    payload = {
+        'stage': name,
+        'params': params,
+        'inputs': input_fingerprints,
+        'sources': [s and s['sha256'] for s in source_fingerprints],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def load_manifest(directory, name=MANIFEST_NAME):
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(directory, manifest, name=MANIFEST_NAME):
+    """Write the manifest atomically so an interrupted run can't corrupt it"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def appended_rows(df, previous):
+    """Number of rows present in a previous input, if `df` only appends to it.
+
+    `previous` is a manifest input record ({'fingerprint', 'rows'}). Returns
+    None when df rewrote, reordered or dropped any of the earlier rows.
+    """
+    if not previous or not isinstance(df, pd.DataFrame):
+        return None
+    rows = previous.get('rows')
+    if rows is None or rows > len(df):
+        return None
+    if frame_fingerprint(df, rows=rows) != previous.get('fingerprint'):
+        return None
+    return rows
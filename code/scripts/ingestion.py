@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import argparse
+from collections import namedtuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import project_path
+
+# Ingestion of the raw feeds into data/raw, the local mirror the format step
+# reads.
+#
+# Every source is fetched concurrently on one asyncio loop, HTTP(S) ones
+# through a single pooled aiohttp session. The mirror keeps a
+# _sources.json manifest with the URL, ETag, Last-Modified, size and sha256
+# of each file:
+#   - a source whose mirrored file still has its recorded checksum is
+#     requested conditionally (If-None-Match / If-Modified-Since); a 304
+#     costs one round trip and leaves the file untouched
+#   - a download goes to <file>.part. If it is interrupted, the next fetch
+#     asks for the rest with Range + If-Range and appends it; a server that
+#     changed the file in between sends all of it again
+#   - a completed download whose checksum matches the mirror is dropped,
+#     so the file (and its mtime) only changes when its content does
+# The pipeline fingerprints the raw files (incremental.file_fingerprint),
+# so `skypulse run --fetch --incremental` re-formats only changed sources.
+#
+# Fetchers are picked by URL scheme (FETCHERS): http/https, and file for a
+# local path or file:// URL. A source without a URL keeps whatever is in the
+# mirror; URLs can be set in data/raw/sources.json ({"sea_level": "https://..."})
+# or with --url name=URL.
+
+# Raw feed -> (mirror file name, default URL). The deforestation (Global
+# Forest Watch) and sea level exports have no stable public URL.
+Source = namedtuple('Source', ['name', 'file_name', 'url'])
+
+SOURCES = {
+    'co2': Source('co2', 'co2_emissions.csv', 'https://gml.noaa.gov/webdata/ccgg/trends/co2/co2_mm_mlo.csv'),
+    'deforestation': Source('deforestation', 'deforestation.csv', None),
+    'sea_level': Source('sea_level', 'sea_level_data.csv', None),
+    'temperature': Source('temperature', 'temperature.csv',
+                          'https://data.giss.nasa.gov/gistemp/tabledata_v4/GLB.Ts+dSST.csv'),
+}
+
+MANIFEST_NAME = '_sources.json'
+URLS_NAME = 'sources.json'
+CHUNK_SIZE = 1 << 20
+
+def source_urls(raw_dir, overrides=None):
+    """{source name: URL or None}: the defaults, then raw_dir/sources.json, then overrides"""
+    urls = {name: source.url for name, source in SOURCES.items()}
+    path = os.path.join(raw_dir, URLS_NAME)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            urls.update(json.load(f))
+    urls.update(overrides or {})
+    unknown = set(urls) - set(SOURCES)
+    if unknown:
+        raise ValueError(f"Unknown sources {sorted(unknown)}. Available: {sorted(SOURCES)}")
+    return urls
+
+def load_mirror(raw_dir):
+    path = os.path.join(raw_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_mirror(raw_dir, manifest):
+    """Write the manifest atomically so an interrupted fetch can't corrupt it"""
+    os.makedirs(raw_dir, exist_ok=True)
+    path = os.path.join(raw_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def sha256_file(path, digest=None):
+    """sha256 of a file's bytes (digest, if given, is updated and returned instead)"""
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest
+
+def mirrored(path, record):
+    """Whether `path` is still the file `record` describes (size, then checksum)"""
+    if not record or not os.path.exists(path) or os.path.getsize(path) != record.get('size'):
+        return False
+    return sha256_file(path).hexdigest() == record.get('sha256')
+
+def _install(path, part, digest, record, url):
+    """Move a completed download into the mirror unless it has the same content: returns the status"""
+    sha256 = digest.hexdigest()
+    record.update(url=url, sha256=sha256, size=os.path.getsize(part), fetched=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    record.pop('partial', None)
+    if os.path.exists(path) and os.path.getsize(path) == record['size'] and sha256_file(path).hexdigest() == sha256:
+        os.remove(part)
+        return 'unchanged'
+    os.replace(part, path)
+    return 'updated'
+
+async def fetch_http(session, url, path, record):
+    """Conditional, resumable GET of `url` into `path`: returns (status, bytes received)"""
+    part = path + '.part'
+    headers = {}
+    if record.get('url') == url and mirrored(path, record):
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+    partial = record.get('partial') or {}
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    validator = partial.get('etag') or partial.get('last_modified')
+    if offset and partial.get('url') == url and validator:
+        headers.update({'Range': f'bytes={offset}-', 'If-Range': validator})
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304:
+            return 'unchanged', 0
+        if response.status == 416:
+            # The part is already longer than the file: start over
+            os.remove(part)
+            record.pop('partial', None)
+            return await fetch_http(session, url, path, record)
+        response.raise_for_status()
+
+        resumed = response.status == 206
+        digest = sha256_file(part) if resumed else hashlib.sha256()
+        # Remember how to resume this response if the transfer breaks off
+        record['partial'] = {'url': url, 'etag': response.headers.get('ETag'),
+                             'last_modified': response.headers.get('Last-Modified')}
+        received = 0
+        with open(part, 'ab' if resumed else 'wb') as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                received += len(chunk)
+        record['etag'] = response.headers.get('ETag')
+        record['last_modified'] = response.headers.get('Last-Modified')
+    return _install(path, part, digest, record, url), received
+
+def _copy_file(source, path, record, url):
+    part = path + '.part'
+    shutil.copyfile(source, part)
+    size = os.path.getsize(part)
+    return _install(path, part, sha256_file(part), record, url), size
+
+async def fetch_file(session, url, path, record):
+    """Copy a local file (path or file:// URL) into the mirror when its content changed"""
+    parsed = urlparse(url)
+    source = url2pathname(parsed.path) if parsed.scheme == 'file' else url
+    if record.get('url') == url and mirrored(path, record) and mirrored(source, record):
+        return 'unchanged', 0
+    return await asyncio.to_thread(_copy_file, source, path, record, url)
+
+# URL scheme -> async fetcher(session, url, path, record) -> (status, bytes).
+# record is the source's mirror manifest entry, updated in place.
+FETCHERS = {'http': fetch_http, 'https': fetch_http, 'file': fetch_file, '': fetch_file}
+
+async def _fetch_one(session, name, url, raw_dir, record):
+    path = os.path.join(raw_dir, SOURCES[name].file_name)
+    row = {'Source': name, 'URL': url, 'Status': 'skipped', 'Bytes': 0, 'Seconds': 0.0, 'Error': None}
+    if url is None:
+        row['Error'] = "no URL, keeping the mirrored file" if os.path.exists(path) else "no URL and no file"
+        return row
+    start = time.perf_counter()
+    try:
+        # Local paths first: urlparse reads a Windows drive letter as a scheme
+        scheme = '' if os.path.isabs(url) else urlparse(url).scheme
+        if scheme not in FETCHERS:
+            raise ValueError(f"no fetcher for {scheme!r} URLs")
+        row['Status'], row['Bytes'] = await FETCHERS[scheme](session, url, path, record)
+    except Exception as e:
+        row.update(Status='failed', Error=f"{type(e).__name__}: {e}")
+    row['Seconds'] = time.perf_counter() - start
+    return row
+
+async def fetch_sources(raw_dir, urls, connections=8, timeout=300):
+    """Fetch every source in `urls` concurrently into raw_dir; returns one report row per source"""
+    import aiohttp
+    manifest = load_mirror(raw_dir)
+    os.makedirs(raw_dir, exist_ok=True)
+    connector = aiohttp.TCPConnector(limit=connections)
+    try:
+        async with aiohttp.ClientSession(connector=connector,
+                                         timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            return await asyncio.gather(*(_fetch_one(session, name, url, raw_dir, manifest.setdefault(name, {}))
+                                          for name, url in urls.items()))
+    finally:
+        # Also keeps the resume state of interrupted downloads
+        save_mirror(raw_dir, {name: record for name, record in manifest.items() if record})
+
+def fetch(raw_dir=None, names=None, overrides=None, connections=8, timeout=300):
+    """Refresh the mirror of the `names` sources (default: all); returns the report rows"""
+    raw_dir = raw_dir or project_path('raw')
+    urls = source_urls(raw_dir, overrides)
+    if names:
+        urls = {name: urls[name] for name in names}
+    return asyncio.run(fetch_sources(raw_dir, urls, connections, timeout))
+
+def print_report(rows):
+    print(f"{'source':<15}{'status':<11}{'bytes':>12}{'seconds':>9}  detail")
+    for row in rows:
+        print(f"{row['Source']:<15}{row['Status']:<11}{row['Bytes']:>12,}{row['Seconds']:>9.2f}  "
+              f"{row['Error'] or row['URL']}")
+
+def parse_urls(pairs):
+    """--url name=URL arguments as a dict"""
+    urls = {}
+    for pair in pairs or []:
+        name, sep, url = pair.partition('=')
+        if not sep:
+            raise ValueError(f"expected name=URL, got {pair!r}")
+        urls[name] = url
+    return urls
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the raw feeds that changed into data/raw")
+    parser.add_argument('--raw-dir', default=project_path('raw'))
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), help="sources to fetch (default: all)")
+    parser.add_argument('--url', action='append', metavar='NAME=URL', help="fetch a source from this URL")
+    parser.add_argument('--connections', type=int, default=8, help="HTTP connection pool size")
+    parser.add_argument('--timeout', type=float, default=300, help="per-request timeout in seconds")
+    args = parser.parse_args()
+
+    report = fetch(args.raw_dir, args.sources, parse_urls(args.url), args.connections, args.timeout)
+    print_report(report)
+    sys.exit(1 if any(row['Status'] == 'failed' for row in report) else 0)
@@ -0,0 +1,353 @@
+import os
+import sys
+import json
+import time
+import argparse
+import cProfile
+import resource
+import tempfile
+import threading
+import traceback
+import tracemalloc
+import functools
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import pandas as pd
+from config import project_path
+from timeseries import TimeSeries
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+# Stage instrumentation: time, memory, row counts and errors as JSON logs.
+#
+#   @instrumented
+#   def clean_co2_data(file_path): ...
+#
+#   with stage('export', inputs=frames) as record:
+#       record.output(write_everything(frames))
+#
+# Each stage appends one JSON line to logs/<run id>.jsonl with:
+#   - wall and CPU seconds;
+#   - tracemalloc allocation peak and process peak RSS;
+#   - input and output rows (DataFrames among the arguments and result);
+#   - its status and, on error, the exception and traceback.
+# Stages that catch their own errors (print and return None) record them
+# with log_exception(). Stages may nest; a record names its parent.
+# Profiles come from the outermost stage only, because two profilers can't
+# run at once.
+#
+# Settings are environment variables, so pool workers inherit them:
+#   SKYPULSE_LOG_DIR       log directory (default <project>/logs; '' turns logging off)
+#   SKYPULSE_RUN_ID        log file name (default: start time and pid of the first process)
+#   SKYPULSE_PROFILE       'cprofile' or 'pyinstrument': a profile per outermost stage
+#                          in logs/profiles/<run id>/
+#   SKYPULSE_TRACE_MEMORY  '1' measures allocation peaks with tracemalloc; off by default
+#                          because it slows allocation-heavy code (the pipeline and
+#                          skypulse CLIs turn it on unless --no-memory-trace)
+# configure() sets them. write_prometheus() turns a run's log into
+# Prometheus text exposition format for the node exporter's textfile
+# collector (or any scraper reading the file).
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+def configure(log_dir=None, run_id=None, profile=None, trace_memory=None):
+    """Set the instrumentation settings for this process and the workers it starts; returns the run id"""
+    if log_dir is not None:
+        os.environ['SKYPULSE_LOG_DIR'] = log_dir
+    if run_id is not None:
+        os.environ['SKYPULSE_RUN_ID'] = run_id
+    if profile is not None:
+        if profile and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profile!r}. Available: {PROFILERS}")
+        os.environ['SKYPULSE_PROFILE'] = profile
+    if trace_memory is not None:
+        os.environ['SKYPULSE_TRACE_MEMORY'] = '1' if trace_memory else '0'
+    return current_run_id()
+
+def log_dir():
+    return os.environ.get('SKYPULSE_LOG_DIR', project_path('logs'))
+
+def current_run_id():
+    if 'SKYPULSE_RUN_ID' not in os.environ:
+        os.environ['SKYPULSE_RUN_ID'] = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    return os.environ['SKYPULSE_RUN_ID']
+
+def _trace_memory_default():
+    return os.environ.get('SKYPULSE_TRACE_MEMORY', '0') != '0'
+
+def count_rows(value):
+    """Rows of a DataFrame, Series or TimeSeries, or summed over those in a tuple, list or dict (None if none)"""
+    if isinstance(value, (pd.DataFrame, pd.Series, TimeSeries)):
+        return len(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (tuple, list)):
+        counts = [len(item) for item in value if isinstance(item, (pd.DataFrame, pd.Series, TimeSeries))]
+        return sum(counts) if counts else None
+    return None
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+class StageRecord:
+    """Measurements of one stage run; output() sets the output rows, fail() marks it failed"""
+
+    def __init__(self, name, rows_in=None, parent=None):
+        self.name = name
+        self.parent = parent
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.started = datetime.now(timezone.utc)
+        self.wall_s = self.cpu_s = self.alloc_peak_mb = self.peak_rss_mb = None
+        self.error = None
+        self.profile = None
+        # Highest allocation peak seen by stages nested in this one
+        self._peak_floor = 0
+
+    def output(self, result):
+        self.rows_out = count_rows(result)
+        return result
+
+    def fail(self, error=None):
+        """Record `error` (default: the exception being handled)"""
+        if error is None:
+            error = sys.exc_info()[1]
+        self.error = {
+            'type': type(error).__name__,
+            'message': str(error),
+            'traceback': ''.join(traceback.format_exception(type(error), error, error.__traceback__)),
+        }
+
+    @property
+    def status(self):
+        return 'error' if self.error else 'ok'
+
+    def as_dict(self):
+        return {
+            'run_id': current_run_id(), 'stage': self.name, 'parent': self.parent, 'pid': os.getpid(),
+            'started': self.started.isoformat(timespec='milliseconds'), 'status': self.status,
+            'wall_s': self.wall_s, 'cpu_s': self.cpu_s,
+            'alloc_peak_mb': self.alloc_peak_mb, 'peak_rss_mb': self.peak_rss_mb,
+            'rows_in': self.rows_in, 'rows_out': self.rows_out,
+            'profile': self.profile, 'error': self.error,
+        }
+
+# Active stages of this thread, innermost last
+_local = threading.local()
+
+def _active():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+def _write(entry):
+    directory = log_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    # One write per line in append mode, so concurrent workers don't interleave
+    with open(os.path.join(directory, f'{current_run_id()}.jsonl'), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, default=str) + '\n')
+
+def _start_profiler():
+    kind = os.environ.get('SKYPULSE_PROFILE')
+    if not kind or any(record.profile for record in _active()):
+        return None, None
+    if kind == 'pyinstrument' and pyinstrument is None:
+        print("pyinstrument is not installed, profiling with cProfile")
+        kind = os.environ['SKYPULSE_PROFILE'] = 'cprofile'
+    if kind == 'pyinstrument':
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return kind, profiler
+
+def _save_profile(name, kind, profiler):
+    directory = os.path.join(log_dir() or tempfile.gettempdir(), 'profiles', current_run_id())
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{name}-{os.getpid()}")
+    if kind == 'pyinstrument':
+        profiler.stop()
+        path = base + '.html'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        path = base + '.prof'
+        profiler.dump_stats(path)
+    return path
+
+@contextmanager
+def stage(name, inputs=None, trace_memory=None, reraise=True):
+    """Measure the enclosed block as stage `name` and log it.
+
+    inputs are counted for rows_in. Exceptions are recorded, then re-raised
+    unless reraise=False (the record's error then says what happened).
+    """
+    active = _active()
+    record = StageRecord(name, count_rows(inputs), active[-1].name if active else None)
+    trace_memory = _trace_memory_default() if trace_memory is None else trace_memory
+    owns_trace = trace_memory and not tracemalloc.is_tracing()
+    enclosing_peak = 0
+    if owns_trace:
+        tracemalloc.start()
+    elif tracemalloc.is_tracing():
+        # Nested: measure this stage's own peak, and hand the peak so far back on exit
+        enclosing_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    kind, profiler = _start_profiler()
+    record.profile = kind
+    active.append(record)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except Exception:
+        record.fail()
+        if reraise:
+            raise
+    finally:
+        record.wall_s = time.perf_counter() - wall_start
+        record.cpu_s = time.process_time() - cpu_start
+        active.pop()
+        if profiler is not None:
+            record.profile = _save_profile(name, kind, profiler)
+        if tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], record._peak_floor)
+            record.alloc_peak_mb = peak / 2**20
+            if owns_trace:
+                tracemalloc.stop()
+            elif active:
+                active[-1]._peak_floor = max(active[-1]._peak_floor, enclosing_peak, peak)
+        record.peak_rss_mb = _peak_rss_mb()
+        _write(record.as_dict())
+
+def instrumented(func=None, name=None):
+    """Decorator running func as a stage(name or func.__name__), counting DataFrame arguments as its input"""
+    if func is None:
+        return functools.partial(instrumented, name=name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(name or func.__name__, inputs=list(args) + list(kwargs.values())) as record:
+            return record.output(func(*args, **kwargs))
+    return wrapper
+
+def log_exception(error=None):
+    """Record an exception a stage handled itself (default: the one being handled).
+
+    Marks the innermost active stage as failed; outside any stage the error
+    is logged on its own line.
+    """
+    active = _active()
+    if active:
+        active[-1].fail(error)
+        return
+    record = StageRecord(None)
+    record.fail(error)
+    _write(record.as_dict())
+
+# Prometheus text exposition
+
+_METRICS = [
+    # name, type, help, record field, aggregation
+    ('skypulse_stage_runs_total', 'counter', 'Stage executions', None, 'count'),
+    ('skypulse_stage_errors_total', 'counter', 'Stage executions that failed', 'error', 'count'),
+    ('skypulse_stage_wall_seconds_total', 'counter', 'Wall-clock time spent in the stage', 'wall_s', 'sum'),
+    ('skypulse_stage_cpu_seconds_total', 'counter', 'CPU time spent in the stage', 'cpu_s', 'sum'),
+    ('skypulse_stage_rows_in_total', 'counter', 'Rows of the stage inputs', 'rows_in', 'sum'),
+    ('skypulse_stage_rows_out_total', 'counter', 'Rows of the stage outputs', 'rows_out', 'sum'),
+    ('skypulse_stage_alloc_peak_bytes', 'gauge', 'Highest tracemalloc allocation peak of the stage',
+     'alloc_peak_mb', 'max'),
+    ('skypulse_stage_peak_rss_bytes', 'gauge', 'Highest peak RSS of a process running the stage',
+     'peak_rss_mb', 'max'),
+]
+
+def read_log(run_id=None, directory=None):
+    """Records of a run's log as a list of dicts (none if nothing was logged)"""
+    path = os.path.join(directory or log_dir(), f'{run_id or current_run_id()}.jsonl')
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def prometheus_text(records):
+    """Per-stage totals of `records` in Prometheus text format"""
+    stages = {}
+    for record in records:
+        if record['stage'] is not None:
+            stages.setdefault(record['stage'], []).append(record)
+
+    lines = []
+    for metric, kind, help_text, field, aggregation in _METRICS:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        for name, runs in sorted(stages.items()):
+            if aggregation == 'count':
+                value = len([r for r in runs if field is None or r.get(field)])
+            else:
+                values = [r[field] for r in runs if r.get(field) is not None]
+                if not values:
+                    continue
+                value = sum(values) if aggregation == 'sum' else max(values)
+                if field.endswith('_mb'):
+                    value *= 2**20
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{metric}{{stage="{label}"}} {value}')
+    unstaged = sum(1 for record in records if record['stage'] is None)
+    lines += ['# HELP skypulse_unstaged_errors_total Errors logged outside any stage',
+              '# TYPE skypulse_unstaged_errors_total counter', f'skypulse_unstaged_errors_total {unstaged}',
+              '# HELP skypulse_run_timestamp_seconds When the metrics were written',
+              '# TYPE skypulse_run_timestamp_seconds gauge', f'skypulse_run_timestamp_seconds {time.time():.0f}']
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(run_id=None, directory=None):
+    """Write the run's metrics to logs/<run id>.prom and logs/metrics.prom (the latest run); returns the latter"""
+    directory = directory or log_dir()
+    text = prometheus_text(read_log(run_id, directory))
+    os.makedirs(directory, exist_ok=True)
+    for file_name in (f'{run_id or current_run_id()}.prom', 'metrics.prom'):
+        path = os.path.join(directory, file_name)
+        # Replace atomically so a scraper never reads half a file
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + '.tmp', path)
+    return path
+
+def summarize(records):
+    """Per-stage table of a run's records"""
+    frame = pd.DataFrame(records)
+    frame['errors'] = frame['status'] == 'error'
+    # Stages without frames keep NaN rows rather than 0
+    rows = lambda counts: counts.sum(min_count=1)
+    return (frame.dropna(subset=['stage']).groupby('stage', sort=False)
+            .agg(runs=('stage', 'size'), errors=('errors', 'sum'), wall_s=('wall_s', 'sum'),
+                 cpu_s=('cpu_s', 'sum'), alloc_peak_mb=('alloc_peak_mb', 'max'),
+                 rows_in=('rows_in', rows), rows_out=('rows_out', rows)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a run's stage log and write its Prometheus metrics")
+    parser.add_argument('run_id', nargs='?', help="run to read (default: the latest log)")
+    parser.add_argument('--log-dir', default=log_dir())
+    args = parser.parse_args()
+
+    run_id = args.run_id
+    if run_id is None:
+        logs = [name for name in os.listdir(args.log_dir) if name.endswith('.jsonl')]
+        if not logs:
+            parser.error(f"no logs in {args.log_dir}")
+        run_id = max(logs, key=lambda name: os.path.getmtime(os.path.join(args.log_dir, name)))[:-len('.jsonl')]
+
+    records = read_log(run_id, args.log_dir)
+    pd.set_option('display.width', 160)
+    print(f"Run {run_id}: {len(records)} records")
+    print(summarize(records).to_string())
+    for record in records:
+        if record['error']:
+            print(f"\n[{record['stage']}] {record['error']['type']}: {record['error']['message']}")
+    print(f"\nPrometheus metrics: {write_prometheus(run_id, args.log_dir)}")
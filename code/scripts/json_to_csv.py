@@ -2,32 +2,44 @@ import os
 import csv
 import json
 
+from config import project_paths
+
 def convert_csv_to_json(input_file, output_file):
     with open(input_file, mode='r', encoding='utf-8') as csv_file:
         csv_reader = csv.DictReader(csv_file)
         data = [row for row in csv_reader]
-    
+
     with open(output_file, mode='w', encoding='utf-8') as json_file:
         json.dump(data, json_file, indent=2)
-    
+
     print(f"Converted: {input_file} -> {output_file}")
 
+def convert_frame_to_json(df, output_file):
+    """Write a DataFrame straight to the dashboard JSON layout (list of records)"""
+    df = df.copy()
+    for col in df.columns:
+        if str(df[col].dtype).startswith('datetime64'):
+            df[col] = df[col].dt.strftime('%Y-%m-%d')
+    with open(output_file, mode='w', encoding='utf-8') as json_file:
+        json_file.write(df.to_json(orient='records'))
+
+    print(f"Converted: {len(df)} records -> {output_file}")
+
 def process_directory(input_dir, output_dir):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    
+
     for file in os.listdir(input_dir):
         full_path = os.path.join(input_dir, file)
         output_file_path = os.path.join(output_dir, file.replace('.csv', '.json'))
-        
+
         if os.path.isfile(full_path) and file.endswith('.csv'):
             convert_csv_to_json(full_path, output_file_path)
 
-input_dirs = [
-    r"E:\\College Hackathon\\CLIMATE CHANGE ANALYSIS\\frontend\\public\\data\\predictions",
-    r"E:\\College Hackathon\\CLIMATE CHANGE ANALYSIS\\frontend\\public\\data\\processed"
-]
-output_dir = r"E:\\College Hackathon\\CLIMATE CHANGE ANALYSIS\\frontend\\public\\data\\json"
+if __name__ == "__main__":
+    paths = project_paths()
+    input_dirs = [paths['frontend_predictions'], paths['frontend_processed']]
+    output_dir = paths['frontend_json']
 
-for input_dir in input_dirs:
-    process_directory(input_dir, output_dir)
\ No newline at end of file
+    for input_dir in input_dirs:
+        process_directory(input_dir, output_dir)
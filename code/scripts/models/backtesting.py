@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import warnings
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.model_training import (PREDICTIONS_PATH, feature_matrix, fit_arima, fit_prophet, fit_random_forest,
+                                   fit_regression_forest, load_and_prepare_data, merge_features,
+                                   point_forecast, predict_random_forest)
+from storage import save_dataset
+
+# Time-aware backtesting and hyperparameter search.
+#
+# Candidates (model x series x hyperparameters) are scored on rolling-origin
+# folds over the merged temperature/CO2/deforestation frame: each fold
+# trains on the years before its origin (all of them, or the last
+# window_years with a rolling window) and is tested on the next test_years.
+# Every candidate is scored on the annual means of its test-period
+# predictions, with the mse/r2/mae metrics random_forest_regression
+# reports, so models that forecast at different resolutions compete on
+# the same footing.
+#
+# Folds run on a process pool. The merged frame, and the float32 feature
+# matrix of the multi-variable forest, are written once as .npy files and
+# workers memory-map them read-only, instead of each receiving a pickled
+# copy or rebuilding the features. The leaderboard (mean and spread of
+# each metric per candidate) and the best hyperparameters per series are
+# saved to data/predictions. forecasting.py --tuned uses the latter.
+
+Candidate = namedtuple('Candidate', ['model', 'series', 'params'])
+Fold = namedtuple('Fold', ['number', 'train_start', 'origin', 'test_end'])
+
+# Merged-frame column behind each engine series name
+SERIES_COLUMNS = {'temperature': 'Temperature', 'co2': 'CO2'}
+
+# Hyperparameter grids per model
+SEARCH_SPACE = {
+    'arima': {'order': [(1, 1, 0), (0, 1, 1), (1, 1, 1), (2, 1, 1), (2, 1, 2), (3, 1, 1)]},
+    'prophet': {'changepoint_prior_scale': [0.01, 0.05, 0.5], 'seasonality_prior_scale': [1.0, 10.0]},
+    'random_forest': {'n_estimators': [50, 100, 200], 'lags': [2, 3, 5]},
+    # The multi-variable regression of random_forest_regression (temperature only)
+    'random_forest_regression': {'n_estimators': [50, 100, 200], 'max_depth': [None, 10]},
+}
+
+_ARRAY_COLUMNS = ['Temperature', 'CO2']
+
+# Models predicted from fold slices of the feature matrix instead of frames
+MATRIX_MODELS = {'random_forest_regression'}
+
+def build_candidates(series=('temperature', 'co2'), models=None):
+    """Every model x series x hyperparameter combination of SEARCH_SPACE"""
+    candidates = []
+    for model in models or list(SEARCH_SPACE):
+        grid = SEARCH_SPACE[model]
+        for values in itertools.product(*grid.values()):
+            params = dict(zip(grid, values))
+            for name in series:
+                if model == 'random_forest_regression' and name != 'temperature':
+                    continue
+                candidates.append(Candidate(model, name, params))
+    return candidates
+
+def rolling_origin_folds(dates, n_folds=5, test_years=5, min_train_years=20, window_years=None):
+    """Folds whose test windows tile the last n_folds * test_years years of `dates`.
+
+    Training is expanding (everything before the origin) unless
+    window_years is given. Folds without min_train_years of training are
+    dropped.
+    """
+    first, last_year = dates.min(), dates.max().year
+    folds = []
+    for number in range(n_folds):
+        origin_year = last_year + 1 - test_years * (n_folds - number)
+        origin = pd.Timestamp(year=origin_year, month=1, day=1)
+        train_start = first if window_years is None else max(first, origin - pd.DateOffset(years=window_years))
+        if origin - pd.DateOffset(years=min_train_years) < train_start:
+            continue
+        test_end = pd.Timestamp(year=origin_year + test_years, month=1, day=1)
+        folds.append(Fold(number, train_start, origin, test_end))
+    return folds
+
+def share_frame(merged, directory):
+    """Write the columns and feature matrix the folds need as .npy files for memory-mapping"""
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'Date.npy'), merged['Date'].to_numpy(dtype='datetime64[ns]'))
+    for column in _ARRAY_COLUMNS:
+        np.save(os.path.join(directory, f'{column}.npy'), merged[column].to_numpy(dtype=np.float64))
+    np.save(os.path.join(directory, 'features.npy'), feature_matrix(merged).X)
+    return directory
+
+# Memory-mapped arrays, opened once per worker process
+_shared = {}
+
+def _open_shared(directory):
+    if directory not in _shared:
+        _shared[directory] = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                              for name in ['Date', 'features'] + _ARRAY_COLUMNS}
+    return _shared[directory]
+
+def _fold_bounds(dates, fold):
+    return np.searchsorted(dates, np.array([fold.train_start, fold.origin, fold.test_end], dtype='datetime64[ns]'))
+
+def _fold_frames(directory, fold):
+    """Train and test rows of a fold, copied out of the shared arrays"""
+    arrays = _open_shared(directory)
+    bounds = _fold_bounds(arrays['Date'], fold)
+    def frame(start, stop):
+        return pd.DataFrame({name: np.array(arrays[name][start:stop]) for name in ['Date'] + _ARRAY_COLUMNS})
+    return frame(bounds[0], bounds[1]), frame(bounds[1], bounds[2])
+
+def _fold_features(directory, fold):
+    """Train and test rows of the shared feature matrix (views, not copies)"""
+    arrays = _open_shared(directory)
+    bounds = _fold_bounds(arrays['Date'], fold)
+    return arrays['features'][bounds[0]:bounds[1]], arrays['features'][bounds[1]:bounds[2]]
+
+# predict(train, test, column, **params) -> predictions for every test row
+# (MATRIX_MODELS: predict(X_train, X_test, y_train, **params))
+
+def _predict_arima(train, test, column, order):
+    results = fit_arima(train.set_index('Date')[column], tuple(order))
+    fitted = results.fittedvalues.index
+    steps = len(pd.date_range(fitted[-1], test['Date'].max(), freq=fitted.freq))
+    forecast = point_forecast(results, max(steps, 1))
+    # Each test row gets the forecast of the native period it falls in
+    position = forecast.index.searchsorted(test['Date'], side='right') - 1
+    return forecast.to_numpy()[np.clip(position, 0, len(forecast) - 1)]
+
+def _predict_prophet(train, test, column, **params):
+    model = fit_prophet(train, 'Date', column, **params)
+    model.uncertainty_samples = 0
+    return model.predict(pd.DataFrame({'ds': test['Date']}))['yhat'].to_numpy()
+
+def _predict_random_forest(train, test, column, **params):
+    fitted = fit_random_forest(train.set_index('Date')[column], random_state=42, **params)
+    years = test['Date'].dt.year
+    horizon = int(years.max() - fitted['last_date'].year)
+    annual = predict_random_forest(fitted, horizon)
+    return annual.set_index(annual['Date'].dt.year)['Predicted'].reindex(years).to_numpy()
+
+def _predict_random_forest_regression(X_train, X_test, y_train, **params):
+    return fit_regression_forest(X_train, y_train, **params).predict(X_test)
+
+PREDICTORS = {
+    'arima': _predict_arima,
+    'prophet': _predict_prophet,
+    'random_forest': _predict_random_forest,
+    'random_forest_regression': _predict_random_forest_regression,
+}
+
+def _evaluate(directory, candidate, fold):
+    """Score one candidate on one fold (runs in a worker); errors are returned, not raised"""
+    start = time.perf_counter()
+    row = {'model': candidate.model, 'series': candidate.series,
+           'params': json.dumps(candidate.params, sort_keys=True), 'fold': fold.number}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            train, test = _fold_frames(directory, fold)
+            column = SERIES_COLUMNS[candidate.series]
+            if len(train) == 0 or len(test) == 0:
+                raise ValueError("empty train or test window")
+            if candidate.model in MATRIX_MODELS:
+                X_train, X_test = _fold_features(directory, fold)
+                predicted = PREDICTORS[candidate.model](X_train, X_test, train[column].to_numpy(),
+                                                        **candidate.params)
+            else:
+                predicted = PREDICTORS[candidate.model](train, test, column, **candidate.params)
+
+        # Score annual means, the resolution every model forecasts at
+        from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+        scored = pd.DataFrame({'year': test['Date'].dt.year, 'actual': test[column], 'predicted': predicted})
+        annual = scored.groupby('year')[['actual', 'predicted']].mean()
+        row.update({
+            'mse': mean_squared_error(annual['actual'], annual['predicted']),
+            'r2': r2_score(annual['actual'], annual['predicted']),
+            'mae': mean_absolute_error(annual['actual'], annual['predicted']),
+            'error': None,
+        })
+    except Exception as e:
+        row.update({'mse': np.nan, 'r2': np.nan, 'mae': np.nan, 'error': f"{type(e).__name__}: {e}"})
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+def cross_validate(merged, candidates, folds, n_jobs=None):
+    """Score every candidate on every fold; returns one row per (candidate, fold)"""
+    directory = tempfile.mkdtemp(prefix='skypulse_cv_')
+    try:
+        share_frame(merged, directory)
+        jobs = [(directory, candidate, fold) for candidate in candidates for fold in folds]
+        if n_jobs == 1:
+            rows = [_evaluate(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                rows = [future.result() for future in as_completed([pool.submit(_evaluate, *job) for job in jobs])]
+    finally:
+        _shared.pop(directory, None)
+        shutil.rmtree(directory, ignore_errors=True)
+    return pd.DataFrame(rows).sort_values(['model', 'series', 'params', 'fold'], ignore_index=True)
+
+def leaderboard(fold_scores):
+    """Mean metrics per candidate, ranked by mse within each series"""
+    grouped = fold_scores.groupby(['series', 'model', 'params'], sort=False)
+    board = grouped.agg(mse=('mse', 'mean'), mse_std=('mse', 'std'), r2=('r2', 'mean'), mae=('mae', 'mean'),
+                        folds=('mse', 'count'), failed=('error', 'count'), seconds=('seconds', 'sum'))
+    board = board.reset_index()
+    # A candidate that failed any fold can't be compared fairly
+    board['rank'] = board['mse'].where(board['failed'] == 0).groupby(board['series']).rank(method='first')
+    return board.sort_values(['series', 'rank'], na_position='last', ignore_index=True)
+
+def best_params(board):
+    """{series: {'best': model, model: params, ...}}: the top-ranked params of each model per series"""
+    ranked = board.dropna(subset=['rank'])
+    best = {}
+    for series, rows in ranked.groupby('series'):
+        rows = rows.sort_values('rank')
+        best[series] = {'best': rows['model'].iloc[0]}
+        for model, model_rows in rows.groupby('model', sort=False):
+            best[series][model] = json.loads(model_rows['params'].iloc[0])
+    return best
+
+def tuned_params(path):
+    """best_params saved by this script as forecasting model_params: {(series, model): params}"""
+    with open(path, encoding='utf-8') as f:
+        best = json.load(f)
+    return {(series, model): params
+            for series, models in best.items()
+            for model, params in models.items() if model != 'best'}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest and tune the forecasting models")
+    parser.add_argument('--models', nargs='+', default=list(SEARCH_SPACE), choices=list(SEARCH_SPACE))
+    parser.add_argument('--series', nargs='+', default=list(SERIES_COLUMNS), choices=list(SERIES_COLUMNS))
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--test-years', type=int, default=5)
+    parser.add_argument('--min-train-years', type=int, default=20)
+    parser.add_argument('--window-years', type=int, help="rolling training window (default: expanding)")
+    parser.add_argument('--n-jobs', type=int, default=None, help="parallel folds (1 runs in-process)")
+    args = parser.parse_args()
+
+    temperature, co2, deforestation = load_and_prepare_data()
+    merged = merge_features(temperature, co2, deforestation)
+    folds = rolling_origin_folds(merged['Date'], args.folds, args.test_years, args.min_train_years,
+                                 args.window_years)
+    if not folds:
+        parser.error("no fold has --min-train-years of training data (is --window-years shorter?)")
+    candidates = build_candidates(args.series, args.models)
+    print(f"Backtesting {len(candidates)} candidates on {len(folds)} folds "
+          f"({', '.join(f'{f.origin.year}-{f.test_end.year - 1}' for f in folds)})...")
+
+    start = time.perf_counter()
+    fold_scores = cross_validate(merged, candidates, folds, n_jobs=args.n_jobs)
+    board = leaderboard(fold_scores)
+    best = best_params(board)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+    save_dataset(board, PREDICTIONS_PATH, 'leaderboard')
+    with open(os.path.join(PREDICTIONS_PATH, 'best_params.json'), 'w', encoding='utf-8') as f:
+        json.dump(best, f, indent=2)
+
+    failed = fold_scores.dropna(subset=['error'])
+    for row in failed.drop_duplicates(['model', 'series', 'params']).itertuples():
+        print(f"[{row.series} / {row.model} / {row.params}] failed: {row.error}")
+    pd.set_option('display.width', 160)
+    for series, rows in board.groupby('series'):
+        print(f"\n{series}: best {best.get(series, {}).get('best')}")
+        print(rows.head(5)[['model', 'params', 'mse', 'mse_std', 'r2', 'mae', 'folds']].to_string(index=False))
+    print(f"\nLeaderboard saved to: {os.path.join(PREDICTIONS_PATH, 'leaderboard.parquet')}")
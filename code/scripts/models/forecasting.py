@@ -0,0 +1,335 @@
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import warnings
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.model_training import (CLEANED_PATH, DEFAULT_MEMBERS, DEFAULT_QUANTILES, PREDICTIONS_PATH,
+                                   arima_ensemble, fit_arima, fit_prophet, fit_random_forest,
+                                   forecast_periods, predict_prophet, predict_random_forest,
+                                   prepare_deforestation, prophet_ensemble, quantile_bands,
+                                   random_forest_ensemble, to_native_frequency, update_arima,
+                                   warm_start_params)
+from models.registry import MODELS_PATH, ModelRegistry, series_fingerprint
+from storage import load_dataset, save_dataset
+from timeseries import as_series
+
+# Forecasting engine: every (series x model x horizon) task of a grid runs on
+# a process pool and the results go into one predictions store,
+# data/predictions/forecasts.parquet (+ .csv export), with columns
+# Series, Model, Horizon, Date, Predicted. A per-task report (status, error,
+# warnings, seconds) is saved next to it as forecast_tasks. A failing task
+# is recorded there and doesn't stop the others.
+#
+# Series are named 'temperature', 'co2', 'sea_level' and
+# 'deforestation:<ISO3>' (one per region). Horizons are in years. Tasks of
+# the same series and model share one fit; with a model registry (see
+# registry.py) that fit is reused while the series is unchanged, and
+# warm-started from the previous one when it changed.
+#
+# forecast_bands adds the probabilistic output: quantile bands of every
+# forecast, computed from the fitted models in the registry (see the
+# *_ensemble functions in model_training.py), as a long-format store with
+# columns Series, Model, Horizon, Date, Quantile, Value
+# (data/predictions/forecast_quantiles).
+
+Task = namedtuple('Task', ['series', 'model', 'horizon'])
+
+# fit(series, previous, **params) -> fitted model, where previous is an
+# earlier fit of the same series to warm-start from (or None; ignored unless
+# warm_start); predict(fitted, horizon) -> (Date, Predicted) frame;
+# ensemble(fitted, horizon, members, seed) -> (dates, members x dates
+# array). All raise on failure.
+ModelSpec = namedtuple('ModelSpec', ['fit', 'predict', 'warm_start', 'ensemble'])
+
+DEFAULT_HORIZONS = (30,)
+
+class TaskTimeout(Exception):
+    pass
+
+def _fit_arima(series, previous=None, order=(2, 1, 2), freq=None):
+    if previous is not None and previous.model.order == tuple(order):
+        # Re-estimate the parameters on the grown series, starting from the
+        # previous ones (update_arima refits from scratch if history changed)
+        return update_arima(previous, series, refit=True)
+    return fit_arima(series, tuple(order), freq)
+
+def _prophet_frame(series):
+    # Fit Prophet on the native frequency when that collapses repeated rows
+    # (daily temperature -> monthly); series already at one row per period,
+    # like CO2, are fitted as they are
+    native, _ = to_native_frequency(series)
+    if len(native) < len(series):
+        series = native
+    return series.rename('Value').rename_axis('Date').reset_index()
+
+def _fit_prophet(series, previous=None, **params):
+    df = _prophet_frame(series)
+    init = None
+    if previous is not None:
+        # Prophet only accepts an init with as many changepoints as it will
+        # place on this history: min(25, 80% of the rows - 1)
+        changepoints = min(25, int(len(df.dropna()) * 0.8) - 1)
+        if len(previous.params['delta'][0]) == changepoints:
+            init = warm_start_params(previous)
+    return fit_prophet(df, 'Date', 'Value', init=init, **params)
+
+def _fit_random_forest(series, previous=None, **params):
+    return fit_random_forest(series, **params)
+
+MODELS = {
+    'arima': ModelSpec(_fit_arima, forecast_periods, True, arima_ensemble),
+    'prophet': ModelSpec(_fit_prophet, predict_prophet, True, prophet_ensemble),
+    # Fitting is cheap, so there is nothing to warm-start
+    'random_forest': ModelSpec(_fit_random_forest, predict_random_forest, False, random_forest_ensemble),
+}
+
+def build_series(temperature, co2, sea_level, deforestation):
+    """{series name: Date-indexed Series} from the cleaned frames (or TimeSeries)"""
+    series = {
+        'temperature': as_series(temperature, 'Temperature'),
+        'co2': as_series(co2, 'CO2'),
+        'sea_level': as_series(sea_level, 'Sea Level'),
+    }
+    deforestation = prepare_deforestation(deforestation) if 'Year' in deforestation.columns else deforestation
+    for region, group in deforestation.groupby('Region', observed=True, sort=True):
+        series[f'deforestation:{region}'] = group.set_index('Date')['Area_Deforested'].sort_index()
+    return series
+
+def load_series(cleaned_path=CLEANED_PATH):
+    """build_series from the cleaned datasets on disk"""
+    return build_series(
+        load_dataset(cleaned_path, 'cleaned_temperature', columns=['Date', 'Temperature']),
+        load_dataset(cleaned_path, 'cleaned_co2', columns=['Date', 'CO2']),
+        load_dataset(cleaned_path, 'cleaned_sea_level', columns=['Date', 'Sea Level']),
+        load_dataset(cleaned_path, 'cleaned_deforestation', columns=['Year', 'Region', 'Area_Deforested']),
+    )
+
+def build_grid(series_names, models=None, horizons=DEFAULT_HORIZONS):
+    """Every (series, model, horizon) combination as a list of Tasks"""
+    models = list(MODELS) if models is None else models
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise ValueError(f"unknown models: {', '.join(sorted(unknown))}")
+    return [Task(*combo) for combo in itertools.product(series_names, models, horizons)]
+
+def _on_alarm(signum, frame):
+    raise TaskTimeout()
+
+def _fit(registry, series_name, model, series, params):
+    """Fitted model and where it came from: 'cached', 'warm' (warm-started) or 'fit'"""
+    spec = MODELS[model]
+    if registry is None:
+        return spec.fit(series, None, **params), 'fit'
+
+    fingerprint = series_fingerprint(series)
+    fitted = registry.get(model, series_name, params, fingerprint)
+    if fitted is not None:
+        return fitted, 'cached'
+    latest = registry.latest(model, series_name, params) if spec.warm_start else None
+    previous = latest[1] if latest else None
+    fitted = spec.fit(series, previous, **params)
+    registry.put(model, series_name, params, fingerprint, fitted, rows=len(series))
+    return fitted, 'fit' if previous is None else 'warm'
+
+def _run_group(series_name, model, horizons, series, params, timeout, registry_dir):
+    """Fit one series/model and forecast every horizon, never raising.
+
+    Returns [(task, predictions or None, report row)]. The timeout covers
+    the whole group; a task's Seconds include the fit for the first horizon.
+    """
+    # The timeout is enforced with SIGALRM inside the worker; platforms
+    # without it (Windows) run tasks to completion
+    alarm = timeout and hasattr(signal, 'SIGALRM')
+    if alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    # Keep Prophet/cmdstan progress logs out of the report output (with a
+    # handler in place cmdstanpy doesn't install its own INFO one)
+    cmdstan_logger = logging.getLogger('cmdstanpy')
+    if not cmdstan_logger.handlers:
+        cmdstan_logger.addHandler(logging.NullHandler())
+    cmdstan_logger.setLevel(logging.WARNING)
+
+    registry = ModelRegistry(registry_dir) if registry_dir else None
+    outcomes = []
+    fitted, source, status, error = None, None, 'ok', None
+    start = time.perf_counter()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        try:
+            fitted, source = _fit(registry, series_name, model, series, params)
+            for horizon in horizons:
+                predictions = MODELS[model].predict(fitted, horizon)
+                outcomes.append((horizon, predictions, time.perf_counter() - start, len(caught)))
+                start = time.perf_counter()
+        except TaskTimeout:
+            status, error = 'timeout', f"exceeded {timeout}s"
+        except Exception as e:
+            status, error = 'failed', f"{type(e).__name__}: {e}"
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous_handler)
+
+    results = []
+    for horizon in horizons:
+        task = Task(series_name, model, horizon)
+        row = {'Series': series_name, 'Model': model, 'Horizon': horizon, 'Source': source}
+        if outcomes and outcomes[0][0] == horizon:
+            _, predictions, seconds, warning_count = outcomes.pop(0)
+            row.update(Status='ok', Error=None, Warnings=warning_count, Seconds=seconds, Rows=len(predictions))
+        else:
+            predictions = None
+            row.update(Status=status, Error=error, Warnings=len(caught),
+                       Seconds=time.perf_counter() - start, Rows=0)
+            start = time.perf_counter()
+        results.append((task, predictions, row))
+    return results
+
+def run_forecasts(series, tasks, workers=None, timeout=None, model_params=None, registry_dir=None):
+    """Run every task on a process pool: returns (store, report) DataFrames.
+
+    workers=1 runs the tasks in this process. timeout is per series/model
+    group, in seconds. model_params maps a model name, or a (series, model)
+    pair for per-series settings like backtesting.tuned_params, to its
+    hyperparameters.
+    With registry_dir, fitted models are stored in and reused from a
+    ModelRegistry there, and its LRU limits are applied at the end.
+    """
+    model_params = model_params or {}
+    groups = {}
+    for task in tasks:
+        groups.setdefault((task.series, task.model), []).append(task.horizon)
+    jobs = [(name, model, horizons, series[name],
+             model_params.get((name, model), model_params.get(model, {})), timeout, registry_dir)
+            for (name, model), horizons in groups.items()]
+
+    outcomes = {}
+    if workers == 1:
+        for job in jobs:
+            outcomes.update((task, outcome) for task, *outcome in _run_group(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_group, *job) for job in jobs]
+            for future in as_completed(futures):
+                outcomes.update((task, outcome) for task, *outcome in future.result())
+    if registry_dir:
+        ModelRegistry(registry_dir).evict()
+
+    # Assemble in grid order so the store is deterministic
+    frames, rows = [], []
+    for task in tasks:
+        predictions, report = outcomes[task]
+        rows.append(report)
+        if predictions is not None:
+            frames.append(predictions.assign(Series=task.series, Model=task.model, Horizon=task.horizon))
+    columns = ['Series', 'Model', 'Horizon', 'Date', 'Predicted']
+    store = pd.concat(frames, ignore_index=True)[columns] if frames else pd.DataFrame(columns=columns)
+    return store, pd.DataFrame(rows)
+
+def predict_only(registry, model, series_name, horizon, params=None):
+    """Forecast from the newest stored model of a series without fitting, or None if there is none"""
+    latest = registry.latest(model, series_name, params)
+    if latest is None:
+        return None
+    return MODELS[model].predict(latest[1], horizon)
+
+def forecast_bands(registry, store, series, quantiles=DEFAULT_QUANTILES, members=DEFAULT_MEMBERS,
+                   model_params=None, seed=0):
+    """Quantile bands of every forecast in the store, from the stored models behind them.
+
+    series is the {name: series} the store was forecast from: each model is
+    looked up by that data's fingerprint, so the bands come from the same
+    fit as the point forecast. Returns the long Series, Model, Horizon,
+    Date, Quantile, Value frame. Forecasts whose model is missing or fails
+    to simulate are reported and left out. model_params is as for
+    run_forecasts.
+    """
+    model_params = model_params or {}
+    frames = []
+    tasks = store[['Series', 'Model', 'Horizon']].drop_duplicates()
+    for series_name, model, horizon in tasks.itertuples(index=False):
+        params = model_params.get((series_name, model), model_params.get(model, {}))
+        # Rebuilding and simulating the models repeats the fit's convergence warnings
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fitted = registry.get(model, series_name, params, series_fingerprint(series[series_name]))
+            if fitted is None:
+                print(f"[{series_name} / {model} / {horizon}] bands skipped: no stored model for this data")
+                continue
+            try:
+                dates, ensemble = MODELS[model].ensemble(fitted, int(horizon), members, seed)
+            except Exception as e:
+                print(f"[{series_name} / {model} / {horizon}] bands failed: {type(e).__name__}: {e}")
+                continue
+        frames.append(quantile_bands(dates, ensemble, quantiles).assign(Series=series_name, Model=model,
+                                                                         Horizon=horizon))
+    columns = ['Series', 'Model', 'Horizon', 'Date', 'Quantile', 'Value']
+    return pd.concat(frames, ignore_index=True)[columns] if frames else pd.DataFrame(columns=columns)
+
+def forecast_slice(store, series, model, horizon=None):
+    """(Date, Predicted) rows of one series/model from the store (longest horizon by default)"""
+    rows = store[(store['Series'] == series) & (store['Model'] == model)]
+    if rows.empty:
+        return None
+    horizon = rows['Horizon'].max() if horizon is None else horizon
+    return rows[rows['Horizon'] == horizon][['Date', 'Predicted']].reset_index(drop=True)
+
+def print_summary(report):
+    failed = report[report['Status'] != 'ok']
+    for row in failed.itertuples():
+        print(f"[{row.Series} / {row.Model} / {row.Horizon}] {row.Status}: {row.Error}")
+    counts = report['Status'].value_counts().to_dict()
+    sources = report['Source'].dropna().value_counts().to_dict()
+    print(f"{len(report)} tasks: " + ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+          + f" ({report['Seconds'].sum():.1f} task-seconds); models "
+          + ', '.join(f"{n} {source}" for source, n in sorted(sources.items())))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every series x model x horizon forecast")
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--horizons', nargs='+', type=int, default=list(DEFAULT_HORIZONS),
+                        help="forecast horizons in years")
+    parser.add_argument('--series', nargs='+', help="series names (default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="process pool size (1 runs in-process)")
+    parser.add_argument('--timeout', type=float, default=600, help="per-task timeout in seconds")
+    parser.add_argument('--registry', default=MODELS_PATH, help="model registry directory")
+    parser.add_argument('--no-registry', action='store_true', help="refit every model and store nothing")
+    parser.add_argument('--tuned', nargs='?', const=os.path.join(PREDICTIONS_PATH, 'best_params.json'),
+                        help="use the per-series hyperparameters chosen by backtesting.py")
+    parser.add_argument('--quantiles', nargs='+', type=float,
+                        help=f"also save quantile bands (e.g. {' '.join(map(str, DEFAULT_QUANTILES))}), "
+                             "needs the registry")
+    parser.add_argument('--members', type=int, default=DEFAULT_MEMBERS, help="ensemble size for the bands")
+    args = parser.parse_args()
+
+    series = load_series()
+    names = args.series or list(series)
+    tasks = build_grid(names, args.models, args.horizons)
+    print(f"Running {len(tasks)} forecast tasks ({len(names)} series x {len(args.models)} models "
+          f"x {len(args.horizons)} horizons)...")
+    model_params = None
+    if args.tuned:
+        from models.backtesting import tuned_params
+        model_params = tuned_params(args.tuned)
+    store, report = run_forecasts(series, tasks, workers=args.workers, timeout=args.timeout,
+                                  model_params=model_params,
+                                  registry_dir=None if args.no_registry else args.registry)
+
+    save_dataset(store, PREDICTIONS_PATH, 'forecasts')
+    save_dataset(report, PREDICTIONS_PATH, 'forecast_tasks')
+    print_summary(report)
+    print(f"Forecasts saved to: {os.path.join(PREDICTIONS_PATH, 'forecasts.parquet')}")
+    if args.quantiles and not args.no_registry:
+        bands = forecast_bands(ModelRegistry(args.registry), store, series, args.quantiles, args.members,
+                               model_params)
+        path = save_dataset(bands, PREDICTIONS_PATH, 'forecast_quantiles')
+        print(f"Quantile bands saved to: {path}")
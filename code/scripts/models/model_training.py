@@ -1,34 +1,207 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-from statsmodels.tsa.arima.model import ARIMA
-from prophet import Prophet
 import os
+import sys
+import pickle
+from collections import namedtuple
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import load_dataset, save_dataset
+from instrumentation import instrumented, log_exception
+from config import project_path
+from timeseries import as_frame
+
 # Configure paths
-CLEANED_PATH = r'E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\cleaned'
-PREDICTIONS_PATH = r'E:\College Hackathon\CLIMATE CHANGE ANALYSIS\data\predictions'
+CLEANED_PATH = project_path('cleaned')
+PREDICTIONS_PATH = project_path('predictions')
 
-# Ensure the processed directory exists
-os.makedirs(CLEANED_PATH, exist_ok=True)
+# Prophet (with cmdstanpy), statsmodels' ARIMA and scikit-learn take seconds
+# to import, so each is imported inside the functions that fit a model: the
+# stages that only load data or read predictions never pay for them.
 
 def load_and_prepare_data():
     """Load and prepare all datasets with proper date handling"""
-    # Load cleaned datasets
-    temperature = pd.read_csv(os.path.join(CLEANED_PATH, 'cleaned_temperature.csv'), parse_dates=['Date'])
-    co2 = pd.read_csv(os.path.join(CLEANED_PATH, 'cleaned_co2.csv'), parse_dates=['Date'])
-    deforestation = pd.read_csv(os.path.join(CLEANED_PATH, 'cleaned_deforestation.csv'))
+    # Load cleaned datasets (only the columns the models use)
+    temperature = load_dataset(CLEANED_PATH, 'cleaned_temperature', columns=['Date', 'Temperature'])
+    co2 = load_dataset(CLEANED_PATH, 'cleaned_co2', columns=['Date', 'CO2'])
+    deforestation = load_dataset(CLEANED_PATH, 'cleaned_deforestation',
+                                 columns=['Year', 'Region', 'Area_Deforested'])
     
-    # Convert deforestation Year to Date (assuming year-end)
+    return temperature, co2, prepare_deforestation(deforestation)
+
+def prepare_deforestation(deforestation):
+    """Convert deforestation Year to Date (assuming year-end)"""
+    if 'Date' in deforestation.columns:
+        # Already dated, e.g. analysis.regional.regional_annual output
+        return deforestation.drop(columns='Year', errors='ignore')
+    deforestation = deforestation.copy()
     deforestation['Date'] = pd.to_datetime(deforestation['Year'].astype(str) + '-12-31')
-    deforestation.drop('Year', axis=1, inplace=True)
-    
-    return temperature, co2, deforestation
+    return deforestation.drop('Year', axis=1)
+
+# Offset alias used to group a series into candidate native periods
+_NATIVE_PERIODS = {'YS': 'Y', 'QS': 'Q', 'MS': 'M'}
+
+def detect_frequency(series):
+    """Native frequency of a Date-indexed series: 'YS', 'QS', 'MS' or a daily/inferred alias.
+
+    A daily series whose value only changes at month starts (like the
+    temperature anomalies expanded from monthly readings) is reported as 'MS'.
+    """
+    for freq, period in _NATIVE_PERIODS.items():
+        per_period = series.groupby(series.index.to_period(period)).nunique(dropna=False)
+        if (per_period <= 1).all():
+            return freq
+    inferred = pd.infer_freq(series.index) if len(series) >= 3 else None
+    if inferred:
+        return inferred
+    # Irregular sampling (e.g. ~10-day altimetry cycles): use the median spacing
+    spacing = pd.Series(series.index).diff().median()
+    if pd.isna(spacing) or spacing.days <= 1:
+        return 'D'
+    return f"{spacing.days}D"
+
+def to_native_frequency(series, freq=None):
+    """Collapse a series to its native frequency: (regular series, freq)"""
+    freq = freq or detect_frequency(series)
+    return series.resample(freq).mean().ffill(), freq
+
+def fit_arima(series, order=(2, 1, 2), freq=None):
+    """Fit ARIMA at the series' native frequency (auto-detected unless freq is given)"""
+    from statsmodels.tsa.arima.model import ARIMA
+    native, _ = to_native_frequency(series, freq)
+    return ARIMA(native, order=order).fit()
+
+def update_arima(results, series, refit=False, keep_history=True):
+    """Bring fitted ARIMA results up to date with `series` without a full refit.
+
+    Only observations after the last fitted period are added, with the
+    estimated parameters kept (refit=True re-estimates them, starting from
+    the current ones). keep_history=False uses extend(), which is cheaper but
+    drops the earlier data from the returned results. If `series` changed
+    any period that was already fitted, the model is refitted from scratch.
+    """
+    fitted = results.fittedvalues.index
+    native, _ = to_native_frequency(series, fitted.freqstr)
+    endog = results.model.endog.ravel()
+    overlap = native[native.index <= fitted[-1]].to_numpy()
+    if len(overlap) < len(endog) or not np.allclose(overlap[-len(endog):], endog):
+        from statsmodels.tsa.arima.model import ARIMA
+        return ARIMA(native, order=results.model.order).fit()
+
+    new = native[native.index > fitted[-1]].rename(results.model.endog_names)
+    if new.empty:
+        return results
+    if keep_history:
+        fit_kwargs = {'start_params': results.params} if refit else None
+        return results.append(new, refit=refit, fit_kwargs=fit_kwargs)
+    return results.extend(new)
+
+def point_forecast(results, steps):
+    """get_forecast(steps).predicted_mean, without statsmodels' per-call overhead.
+
+    Point forecasts are the last predicted state propagated through the
+    (time-invariant) state-space matrices, which takes a few milliseconds.
+    Models with exogenous regressors or time-varying matrices fall back to
+    get_forecast.
+    """
+    ssm = results.filter_results
+    matrices = [ssm.design, ssm.obs_intercept, ssm.transition, ssm.state_intercept]
+    if results.model.k_exog or any(matrix.shape[-1] != 1 for matrix in matrices):
+        return results.get_forecast(steps=steps).predicted_mean
+
+    design, obs_intercept, transition, state_intercept = (matrix[..., 0] for matrix in matrices)
+    state = results.predicted_state[:, -1]
+    values = np.empty(steps)
+    for step in range(steps):
+        values[step] = (design @ state + obs_intercept)[0]
+        state = transition @ state + state_intercept
+
+    fitted = results.fittedvalues.index
+    index = pd.date_range(fitted[-1], periods=steps + 1, freq=fitted.freq)[1:]
+    return pd.Series(values, index=index, name='predicted_mean')
+
+def _target_periods(results, periods, target_freq):
+    """End dates of the `periods` target periods past the fitted data, and the native steps reaching them"""
+    fitted = results.fittedvalues.index
+    observed_end = fitted[-1] + fitted.freq - pd.Timedelta(days=1)
+    target_dates = pd.date_range(observed_end + pd.Timedelta(days=1), periods=periods, freq=target_freq)
+    steps = len(pd.date_range(fitted[-1], target_dates[-1], freq=fitted.freq)) - 1
+    return target_dates, steps
+
+def forecast_periods(results, periods=30, target_freq='YE'):
+    """Forecast `periods` whole target periods past the fitted data.
+
+    Steps are taken at the model's native frequency and averaged into each
+    target period; returns a (Date, Predicted) frame like arima_forecast_daily.
+    """
+    target_dates, steps = _target_periods(results, periods, target_freq)
+    predicted = point_forecast(results, steps)
+    predicted = predicted.resample(target_freq).mean().reindex(target_dates)
+    return pd.DataFrame({'Date': target_dates, 'Predicted': predicted.to_numpy()})
+
+def arima_state(results):
+    """Fitted parameters plus the native series: all update_arima and forecasts need"""
+    return {
+        'order': results.model.order,
+        'params': results.params,
+        'endog': pd.Series(results.model.endog.ravel(), index=results.fittedvalues.index,
+                           name=results.model.endog_names),
+    }
+
+def arima_from_state(state):
+    """Results rebuilt from arima_state (re-filtered, not re-estimated)"""
+    from statsmodels.tsa.arima.model import ARIMA
+    return ARIMA(state['endog'], order=state['order']).filter(state['params'])
+
+def save_arima_state(results, state_file):
+    """Save the fitted parameters and data so later runs can update them instead of refitting"""
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    with open(state_file + '.tmp', 'wb') as f:
+        pickle.dump(arima_state(results), f)
+    os.replace(state_file + '.tmp', state_file)
+
+def load_arima_state(state_file):
+    """Results saved by save_arima_state, or None if there are none"""
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, 'rb') as f:
+        state = pickle.load(f)
+    if not isinstance(state, dict):
+        # Written by an older version: ignore it and refit
+        return None
+    return arima_from_state(state)
 
-def arima_forecast(series, forecast_years=30):
-    """ARIMA forecasting with proper frequency handling"""
+def run_arima(series, forecast_years=30, order=(2, 1, 2), freq=None, state_file=None, refit=False):
+    """ARIMA forecast of `forecast_years` annual periods, fitted at the native frequency.
+
+    With state_file, fitted results cached there are updated with any new
+    observations instead of refitting (unless refit=True), and the updated
+    state is saved back. Errors are raised; see arima_forecast.
+    """
+    results = load_arima_state(state_file) if state_file and not refit else None
+    if results is not None and results.model.order == order:
+        results = update_arima(results, series)
+    else:
+        results = fit_arima(series, order, freq)
+    if state_file:
+        save_arima_state(results, state_file)
+    return forecast_periods(results, forecast_years)
+
+@instrumented
+def arima_forecast(series, forecast_years=30, order=(2, 1, 2), freq=None, state_file=None, refit=False):
+    """run_arima, printing the error and returning None on failure"""
+    try:
+        return run_arima(series, forecast_years, order, freq, state_file, refit)
+    except Exception as e:
+        log_exception(e)
+        print(f"ARIMA error: {str(e)}")
+        return None
+
+@instrumented
+def arima_forecast_daily(series, forecast_years=30):
+    """ARIMA fitted on the series forward-filled to daily resolution (previous default path)"""
+    from statsmodels.tsa.arima.model import ARIMA
     try:
         # Set explicit frequency
         series = series.asfreq('D').ffill()
@@ -48,81 +221,331 @@ def arima_forecast(series, forecast_years=30):
         forecast_df = forecast_df.resample('YE', on='Date').mean().reset_index()
         return forecast_df
     except Exception as e:
+        log_exception(e)
         print(f"ARIMA error: {str(e)}")
         return None
 
+def fit_prophet(df, date_col, value_col, init=None, **prophet_params):
+    """Fit Prophet on df[date_col, value_col].
+
+    init (see warm_start_params) warm-starts the optimizer; prophet_params
+    (e.g. changepoint_prior_scale) are passed to Prophet().
+    """
+    # Prepare data for Prophet
+    prophet_df = df[[date_col, value_col]].copy()
+    prophet_df.columns = ['ds', 'y']
+
+    # Fit Prophet model
+    from prophet import Prophet
+    model = Prophet(**prophet_params)
+    if init is None:
+        model.fit(prophet_df)
+    else:
+        model.fit(prophet_df, init=init)
+    return model
+
+def warm_start_params(model):
+    """A fitted Prophet model's parameters in the form fit(init=...) takes"""
+    params = {name: model.params[name][0][0] for name in ['k', 'm', 'sigma_obs']}
+    params.update({name: model.params[name][0] for name in ['delta', 'beta']})
+    return params
+
+def predict_prophet(model, forecast_years=30, include_history=True):
+    """`forecast_years` year-end predictions from a fitted Prophet model"""
+    # Make future predictions with correct frequency
+    future = model.make_future_dataframe(periods=forecast_years, freq='YE', include_history=include_history)
+
+    # Only yhat is used, so skip the ~1000 simulated paths behind the intervals
+    uncertainty_samples, model.uncertainty_samples = model.uncertainty_samples, 0
+    try:
+        forecast = model.predict(future)
+    finally:
+        model.uncertainty_samples = uncertainty_samples
+
+    # Format output
+    return forecast[['ds', 'yhat']].rename(columns={'ds': 'Date', 'yhat': 'Predicted'})
+
+def run_prophet(df, date_col, value_col, forecast_years=30):
+    """Prophet fit plus `forecast_years` year-end predictions (history included); errors are raised"""
+    return predict_prophet(fit_prophet(df, date_col, value_col), forecast_years)
+
+@instrumented
 def prophet_forecast(df, date_col, value_col, forecast_years=30):
     """Prophet forecasting with updated frequency"""
     try:
-        # Prepare data for Prophet
-        prophet_df = df[[date_col, value_col]].copy()
-        prophet_df.columns = ['ds', 'y']
-        
-        # Fit Prophet model
-        model = Prophet()
-        model.fit(prophet_df)
-        
-        # Make future predictions with correct frequency
-        future = model.make_future_dataframe(periods=forecast_years, freq='YE')
-        forecast = model.predict(future)
-        
-        # Format output
-        forecast_df = forecast[['ds', 'yhat']].rename(columns={'ds': 'Date', 'yhat': 'Predicted'})
-        return forecast_df
+        return run_prophet(df, date_col, value_col, forecast_years)
     except Exception as e:
+        log_exception(e)
         print(f"Prophet error: {str(e)}")
         return None
 
-def random_forest_regression(temp_df, co2_df, deforestation_df):
-    """Random Forest with proper date merging"""
+def fit_random_forest(series, lags=3, n_estimators=100, random_state=42):
+    """Autoregressive Random Forest on annual means.
+
+    Features are the previous `lags` annual means plus the year; needs at
+    least lags + 2 years of history. Returns what predict_random_forest
+    needs: the model, the last `lags` annual means and the last year-end.
+    """
+    annual = series.resample('YE').mean().dropna()
+    if len(annual) < lags + 2:
+        raise ValueError(f"need at least {lags + 2} years of data, got {len(annual)}")
+
+    values = annual.to_numpy()
+    years = annual.index.year.to_numpy()
+    X = np.column_stack([values[lag:len(values) - lags + lag] for lag in range(lags)] + [years[lags:]])
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
+    model.fit(X, values[lags:])
+    return {'model': model, 'history': list(values[-lags:]), 'last_date': annual.index[-1]}
+
+def predict_random_forest(fitted, forecast_years=30):
+    """Forecast recursively year by year, feeding each prediction back in as the newest lag"""
+    lags = len(fitted['history'])
+    history = list(fitted['history'])
+    dates = pd.date_range(fitted['last_date'] + pd.offsets.YearEnd(), periods=forecast_years, freq='YE')
+    # One row per step, so call the trees directly rather than paying
+    # RandomForestRegressor.predict's validation and dispatch every year
+    # (the forest averages its trees on float32 input just the same)
+    trees = [estimator.tree_ for estimator in fitted['model'].estimators_]
+    predicted = []
+    for date in dates:
+        X = np.array([history[-lags:] + [date.year]], dtype=np.float32)
+        value = float(np.mean([tree.predict(X)[0, 0] for tree in trees]))
+        predicted.append(value)
+        history.append(value)
+    return pd.DataFrame({'Date': dates, 'Predicted': predicted})
+
+def run_random_forest(series, forecast_years=30, **params):
+    """Autoregressive Random Forest forecast of `forecast_years` years; errors are raised"""
+    return predict_random_forest(fit_random_forest(series, **params), forecast_years)
+
+# Probabilistic forecasts.
+#
+# Each model's *_ensemble function turns a fitted model into `members`
+# simulated future paths: an array with one row per member and one column
+# per forecast year, next to the year-end dates. quantile_bands reduces it
+# to quantiles in one np.quantile call. The uncertainty comes from what each
+# library already models:
+#   arima          - paths simulated from the state-space model, starting
+#                    from the distribution of the last fitted state, then
+#                    averaged into years like forecast_periods
+#   prophet        - Prophet's own posterior predictive samples (trend
+#                    changes plus observation noise), the draws behind
+#                    yhat_lower/yhat_upper
+#   random_forest  - the recursive forecast run for every member at once,
+#                    each member taking the prediction of a randomly drawn
+#                    tree at every step. All trees are flattened into one
+#                    node table so a step walks every member down its tree
+#                    together, one numpy operation per tree level.
+# Every function takes a seed, so the same fitted model gives the same bands.
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_MEMBERS = 1000
+
+def quantile_bands(dates, ensemble, quantiles=DEFAULT_QUANTILES):
+    """Long (Date, Quantile, Value) frame of an ensemble with one row per member and one column per date"""
+    values = np.quantile(ensemble, quantiles, axis=0)
+    return pd.DataFrame({
+        'Date': np.tile(np.asarray(dates), len(quantiles)),
+        'Quantile': np.repeat(np.asarray(quantiles, dtype=np.float64), len(dates)),
+        'Value': values.ravel(),
+    })
+
+def arima_ensemble(results, periods=30, members=DEFAULT_MEMBERS, seed=0, target_freq='YE'):
+    """(year-end dates, members x periods array) of simulated ARIMA paths averaged into target periods"""
+    target_dates, steps = _target_periods(results, periods, target_freq)
+    paths = np.asarray(results.simulate(steps, repetitions=members, anchor='end',
+                                        rng=np.random.default_rng(seed))).reshape(steps, members)
+
+    # Average the native steps falling in each target period
+    fitted = results.fittedvalues.index
+    step_dates = pd.date_range(fitted[-1], periods=steps + 1, freq=fitted.freq)[1:]
+    period = np.searchsorted(target_dates.to_numpy(), step_dates.to_numpy())
+    starts = np.flatnonzero(np.diff(period, prepend=-1))
+    means = np.add.reduceat(paths, starts, axis=0) / np.diff(np.append(starts, steps))[:, None]
+    return target_dates, means.T
+
+def prophet_ensemble(model, forecast_years=30, members=DEFAULT_MEMBERS, seed=0):
+    """(year-end dates, members x years array) of Prophet posterior predictive samples"""
+    future = model.make_future_dataframe(periods=forecast_years, freq='YE', include_history=False)
+    # Prophet draws from numpy's global generator: seed it and put it back
+    random_state = np.random.get_state()
+    uncertainty_samples, model.uncertainty_samples = model.uncertainty_samples, members
+    np.random.seed(seed)
     try:
-        # Merge datasets on Date
-        merged = temp_df.merge(co2_df, on='Date', how='inner')
-        merged = merged.merge(deforestation_df, on='Date', how='left')
-        
-        # Handle missing values
-        merged['Area_Deforested'].fillna(0, inplace=True)
-        
-        # Create temporal features
-        merged['Year'] = merged['Date'].dt.year
-        merged['Month'] = merged['Date'].dt.month
-        
-        # Split data
-        train = merged[merged['Year'] < 2000]
-        test = merged[merged['Year'] >= 2000]
-        
-        if train.empty or test.empty:
+        samples = model.predictive_samples(future)['yhat']
+    finally:
+        model.uncertainty_samples = uncertainty_samples
+        np.random.set_state(random_state)
+    return pd.DatetimeIndex(future['ds']), samples.T
+
+def flatten_forest(model):
+    """Every tree of a fitted forest in one node table: (roots, feature, threshold, children, value, depth).
+
+    children[node] is the (left, right) pair with node ids offset into the
+    table; a leaf points at itself on both sides, so walking `depth` levels
+    from the roots always ends on a leaf.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    roots = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+    feature = np.concatenate([tree.feature for tree in trees])
+    threshold = np.concatenate([tree.threshold for tree in trees])
+    value = np.concatenate([tree.value[:, 0, 0] for tree in trees])
+    left = np.concatenate([tree.children_left + root for tree, root in zip(trees, roots)])
+    right = np.concatenate([tree.children_right + root for tree, root in zip(trees, roots)])
+    leaf = np.concatenate([tree.children_left for tree in trees]) < 0
+    node = np.arange(len(feature))
+    children = np.column_stack([np.where(leaf, node, left), np.where(leaf, node, right)])
+    # Leaves never read their feature: any valid column will do
+    feature = np.where(leaf, 0, feature)
+    return roots, feature, threshold, children, value, max(tree.max_depth for tree in trees)
+
+def apply_forest(flat, trees, X):
+    """Prediction of tree trees[i] for row X[i], for every row at once"""
+    roots, feature, threshold, children, value, depth = flat
+    rows = np.arange(len(X))
+    node = roots[trees]
+    for _ in range(depth):
+        # float32 features against float64 thresholds, as the trees compare them
+        node = children[node, (X[rows, feature[node]] > threshold[node]).astype(np.intp)]
+    return value[node]
+
+def random_forest_ensemble(fitted, forecast_years=30, members=DEFAULT_MEMBERS, seed=0):
+    """(year-end dates, members x years array) of recursive forecasts drawing a random tree at every step"""
+    rng = np.random.default_rng(seed)
+    flat = flatten_forest(fitted['model'])
+    n_trees = len(flat[0])
+    lags = len(fitted['history'])
+    dates = pd.date_range(fitted['last_date'] + pd.offsets.YearEnd(), periods=forecast_years, freq='YE')
+
+    # One row per member: its last `lags` values, then the year
+    X = np.empty((members, lags + 1), dtype=np.float32)
+    X[:, :lags] = fitted['history']
+    paths = np.empty((members, forecast_years))
+    for step, date in enumerate(dates):
+        X[:, lags] = date.year
+        paths[:, step] = apply_forest(flat, rng.integers(n_trees, size=members), X)
+        X[:, :lags - 1] = X[:, 1:lags]
+        X[:, lags - 1] = paths[:, step]
+    return dates, paths
+
+# Multi-variable Random Forest.
+#
+# Rows are the dates temperature and CO2 share (CO2's monthly readings).
+# Deforestation is annual, dated at each year end, so each row gets the
+# total of the latest year completed by its date (merge_asof), never a
+# later one; before the first deforestation year it is 0. CO2 also gets
+# lagged and rolling-mean columns over its own readings. feature_matrix
+# turns the merged frame into one contiguous float32 array, the layout the
+# trees work on, so a model and every backtest fold slice it instead of
+# re-merging or converting.
+
+FeatureMatrix = namedtuple('FeatureMatrix', ['dates', 'X', 'y', 'features'])
+
+CO2_LAGS = (1, 12)      # readings back
+CO2_WINDOWS = (12,)     # readings averaged, up to and including the current one
+
+# Features with the default lags and windows (see feature_columns)
+RF_FEATURES = (['CO2'] + [f'CO2_lag{lag}' for lag in CO2_LAGS] + [f'CO2_mean{window}' for window in CO2_WINDOWS]
+               + ['Area_Deforested', 'Year', 'Month'])
+
+def annual_deforestation(deforestation_df, regions=None):
+    """Year-end totals: global Area_Deforested plus an Area_Deforested:<region> column per region given"""
+    totals = deforestation_df.groupby('Date', sort=True)['Area_Deforested'].sum().to_frame()
+    if regions:
+        selected = deforestation_df[deforestation_df['Region'].isin(list(regions))]
+        by_region = selected.pivot_table(index='Date', columns='Region', values='Area_Deforested',
+                                         aggfunc='sum', observed=True)
+        totals = totals.join(by_region.add_prefix('Area_Deforested:'))
+    return totals.reset_index()
+
+def co2_features(co2_df, lags=CO2_LAGS, windows=CO2_WINDOWS):
+    """CO2 sorted by Date with CO2_lag<k> and CO2_mean<w> columns (NaN until enough readings)"""
+    co2 = co2_df[['Date', 'CO2']].sort_values('Date', ignore_index=True)
+    values = co2['CO2']
+    for lag in lags:
+        co2[f'CO2_lag{lag}'] = values.shift(lag)
+    for window in windows:
+        co2[f'CO2_mean{window}'] = values.rolling(window).mean()
+    return co2
+
+def feature_columns(merged):
+    """Feature columns of a merge_features frame, in RF_FEATURES order"""
+    lagged = [col for col in merged.columns if col.startswith(('CO2_lag', 'CO2_mean'))]
+    regions = [col for col in merged.columns if col.startswith('Area_Deforested:')]
+    return ['CO2'] + lagged + ['Area_Deforested'] + regions + ['Year', 'Month']
+
+def merge_features(temp_df, co2_df, deforestation_df, regions=None, lags=CO2_LAGS, windows=CO2_WINDOWS):
+    """Temperature, CO2 features and deforestation on the shared dates, sorted by Date.
+
+    Rows without a full CO2 history for the lags and windows are dropped.
+    temp_df and co2_df may also be TimeSeries.
+    """
+    temp_df, co2_df = as_frame(temp_df), as_frame(co2_df)
+    merged = temp_df[['Date', 'Temperature']].merge(co2_features(co2_df, lags, windows), on='Date', how='inner')
+    merged = merged.dropna().sort_values('Date', ignore_index=True)
+
+    # Broadcast each year's total onto the rows dated up to the next year end
+    annual = annual_deforestation(deforestation_df, regions)
+    annual['Date'] = annual['Date'].astype(merged['Date'].dtype)
+    merged = pd.merge_asof(merged, annual, on='Date', direction='backward')
+    deforested = [col for col in annual.columns if col != 'Date']
+    merged[deforested] = merged[deforested].fillna(0)
+
+    # Create temporal features
+    merged['Year'] = merged['Date'].dt.year
+    merged['Month'] = merged['Date'].dt.month
+    return merged
+
+def feature_matrix(merged, target='Temperature', features=None):
+    """FeatureMatrix of a merge_features frame: C-contiguous float32 X, float64 target y"""
+    features = features or feature_columns(merged)
+    X = np.ascontiguousarray(merged[features].to_numpy(dtype=np.float32))
+    return FeatureMatrix(merged['Date'].to_numpy(), X, merged[target].to_numpy(dtype=np.float64), features)
+
+def fit_regression_forest(X, y, n_estimators=100, random_state=42, **params):
+    """RandomForestRegressor fitted on a float32 feature matrix (no conversion copy)"""
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, **params)
+    model.fit(X, y)
+    return model
+
+@instrumented
+def random_forest_regression(temp_df, co2_df, deforestation_df, regions=None, matrix=None):
+    """Random Forest of temperature on CO2 and deforestation, trained before 2000 and tested after.
+
+    matrix (a FeatureMatrix) skips building the features again.
+    """
+    try:
+        if matrix is None:
+            matrix = feature_matrix(merge_features(temp_df, co2_df, deforestation_df, regions))
+
+        # Split data (rows are sorted by Date)
+        split = np.searchsorted(matrix.dates, np.datetime64('2000-01-01'))
+        if split == 0 or split == len(matrix.dates):
             raise ValueError("Insufficient data for train/test split")
-            
-        # Prepare features
-        features = ['CO2', 'Area_Deforested', 'Year', 'Month']
-        X_train = train[features]
-        y_train = train['Temperature']
-        X_test = test[features]
-        y_test = test['Temperature']
-        
-        # Train model
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # Make predictions
-        y_pred = model.predict(X_test)
-        
+
+        model = fit_regression_forest(matrix.X[:split], matrix.y[:split])
+        y_test = matrix.y[split:]
+        y_pred = model.predict(matrix.X[split:])
+
         # Evaluate
+        from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
         metrics = {
             'mse': mean_squared_error(y_test, y_pred),
             'r2': r2_score(y_test, y_pred),
             'mae': mean_absolute_error(y_test, y_pred)
         }
-        
+
         # Format output
         predictions = pd.DataFrame({
-            'Date': test['Date'],
+            'Date': matrix.dates[split:],
             'Actual': y_test,
             'Predicted': y_pred
         })
         return predictions, metrics
     except Exception as e:
+        log_exception(e)
         print(f"Random Forest error: {str(e)}")
         return None, None
 
@@ -130,17 +553,18 @@ if __name__ == "__main__":
     # Load and prepare data
     temperature, co2, deforestation = load_and_prepare_data()
     
-    # Time-Series Forecasting
-    print("Running ARIMA for temperature forecasting...")
-    temp_series = temperature.set_index('Date')['Temperature']
-    arima_predictions = arima_forecast(temp_series)
-    if arima_predictions is not None:
-        arima_predictions.to_csv(os.path.join(PREDICTIONS_PATH, 'arima_temperature_predictions.csv'), index=False)
-    
-    print("\nRunning Prophet for CO2 forecasting...")
-    prophet_predictions = prophet_forecast(co2, 'Date', 'CO2')
-    if prophet_predictions is not None:
-        prophet_predictions.to_csv(os.path.join(PREDICTIONS_PATH, 'prophet_co2_predictions.csv'), index=False)
+    # Time-Series Forecasting: every series x model, see forecasting.py
+    from models import forecasting
+    print("Running forecasts for every series and model...")
+    series = forecasting.build_series(temperature, co2,
+                                      load_dataset(CLEANED_PATH, 'cleaned_sea_level', columns=['Date', 'Sea Level']),
+                                      deforestation)
+    tasks = forecasting.build_grid(list(series))
+    forecasts, forecast_report = forecasting.run_forecasts(
+        series, tasks, timeout=600, registry_dir=forecasting.MODELS_PATH)
+    save_dataset(forecasts, PREDICTIONS_PATH, 'forecasts')
+    save_dataset(forecast_report, PREDICTIONS_PATH, 'forecast_tasks')
+    forecasting.print_summary(forecast_report)
     
     # Random Forest Regression
     print("\nRunning Random Forest for multi-variable impact...")
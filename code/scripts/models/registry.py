@@ -0,0 +1,229 @@
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import hashlib
+import argparse
+from collections import OrderedDict
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.model_training import arima_from_state, arima_state
+from incremental import frame_fingerprint
+from config import project_path
+
+# Registry of fitted models, the models/ directory promised in the README.
+#
+# A fitted model is stored as <directory>/<model>/<series>__<key>.pkl with
+# its metadata in a .json beside it. The key is a hash of the model name, its
+# hyperparameters and the fingerprint of the training series. An unchanged
+# series with the same hyperparameters therefore maps to a model that is
+# already fitted. The newest model of a series also serves as the warm start
+# when the series changes, and predict-only requests use it directly.
+# Every entry is its own pair of files, so pool workers can share a
+# directory without a common index. The .pkl mtime is the last use, and
+# evict() drops the least recently used entries beyond the limits.
+
+MODELS_PATH = project_path('models')
+
+# How each model is turned into a picklable payload and back. Prophet models
+# go through Prophet's own JSON serializer; ARIMA keeps only its parameters
+# and native series (see model_training.arima_state).
+def _prophet_dump(model):
+    from prophet.serialize import model_to_json
+    return model_to_json(model)
+
+def _prophet_load(payload):
+    from prophet.serialize import model_from_json
+    return model_from_json(payload)
+
+SERIALIZERS = {
+    'arima': (arima_state, arima_from_state),
+    'prophet': (_prophet_dump, _prophet_load),
+    'random_forest': (None, None),
+}
+
+def series_fingerprint(series):
+    """Content fingerprint of a training series (values and dates)"""
+    # Dates as a column, so frame_fingerprint hashes them at one resolution
+    # whether the series came from memory or from a Parquet reload
+    return frame_fingerprint(series.reset_index())
+
+def _slug(series_name):
+    return re.sub(r'[^A-Za-z0-9]+', '_', series_name)
+
+def _params_json(params):
+    return json.dumps(params or {}, sort_keys=True, default=str)
+
+class ModelRegistry:
+    """Fitted models on disk, keyed by (model, hyperparameters, data fingerprint)"""
+
+    def __init__(self, directory=MODELS_PATH, max_entries=1000, max_bytes=1 << 30, memory_entries=32):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        # Deserialized models, most recently used last
+        self._memory = OrderedDict()
+
+    def key(self, model, params, fingerprint):
+        payload = json.dumps([model, _params_json(params), fingerprint])
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def _paths(self, model, series_name, key):
+        base = os.path.join(self.directory, model, f"{_slug(series_name)}__{key}")
+        return base + '.pkl', base + '.json'
+
+    def _remember(self, key, fitted):
+        self._memory[key] = fitted
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, model, series_name, key):
+        artifact = self._paths(model, series_name, key)[0]
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            fitted = self._memory[key]
+        else:
+            if not os.path.exists(artifact):
+                return None
+            with open(artifact, 'rb') as f:
+                payload = pickle.load(f)
+            load = SERIALIZERS[model][1]
+            fitted = load(payload) if load else payload
+            self._remember(key, fitted)
+        # Mark as recently used for eviction (may race with evict(), that's fine)
+        try:
+            os.utime(artifact)
+        except FileNotFoundError:
+            pass
+        return fitted
+
+    def get(self, model, series_name, params, fingerprint):
+        """The model fitted with these hyperparameters on exactly this data, or None"""
+        return self._load(model, series_name, self.key(model, params, fingerprint))
+
+    def put(self, model, series_name, params, fingerprint, fitted, rows=None):
+        """Store a fitted model; returns its key"""
+        key = self.key(model, params, fingerprint)
+        artifact, meta_file = self._paths(model, series_name, key)
+        os.makedirs(os.path.dirname(artifact), exist_ok=True)
+
+        dump = SERIALIZERS[model][0]
+        with open(artifact + '.tmp', 'wb') as f:
+            pickle.dump(dump(fitted) if dump else fitted, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(artifact + '.tmp', artifact)
+
+        meta = {
+            'key': key, 'model': model, 'series': series_name, 'params': _params_json(params),
+            'fingerprint': fingerprint, 'rows': rows, 'created': time.time(),
+            'bytes': os.path.getsize(artifact),
+        }
+        with open(meta_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_file + '.tmp', meta_file)
+        self._remember(key, fitted)
+        return key
+
+    def _metadata(self, model_dir, prefix=''):
+        rows = []
+        for name in os.listdir(model_dir):
+            if not (name.startswith(prefix) and name.endswith('.json')):
+                continue
+            artifact = os.path.join(model_dir, name[:-len('.json')] + '.pkl')
+            try:
+                with open(os.path.join(model_dir, name), encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['last_used'] = os.path.getmtime(artifact)
+            except FileNotFoundError:
+                # Evicted while we were listing
+                continue
+            rows.append(meta)
+        return rows
+
+    def entries(self):
+        """Metadata of every stored model, with last_used (the artifact mtime)"""
+        rows = []
+        if os.path.isdir(self.directory):
+            for model in sorted(os.listdir(self.directory)):
+                model_dir = os.path.join(self.directory, model)
+                if os.path.isdir(model_dir):
+                    rows.extend(self._metadata(model_dir))
+        return pd.DataFrame(rows)
+
+    def latest(self, model, series_name, params=None):
+        """Most recently fitted model of a series with these hyperparameters: (metadata, model) or None"""
+        model_dir = os.path.join(self.directory, model)
+        if not os.path.isdir(model_dir):
+            return None
+        matches = [meta for meta in self._metadata(model_dir, f"{_slug(series_name)}__")
+                   if meta['series'] == series_name and meta['params'] == _params_json(params)]
+        for meta in sorted(matches, key=lambda meta: meta['created'], reverse=True):
+            fitted = self._load(model, series_name, meta['key'])
+            if fitted is not None:
+                return meta, fitted
+        return None
+
+    def evict(self):
+        """Delete least recently used entries until within max_entries and max_bytes; returns their keys"""
+        entries = self.entries()
+        if entries.empty:
+            return []
+        entries = entries.sort_values('last_used', ascending=False).reset_index(drop=True)
+        over = (entries.index >= self.max_entries) | (entries['bytes'].cumsum() > self.max_bytes)
+        removed = []
+        for meta in entries[over].to_dict('records'):
+            for path in self._paths(meta['model'], meta['series'], meta['key']):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._memory.pop(meta['key'], None)
+            removed.append(meta['key'])
+        return removed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the model registry, evict entries or predict from it")
+    parser.add_argument('--registry', default=MODELS_PATH, help="registry directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="list stored models, most recently used first")
+    evict = commands.add_parser('evict', help="apply the LRU limits")
+    evict.add_argument('--max-entries', type=int, default=1000)
+    evict.add_argument('--max-mb', type=float, default=1024)
+    predict = commands.add_parser('predict', help="forecast from the newest stored model, without fitting")
+    predict.add_argument('model')
+    predict.add_argument('series')
+    predict.add_argument('--horizon', type=int, default=30, help="years to forecast")
+    predict.add_argument('--output', help="write JSON records here instead of printing")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        entries = ModelRegistry(args.registry).entries()
+        if entries.empty:
+            print("Registry is empty")
+        else:
+            entries['last_used'] = pd.to_datetime(entries['last_used'], unit='s').dt.floor('s')
+            print(entries.sort_values('last_used', ascending=False)[
+                ['model', 'series', 'params', 'rows', 'bytes', 'last_used']].to_string(index=False))
+    elif args.command == 'evict':
+        registry = ModelRegistry(args.registry, max_entries=args.max_entries, max_bytes=int(args.max_mb * 2**20))
+        print(f"Evicted {len(registry.evict())} models")
+    else:
+        from models.forecasting import predict_only
+        start = time.perf_counter()
+        predictions = predict_only(ModelRegistry(args.registry), args.model, args.series, args.horizon)
+        elapsed = time.perf_counter() - start
+        if predictions is None:
+            print(f"No stored {args.model} model for {args.series}")
+            sys.exit(1)
+        records = predictions.assign(Date=predictions['Date'].dt.strftime('%Y-%m-%d')).to_json(
+            orient='records', indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(records)
+        else:
+            print(records)
+        print(f"Predicted {len(predictions)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
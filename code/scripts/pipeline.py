@@ -0,0 +1,610 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import project_paths, project_root
+from data_preparation import data_cleaning
+from data_preparation.streaming import load_formatter
+from data_preparation.date_expansion import expand_monthly_to_daily
+from analysis import regional, trend_analysis
+from models import model_training, forecasting
+from models.registry import ModelRegistry
+from json_to_csv import convert_frame_to_json
+import instrumentation
+from tiles import dated_series, deforestation_totals, write_tiles
+from charts import region_charts, render_charts, series_charts
+from storage import load_dataset, save_dataset, storage_frame
+from timeseries import SERIES, TimeSeries
+import gridded
+from incremental import (appended_rows, file_fingerprint, load_manifest, save_manifest,
+                         stage_fingerprint, value_fingerprint)
+
+# Runs the whole refresh (format -> clean -> analyze/train -> export) in one
+# process tree. Stages form a DAG and hand DataFrames to each other in memory;
+# independent stages run concurrently on a process pool. Writing the
+# intermediate CSVs (data/formatted, cleaned, processed, predictions) is an
+# optional checkpoint, the dashboard JSON is always written. With
+# --incremental every output records the fingerprint of its inputs and
+# parameters (see incremental.py) and unchanged stages are skipped.
+# The cleaned temperature, CO2 and sea level series are also kept as compact
+# TimeSeries (timeseries.py, memory-mapped Arrow files) and the analytics
+# and models read them in that form. With --temperature-grid the temperature
+# series is the area-weighted global mean of a gridded anomaly file
+# (gridded.py) instead of the GISTEMP table.
+# The model and plotting libraries are only imported by the stages that use
+# them (see model_training.py), so importing this module costs little more
+# than pandas and the skypulse CLI can run a single step cheaply.
+
+# dataset -> (raw file, formatted file)
+DATASETS = {
+    'co2': ('co2_emissions.csv', 'co2_reformatted.csv'),
+    'deforestation': ('deforestation.csv', 'deforestation.json'),
+    'sea_level': ('sea_level_data.csv', 'sea_level_data_formatted.csv'),
+    'temperature': ('temperature.csv', 'temperature_formatted.csv'),
+}
+
+# func(*dep results, **params) produces the stage result, which is persisted
+# to `output` according to `kind`:
+#   dataset                - DataFrame stored as typed Parquet + CSV export (storage.py)
+#   csv / csv_index / json - DataFrame written by the runner (checkpoint)
+#   series                 - TimeSeries saved as an Arrow IPC file, memory-mapped on reload
+#   file / dir             - the stage writes output itself and returns its path
+# `sources` are external files (raw feeds) the stage reads. `incremental`,
+# if set, is func(previous_output, input, appended_from, **params) and is
+# used instead of func when the single input only had rows appended.
+# `decimals` ({column: n or None}) overrides the decimals storage.py rounds
+# a dataset's float32 columns back to.
+Stage = namedtuple('Stage', ['func', 'deps', 'output', 'kind', 'params', 'sources', 'incremental', 'decimals'],
+                   defaults=(None, None, None, (), None, None))
+
+# Stage functions. They must be module-level so the process pool can pickle them.
+
+def format_dataset(name, raw_file, formatted_file):
+    """Format a raw feed in memory, or load the formatted file if the raw feed is missing"""
+    if os.path.exists(raw_file):
+        formatter = load_formatter(name)
+        return formatter.transform_chunk(pd.read_csv(raw_file, **formatter.READ_OPTIONS))
+
+    print(f"{os.path.basename(raw_file)} not found, using {os.path.basename(formatted_file)}")
+    if formatted_file.endswith('.json'):
+        return pd.read_json(formatted_file)
+    return pd.read_csv(formatted_file, parse_dates=['Date'])
+
+def grid_temperature(grid_path, output_dir, workers=None, tile_mb=gridded.TILE_MB):
+    """Global mean of a temperature anomaly grid, formatted like the GISTEMP table (one row per day).
+
+    The grid's decadal means and per-cell trends are written to output_dir,
+    with the tiles spread over `workers` processes (under the pipeline pool,
+    the stage's share of the worker budget, see OWN_POOL).
+    """
+    monthly = gridded.process_grid(gridded.open_grid(grid_path), output_dir, workers, tile_mb)
+    dates, values = expand_monthly_to_daily(monthly['Date'].to_numpy(), monthly['Temperature'].to_numpy())
+    return pd.DataFrame({'Date': dates.astype('datetime64[ns]'), 'Temperature': values})
+
+def clean_dataset(clean_frame, df):
+    """Run a clean_*_frame function and return Date as a column again"""
+    cleaned = clean_frame(df)
+    return cleaned.reset_index() if cleaned.index.name == 'Date' else cleaned
+
+def compact_series(value_col, decimals, df):
+    return TimeSeries.from_frame(df, value_col, decimals=decimals)
+
+def decadal_temperature(temperature):
+    return trend_analysis.compute_decadal_temperature(temperature)
+
+def annual_co2(co2):
+    co2_annual, slope, _ = trend_analysis.compute_annual_co2(co2)
+    print(f"CO2 annual increase rate: {slope:.2f} ppm/year")
+    return co2_annual
+
+def annual_co2_update(previous, co2, appended_from):
+    co2_annual, slope, _ = trend_analysis.update_annual_co2(previous, co2, appended_from)
+    print(f"CO2 annual increase rate: {slope:.2f} ppm/year")
+    return co2_annual
+
+def annual_means(temperature, co2_annual, sea_level):
+    # annual_co2 is already resampled; resampling it again is exact and cheap
+    return trend_analysis.compute_annual_means(temperature, co2_annual, sea_level)
+
+def correlation_matrix(annual):
+    return trend_analysis.annual_correlations(annual)
+
+def co2_temp_regression(temperature, co2):
+    merged, results = trend_analysis.compute_co2_temp_regression(temperature, co2)
+    print(f"CO2-Temperature R-squared: {results['r_squared']:.3f}")
+    return merged
+
+def regional_deforestation(deforestation):
+    return regional.regional_annual(deforestation)
+
+def deforestation_trends(deforestation):
+    return regional.region_trends(deforestation)
+
+def dashboard_charts(annual, regional, trends, output_dir, formats=('png',), workers=None, max_regions=None):
+    """Render the series and region charts headless on their own pool (see charts.py); returns the charts dir"""
+    charts = {'series': series_charts(annual), 'regions': region_charts(regional, trends, max_regions)}
+    render_charts(charts, output_dir, formats, workers)
+    return output_dir
+
+def forecasts(temperature, co2, sea_level, deforestation, models=None, horizons=(30,), workers=None,
+              timeout=None, registry_dir=None, report_dir=None):
+    """Run the series x model x horizon grid; returns the consolidated store.
+
+    The per-task report is printed and, with report_dir, saved as forecast_tasks.
+    """
+    series = forecasting.build_series(temperature, co2, sea_level, deforestation)
+    tasks = forecasting.build_grid(list(series), models, horizons)
+    store, report = forecasting.run_forecasts(series, tasks, workers=workers, timeout=timeout,
+                                              registry_dir=registry_dir)
+    if report_dir:
+        save_dataset(report, report_dir, 'forecast_tasks')
+    forecasting.print_summary(report)
+    return store
+
+def forecast_quantiles(store, temperature, co2, sea_level, deforestation, registry_dir,
+                       quantiles=model_training.DEFAULT_QUANTILES, members=model_training.DEFAULT_MEMBERS):
+    """Quantile bands of every forecast in the store, from the models the forecasts stage fitted on these series"""
+    series = forecasting.build_series(temperature, co2, sea_level, deforestation)
+    return forecasting.forecast_bands(ModelRegistry(registry_dir), store, series, quantiles, members)
+
+def random_forest(temperature, co2, deforestation):
+    predictions, metrics = model_training.random_forest_regression(
+        temperature, co2, model_training.prepare_deforestation(deforestation))
+    if metrics is not None:
+        print(f"Random Forest MSE: {metrics['mse']:.2f} R²: {metrics['r2']:.2f} MAE: {metrics['mae']:.2f}")
+    return predictions
+
+# Dashboard tile set -> (export input, function turning it into a dated series)
+TILED_SERIES = {
+    'co2': ('prophet_co2', partial(dated_series, value_col='Predicted')),
+    'temperature': ('clean_temperature', partial(dated_series, value_col='Temperature')),
+    'sea_level': ('clean_sea_level', partial(dated_series, value_col='Sea Level')),
+    'deforestation': ('clean_deforestation', deforestation_totals),
+}
+
+def export_dashboard(paths, names, *frames):
+    """Write every available result to the dashboard JSON files"""
+    frames = dict(zip(names, frames))
+    store = frames.pop('forecasts', None)
+    if store is not None:
+        frames['arima_temperature'] = forecasting.forecast_slice(store, 'temperature', 'arima')
+        frames['prophet_co2'] = forecasting.forecast_slice(store, 'co2', 'prophet')
+    bands = frames.get('forecast_quantiles')
+    if bands is not None:
+        # The dashboard shows the global series; the regional bands stay in data/predictions
+        frames['forecast_quantiles'] = bands[~bands['Series'].astype(str).str.startswith('deforestation:')]
+    targets = {
+        'arima_temperature': (paths['frontend_predictions'], 'arima_temperature_predictions.json'),
+        'prophet_co2': (paths['frontend_predictions'], 'prophet_co2_predictions.json'),
+        'random_forest': (paths['frontend_predictions'], 'random_forest_predictions.json'),
+        'forecast_quantiles': (paths['frontend_predictions'], 'forecast_quantiles.json'),
+        'annual_co2': (paths['frontend_processed'], 'annual_co2.json'),
+        'co2_temp_regression': (paths['frontend_processed'], 'co2_temp_regression.json'),
+        'correlation_matrix': (paths['frontend_processed'], 'correlation_matrix.json'),
+        'decadal_temperature': (paths['frontend_processed'], 'decadal_temperature.json'),
+        'clean_deforestation': (paths['frontend_processed'], 'deforestation.json'),
+        'regional_deforestation': (paths['frontend_processed'], 'deforestation_regions.json'),
+        'deforestation_trends': (paths['frontend_processed'], 'deforestation_trends.json'),
+        'clean_sea_level': (paths['frontend_processed'], 'sea_level.json'),
+    }
+    written = []
+    for name, (output_dir, file_name) in targets.items():
+        if frames.get(name) is None:
+            print(f"Skipping {file_name}: stage '{name}' produced no data")
+            continue
+        os.makedirs(output_dir, exist_ok=True)
+        convert_frame_to_json(frames[name], os.path.join(output_dir, file_name))
+        written.append(file_name)
+
+    # Multi-resolution tiles the dashboard charts load (see tiles.py)
+    for tile_name, (name, to_series) in TILED_SERIES.items():
+        if frames.get(name) is None:
+            print(f"Skipping {tile_name} tiles: stage '{name}' produced no data")
+            continue
+        write_tiles(to_series(frames[name]), paths['frontend_tiles'], tile_name)
+        written.append(f"tiles/{tile_name}")
+    return written
+
+# Persisting and reloading stage results
+
+def _dataset_name(stage):
+    return os.path.splitext(os.path.basename(stage.output))[0]
+
+def _save_output(stage, result):
+    os.makedirs(os.path.dirname(stage.output), exist_ok=True)
+    if stage.kind == 'dataset':
+        save_dataset(result, os.path.dirname(stage.output), _dataset_name(stage), decimals=stage.decimals)
+    elif stage.kind == 'csv':
+        result.to_csv(stage.output, index=False)
+    elif stage.kind == 'csv_index':
+        result.to_csv(stage.output)
+    elif stage.kind == 'json':
+        with open(stage.output, 'w', encoding='utf-8') as f:
+            json.dump(result.to_dict('records'), f, indent=4)
+    elif stage.kind == 'series':
+        result.save(stage.output)
+
+def _load_output(stage):
+    if stage.kind == 'dataset':
+        return load_dataset(os.path.dirname(stage.output), _dataset_name(stage))
+    if stage.kind == 'csv':
+        columns = pd.read_csv(stage.output, nrows=0).columns
+        return pd.read_csv(stage.output, parse_dates=['Date'] if 'Date' in columns else False)
+    if stage.kind == 'csv_index':
+        return pd.read_csv(stage.output, index_col=0)
+    if stage.kind == 'json':
+        with open(stage.output, encoding='utf-8') as f:
+            return pd.DataFrame(json.load(f))
+    if stage.kind == 'series':
+        return TimeSeries.load(stage.output)
+    return stage.output
+
+def _has_output(stage):
+    if stage.kind == 'dataset':
+        # load_dataset falls back to the CSV export
+        return any(os.path.exists(os.path.splitext(stage.output)[0] + ext) for ext in ('.parquet', '.csv'))
+    return os.path.exists(stage.output)
+
+def _manifest_dir(stage):
+    return stage.output if stage.kind == 'dir' else os.path.dirname(stage.output)
+
+class _Stored:
+    """Result of an unchanged or stored stage, loaded from disk only if a later stage needs it"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.value = None
+        self.loaded = False
+
+    def get(self):
+        if not self.loaded:
+            self.value, self.loaded = _load_output(self.stage), True
+        return self.value
+
+def _resolve(value):
+    return value.get() if isinstance(value, _Stored) else value
+
+def build_stages(paths, temperature_grid=None):
+    """Describe the refresh as {stage name: Stage}.
+
+    temperature_grid (a gridded.py grid file) replaces the raw GISTEMP table
+    as the source of the temperature series.
+    """
+    stages = {}
+    cleaners = {
+        'co2': data_cleaning.clean_co2_frame,
+        'deforestation': data_cleaning.clean_deforestation_frame,
+        'sea_level': data_cleaning.clean_sea_level_frame,
+        'temperature': data_cleaning.clean_temperature_frame,
+    }
+    for name, (raw_name, formatted_name) in DATASETS.items():
+        raw_file = os.path.join(paths['raw'], raw_name)
+        formatted_file = os.path.join(paths['formatted'], formatted_name)
+        stages[f'format_{name}'] = Stage(
+            partial(format_dataset, name, raw_file, formatted_file), [],
+            formatted_file, 'json' if formatted_name.endswith('.json') else 'csv',
+            sources=(raw_file,))
+        stages[f'clean_{name}'] = Stage(
+            partial(clean_dataset, cleaners[name]), [f'format_{name}'],
+            os.path.join(paths['cleaned'], f'cleaned_{name}.parquet'), 'dataset')
+    for name, (dataset, value_col, decimals) in SERIES.items():
+        stages[f'{name}_series'] = Stage(partial(compact_series, value_col, decimals), [f'clean_{name}'],
+                                         os.path.join(paths['cleaned'], f'{dataset}.arrow'), 'series')
+
+    if temperature_grid:
+        sources = (temperature_grid,) if temperature_grid.endswith('.nc') else (
+            temperature_grid, os.path.splitext(temperature_grid)[0] + '.json')
+        stages['format_temperature'] = stages['format_temperature']._replace(
+            func=partial(grid_temperature, temperature_grid, os.path.join(paths['processed'], 'gridded')),
+            params={'tile_mb': gridded.TILE_MB}, sources=sources)
+        # The area-weighted mean is continuous, not published to 0.01 °C
+        stages['clean_temperature'] = stages['clean_temperature']._replace(decimals={'Temperature': None})
+        _, value_col, _ = SERIES['temperature']
+        stages['temperature_series'] = stages['temperature_series']._replace(
+            func=partial(compact_series, value_col, None))
+
+    processed = lambda file_name: os.path.join(paths['processed'], file_name)
+    predictions = lambda file_name: os.path.join(paths['predictions'], file_name)
+    stages.update({
+        'decadal_temperature': Stage(decadal_temperature, ['clean_temperature'],
+                                     processed('decadal_temperature.parquet'), 'dataset',
+                                     incremental=trend_analysis.update_decadal_temperature),
+        'annual_co2': Stage(annual_co2, ['clean_co2'], processed('annual_co2.parquet'), 'dataset',
+                            incremental=annual_co2_update),
+        # Annual means shared by the correlations and the charts
+        'annual_means': Stage(annual_means, ['temperature_series', 'annual_co2', 'sea_level_series'],
+                              processed('annual_means.parquet'), 'dataset'),
+        'correlation_matrix': Stage(correlation_matrix, ['annual_means'],
+                                    processed('correlation_matrix.csv'), 'csv_index'),
+        'co2_temp_regression': Stage(co2_temp_regression, ['temperature_series', 'co2_series'],
+                                     processed('co2_temp_regression.parquet'), 'dataset'),
+        'regional_deforestation': Stage(regional_deforestation, ['clean_deforestation'],
+                                        processed('regional_deforestation.parquet'), 'dataset'),
+        'deforestation_trends': Stage(deforestation_trends, ['clean_deforestation'],
+                                      processed('deforestation_trends.parquet'), 'dataset'),
+        'charts': Stage(partial(dashboard_charts, output_dir=paths['frontend_charts']),
+                        ['annual_means', 'regional_deforestation', 'deforestation_trends'],
+                        paths['frontend_charts'], 'dir', params={'formats': ['png'], 'max_regions': None}),
+        'forecasts': Stage(forecasts,
+                           ['temperature_series', 'co2_series', 'sea_level_series', 'clean_deforestation'],
+                           predictions('forecasts.parquet'), 'dataset',
+                           params={'horizons': [30], 'timeout': 600,
+                                   'registry_dir': paths['models'],
+                                   'report_dir': paths['predictions']}),
+        'forecast_quantiles': Stage(forecast_quantiles,
+                                    ['forecasts', 'temperature_series', 'co2_series', 'sea_level_series',
+                                     'clean_deforestation'],
+                                    predictions('forecast_quantiles.parquet'), 'dataset',
+                                    params={'registry_dir': paths['models'],
+                                            'quantiles': list(model_training.DEFAULT_QUANTILES),
+                                            'members': model_training.DEFAULT_MEMBERS}),
+        'random_forest': Stage(random_forest, ['temperature_series', 'co2_series', 'clean_deforestation'],
+                               predictions('random_forest_predictions.csv'), 'csv'),
+    })
+    export_inputs = ['forecasts', 'forecast_quantiles', 'random_forest', 'annual_co2',
+                     'co2_temp_regression', 'correlation_matrix', 'decadal_temperature',
+                     'clean_deforestation', 'clean_sea_level', 'clean_temperature',
+                     'regional_deforestation', 'deforestation_trends']
+    stages['export'] = Stage(partial(export_dashboard, paths, export_inputs), export_inputs,
+                             os.path.dirname(paths['frontend_processed']), 'dir')
+    return stages
+
+# The refresh steps the skypulse CLI runs one at a time: step -> its stages
+STEPS = {
+    'format': [f'format_{name}' for name in DATASETS],
+    'clean': [f'clean_{name}' for name in DATASETS] + [f'{name}_series' for name in SERIES],
+    'analyze': ['decadal_temperature', 'annual_co2', 'annual_means', 'correlation_matrix', 'co2_temp_regression',
+                'regional_deforestation', 'deforestation_trends', 'charts'],
+    'train': ['forecasts', 'forecast_quantiles', 'random_forest'],
+    'export': ['export'],
+}
+
+def select_stages(stages, names):
+    """Stages `names` plus the ones they read from: ({name: Stage}, names of the upstream stages).
+
+    Run the subset with stored=<upstream names> to load what earlier runs
+    persisted instead of recomputing it.
+    """
+    unknown = set(names) - set(stages)
+    if unknown:
+        raise ValueError(f"Unknown stages {sorted(unknown)}. Available: {sorted(stages)}")
+    upstream = {dep for name in names for dep in stages[name].deps} - set(names)
+    subset = {name: stage for name, stage in stages.items() if name in upstream or name in names}
+    return subset, [name for name in subset if name in upstream]
+
+# Stage functions that run their own process pool (`workers` parameter).
+# Under the pipeline's pool they get the part of the worker budget that no
+# running stage holds when they start, but at least an even split of the
+# budget between them and the other such stages running, unless the stage's
+# params set `workers`. Their tasks still fan out without starting another
+# cpu_count processes inside a pipeline worker. A share is fixed when the
+# stage starts, so the floor keeps e.g. the charts from being drawn one by
+# one because the forecasts took the budget first, at the cost of running
+# more processes than the budget while they overlap.
+OWN_POOL = (grid_temperature, dashboard_charts, forecasts)
+
+def _pooled_kwargs(func, kwargs, share):
+    """kwargs to run func with in a pipeline worker, and how many processes that takes from the budget"""
+    if getattr(func, 'func', func) not in OWN_POOL:
+        return kwargs, 1
+    if 'workers' not in kwargs:
+        kwargs = dict(kwargs, workers=share)
+    return kwargs, kwargs['workers'] or share
+
+def _execute(name, func, args, kwargs, trace_memory):
+    """Run one stage and measure it (runs inside the worker process, logged by instrumentation.py)"""
+    result = None
+    with instrumentation.stage(name, inputs=args, trace_memory=trace_memory, reraise=False) as record:
+        result = func(*args, **kwargs)
+        record.output(result)
+    metrics = {'wall_s': record.wall_s, 'cpu_s': record.cpu_s, 'worker_peak_rss_mb': record.peak_rss_mb}
+    if record.alloc_peak_mb is not None:
+        metrics['alloc_peak_mb'] = record.alloc_peak_mb
+    if isinstance(result, (pd.DataFrame, TimeSeries)):
+        metrics['rows'] = len(result)
+    return result, metrics, record.error['traceback'] if record.error else None
+
+def _skip_unreachable(pending, report):
+    """Mark pending stages whose dependencies failed (transitively) as skipped"""
+    changed = True
+    while changed:
+        changed = False
+        for name, stage in list(pending.items()):
+            failed = [dep for dep in stage.deps if report.get(dep, {}).get('status') in ('failed', 'skipped')]
+            if failed:
+                report[name] = {'status': 'skipped', 'reason': f"upstream failed: {', '.join(failed)}"}
+                del pending[name]
+                changed = True
+
+def run_pipeline(stages, workers=None, trace_memory=True, checkpoint=False, incremental=False, force=False,
+                 stored=()):
+    """Execute the stage DAG. Returns (results, report) keyed by stage name.
+
+    A failed stage is reported and every stage depending on it is skipped;
+    independent branches keep running. In incremental mode outputs are always
+    persisted, stages whose input fingerprint is unchanged are not run
+    (status 'unchanged') unless force=True, and append-only inputs use the
+    stage's incremental function when it has one. Stages named in `stored`
+    are not run either: their persisted output from an earlier run is
+    loaded if a later stage needs it (status 'stored'; 'failed' if there
+    is none).
+    """
+    results, report, fingerprints = {}, {}, {}
+    manifests = {}
+    pending = {name: stage for name, stage in stages.items() if name not in stored}
+    running = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    # Processes each running stage holds, and the stages among them with their own pool (see OWN_POOL)
+    budget = workers or os.cpu_count() or 1
+    slots, pooled = {}, set()
+    persist = checkpoint or incremental
+    start = time.perf_counter()
+
+    def manifest_for(stage):
+        directory = _manifest_dir(stage)
+        if directory not in manifests:
+            manifests[directory] = load_manifest(directory)
+        return manifests[directory]
+
+    def finish(name, result, metrics, error, record):
+        stage = stages[name]
+        report[name] = dict(metrics, status='failed' if error else 'ok')
+        if error:
+            print(f"[{name}] failed:\n{error}")
+            return
+        if stage.kind == 'dataset' and result is not None:
+            # Hand downstream stages the same column types a reload would give
+            result = storage_frame(_dataset_name(stage), result, stage.decimals)
+        results[name] = result
+        fingerprints[name] = value_fingerprint(result)
+        if persist and result is not None:
+            _save_output(stage, result)
+        if incremental and result is not None:
+            record['output'] = {'fingerprint': fingerprints[name],
+                                'rows': len(result) if isinstance(result, (pd.DataFrame, TimeSeries)) else None}
+            manifest = manifest_for(stage)
+            manifest[name] = record
+            save_manifest(_manifest_dir(stage), manifest)
+        mode = f" ({record['mode']})" if record.get('mode') else ''
+        print(f"[{name}] done in {metrics['wall_s']:.2f}s{mode}")
+
+    def plan(name, stage):
+        """Decide how to run a ready stage: returns (func, args, kwargs, record) or None if unchanged"""
+        record = {'params': stage.params or {}}
+        previous = manifest_for(stage).get(name, {}) if incremental else {}
+        if incremental:
+            cached_sources = previous.get('sources') or [None] * len(stage.sources)
+            record['sources'] = [file_fingerprint(path, cached)
+                                 for path, cached in zip(stage.sources, cached_sources)]
+            record['fingerprint'] = stage_fingerprint(name, record['params'],
+                                                      [fingerprints[dep] for dep in stage.deps],
+                                                      record['sources'])
+            if (not force and previous.get('fingerprint') == record['fingerprint']
+                    and os.path.exists(stage.output)):
+                return None, None, None, previous
+
+        args = [_resolve(results[dep]) for dep in stage.deps]
+        record['inputs'] = [{'fingerprint': fingerprints[dep],
+                             'rows': len(arg) if isinstance(arg, (pd.DataFrame, TimeSeries)) else None}
+                            for dep, arg in zip(stage.deps, args)]
+
+        if (incremental and not force and stage.incremental is not None and len(args) == 1
+                and previous and os.path.exists(stage.output)):
+            appended_from = appended_rows(args[0], (previous.get('inputs') or [None])[0])
+            if appended_from is not None:
+                record['mode'] = f"incremental from row {appended_from}"
+                return (stage.incremental, [_load_output(stage), args[0], appended_from],
+                        stage.params or {}, record)
+        return stage.func, args, stage.params or {}, record
+
+    for name in stored:
+        stage = stages[name]
+        if not _has_output(stage):
+            report[name] = {'status': 'failed', 'reason': f"no stored output at {stage.output}"}
+            print(f"[{name}] has no stored output at {stage.output}, run it first")
+            continue
+        results[name] = _Stored(stage)
+        # Fingerprinted by content: the file may have been rewritten since a manifest recorded it
+        fingerprints[name] = value_fingerprint(results[name].get()) if incremental else None
+        report[name] = {'status': 'stored'}
+
+    try:
+        while pending or running:
+            _skip_unreachable(pending, report)
+
+            ready = [name for name, stage in pending.items() if all(dep in fingerprints for dep in stage.deps)]
+            for position, name in enumerate(ready):
+                stage = pending.pop(name)
+                func, args, kwargs, record = plan(name, stage)
+                if func is None:
+                    # Unchanged: reuse the recorded output fingerprint, load lazily
+                    results[name] = _Stored(stage)
+                    fingerprints[name] = record['output']['fingerprint']
+                    report[name] = {'status': 'unchanged'}
+                    print(f"[{name}] unchanged, skipped")
+                elif pool is None:
+                    finish(name, *_execute(name, func, args, kwargs, trace_memory), record)
+                else:
+                    # Leave a process for each stage still to be submitted this round
+                    free = budget - sum(slots.values()) - (len(ready) - position - 1)
+                    share = max(1, free, budget // (len(pooled) + 1))
+                    kwargs, held = _pooled_kwargs(func, kwargs, share)
+                    future = pool.submit(_execute, name, func, args, kwargs, trace_memory)
+                    running[future] = (name, record)
+                    slots[future] = held
+                    if getattr(func, 'func', func) in OWN_POOL:
+                        pooled.add(future)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, record = running.pop(future)
+                slots.pop(future)
+                pooled.discard(future)
+                finish(name, *future.result(), record)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    report['_total'] = {'wall_s': time.perf_counter() - start, 'status': 'ok'}
+    return results, report
+
+def print_report(report):
+    print(f"\n{'stage':<28}{'status':<11}{'wall s':>9}{'cpu s':>9}{'alloc MB':>10}{'rss MB':>9}{'rows':>9}")
+    for name, m in report.items():
+        if name == '_total':
+            continue
+        def fmt(key, spec):
+            return format(m[key], spec) if key in m else '-'
+        print(f"{name:<28}{m['status']:<11}{fmt('wall_s', '.2f'):>9}{fmt('cpu_s', '.2f'):>9}"
+              f"{fmt('alloc_peak_mb', '.1f'):>10}{fmt('worker_peak_rss_mb', '.1f'):>9}{fmt('rows', 'd'):>9}")
+    print(f"\nTotal wall time: {report['_total']['wall_s']:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the SkyPulse refresh as one in-memory pipeline")
+    parser.add_argument('--root', default=project_root(),
+                        help="project root holding data/ and frontend/ (default: code/, $SKYPULSE_ROOT)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="process pool size (1 runs every stage in this process)")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="also write formatted/cleaned/processed/prediction CSVs")
+    parser.add_argument('--incremental', action='store_true',
+                        help="skip stages whose inputs are unchanged (implies --checkpoint)")
+    parser.add_argument('--force', action='store_true',
+                        help="with --incremental, rerun every stage and refresh the fingerprints")
+    parser.add_argument('--no-memory-trace', action='store_true',
+                        help="skip tracemalloc (faster, no per-stage allocation peak)")
+    parser.add_argument('--report', help="write the per-stage report to this JSON file")
+    parser.add_argument('--log-dir', help="stage log and metrics directory (default: <root>/logs, $SKYPULSE_LOG_DIR)")
+    parser.add_argument('--profile', choices=instrumentation.PROFILERS, help="profile every stage")
+    parser.add_argument('--chart-formats', nargs='+', choices=('png', 'svg', 'webp'),
+                        help="formats the charts stage writes (default: png)")
+    parser.add_argument('--temperature-grid', help="gridded anomaly file to take the temperature from (gridded.py)")
+    args = parser.parse_args()
+
+    # The default log directory follows --root, in this process and the workers
+    os.environ['SKYPULSE_ROOT'] = args.root
+    instrumentation.configure(log_dir=args.log_dir, profile=args.profile, trace_memory=not args.no_memory_trace)
+    stages = build_stages(project_paths(args.root), args.temperature_grid)
+    if args.chart_formats:
+        stages['charts'] = stages['charts']._replace(params=dict(stages['charts'].params, formats=args.chart_formats))
+    _, report = run_pipeline(stages, workers=args.workers, trace_memory=not args.no_memory_trace,
+                             checkpoint=args.checkpoint, incremental=args.incremental, force=args.force)
+    print_report(report)
+    print(f"Stage log: {os.path.join(instrumentation.log_dir(), instrumentation.current_run_id() + '.jsonl')}")
+    print(f"Prometheus metrics: {instrumentation.write_prometheus()}")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if any(m['status'] in ('failed', 'skipped') for m in report.values()):
+        sys.exit(1)
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import json
+import argparse
+
+START = time.perf_counter()
+
+# The skypulse command line: one entry point for every refresh step.
+#
+#   python skypulse.py fetch     download the raw feeds that changed -> data/raw (ingestion.py)
+#   python skypulse.py format    raw feeds -> data/formatted
+#   python skypulse.py clean     data/formatted -> data/cleaned
+#   python skypulse.py analyze   data/cleaned -> data/processed and the dashboard charts
+#   python skypulse.py train     data/cleaned -> data/predictions and models/
+#   python skypulse.py export    processed and predictions -> frontend/public/data
+#   python skypulse.py run       every step in one process tree (pipeline.py);
+#                                --fetch downloads the raw feeds first
+#
+# A step runs its pipeline stages (pipeline.STEPS) and persists their
+# outputs. The stages upstream of it are not rerun: their outputs are loaded
+# from what an earlier step wrote. --root (or SKYPULSE_ROOT) points every
+# script at another project directory (see config.py).
+#
+# Startup stays cheap. Only argparse runs before a command is picked, and
+# then the pipeline imports pandas and pyarrow. Prophet, statsmodels,
+# scikit-learn, scipy and matplotlib are imported inside the stages that use
+# them, so `clean` never loads them. --timings prints the import and run
+# times; benchmarks/bench_startup.py measures the import overhead of each
+# command against its budget.
+
+COMMANDS = {
+    'fetch': "download the raw feeds that changed (-> data/raw)",
+    'format': "format the raw feeds (data/raw -> data/formatted)",
+    'clean': "clean the formatted datasets (-> data/cleaned)",
+    'analyze': "trends, correlations, regional statistics and charts (-> data/processed)",
+    'train': "forecasts, quantile bands and Random Forest predictions (-> data/predictions, models/)",
+    'export': "write the dashboard JSON and tiles (-> frontend/public/data)",
+    'run': "the whole refresh: format, clean, analyze, train and export",
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='skypulse', description="SkyPulse climate data refresh")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--root', help="project root holding data/ and frontend/ (default: code/, $SKYPULSE_ROOT)")
+    common.add_argument('--workers', type=int, default=None,
+                        help="process pool size (1 runs every stage in this process)")
+    common.add_argument('--incremental', action='store_true', help="skip stages whose inputs are unchanged")
+    common.add_argument('--force', action='store_true',
+                        help="with --incremental, rerun every stage and refresh the fingerprints")
+    common.add_argument('--no-memory-trace', action='store_true',
+                        help="skip tracemalloc (faster, no per-stage allocation peak)")
+    common.add_argument('--log-dir', help="stage log and metrics directory (default: <root>/logs, $SKYPULSE_LOG_DIR)")
+    common.add_argument('--profile', choices=('cprofile', 'pyinstrument'), help="profile every stage")
+    common.add_argument('--report', help="write the per-stage report to this JSON file")
+    common.add_argument('--timings', action='store_true', help="print the import and run times")
+
+    fetching = argparse.ArgumentParser(add_help=False)
+    fetching.add_argument('--url', action='append', metavar='NAME=URL',
+                          help="fetch a source from this URL (default: ingestion.SOURCES, data/raw/sources.json)")
+    fetching.add_argument('--connections', type=int, default=8, help="HTTP connection pool size")
+
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+    fetch = commands.add_parser('fetch', parents=[fetching], help=COMMANDS['fetch'], description=COMMANDS['fetch'])
+    fetch.add_argument('--root', help="project root holding data/ and frontend/ (default: code/, $SKYPULSE_ROOT)")
+    fetch.add_argument('--sources', nargs='+', help="sources to fetch (default: all)")
+    fetch.add_argument('--timings', action='store_true', help="print the import and run times")
+    for name, help_text in COMMANDS.items():
+        if name == 'fetch':
+            continue
+        command = commands.add_parser(name, parents=[common] + ([fetching] if name == 'run' else []),
+                                      help=help_text, description=help_text)
+        if name in ('analyze', 'run'):
+            command.add_argument('--chart-formats', nargs='+', choices=('png', 'svg', 'webp'),
+                                 help="formats the charts stage writes (default: png)")
+        if name == 'run':
+            command.add_argument('--fetch', action='store_true', help="fetch the raw feeds that changed first")
+        if name in ('format', 'run'):
+            command.add_argument('--temperature-grid',
+                                 help="gridded anomaly file to take the temperature from (gridded.py)")
+    return parser
+
+def fetch_sources(args):
+    """Run the fetch step: returns whether every source was fetched (or kept)"""
+    import ingestion
+    report = ingestion.fetch(names=getattr(args, 'sources', None), overrides=ingestion.parse_urls(args.url),
+                             connections=args.connections)
+    ingestion.print_report(report)
+    return not any(row['Status'] == 'failed' for row in report)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.root:
+        os.environ['SKYPULSE_ROOT'] = os.path.abspath(args.root)
+
+    # Everything below the parser is imported only now, after SKYPULSE_ROOT is set
+    imports_start = time.perf_counter()
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    if args.command == 'fetch':
+        fetched = fetch_sources(args)
+        if args.timings:
+            print(f"Startup {imports_start - START:.3f}s, fetch {time.perf_counter() - imports_start:.2f}s")
+        return 0 if fetched else 1
+    import instrumentation
+    import pipeline
+    from config import project_paths
+    imported = time.perf_counter()
+
+    instrumentation.configure(log_dir=args.log_dir, profile=args.profile, trace_memory=not args.no_memory_trace)
+    # A source that failed to download keeps its mirrored file, so the refresh still runs
+    fetched = fetch_sources(args) if getattr(args, 'fetch', False) else True
+    stages = pipeline.build_stages(project_paths(), getattr(args, 'temperature_grid', None))
+    if getattr(args, 'chart_formats', None):
+        stages['charts'] = stages['charts']._replace(params=dict(stages['charts'].params, formats=args.chart_formats))
+    stored = []
+    if args.command != 'run':
+        stages, stored = pipeline.select_stages(stages, pipeline.STEPS[args.command])
+
+    # Every step persists its outputs: they are the next step's inputs
+    _, report = pipeline.run_pipeline(stages, workers=args.workers, trace_memory=not args.no_memory_trace,
+                                      checkpoint=True, incremental=args.incremental, force=args.force,
+                                      stored=stored)
+    pipeline.print_report(report)
+    print(f"Stage log: {os.path.join(instrumentation.log_dir(), instrumentation.current_run_id() + '.jsonl')}")
+    print(f"Prometheus metrics: {instrumentation.write_prometheus()}")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.timings:
+        print(f"Startup {imports_start - START:.3f}s, imports {imported - imports_start:.3f}s, "
+              f"{args.command} {time.perf_counter() - imported:.2f}s")
+    return 1 if not fetched or any(m['status'] in ('failed', 'skipped') for m in report.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
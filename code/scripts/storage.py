@@ -0,0 +1,137 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columnar storage for the cleaned and processed datasets.
+#
+# Each dataset is written as <name>.parquet with typed columns (datetime64
+# dates, float32 where 7 significant digits are plenty, dictionary-encoded
+# region codes), plus <name>.csv as an export for people and the dashboard.
+# Loaders read the Parquet file (memory-mapped) with column projection and
+# Date-range filters pushed down to the row groups, and fall back to the CSV
+# when no Parquet file exists yet.
+
+# Stored column types per dataset as {column: (dtype, decimals)}; other
+# columns keep their in-memory dtype. Temperature anomalies are published to
+# 0.01 °C and sea level to 0.01 mm, so float32 keeps every digit: loaders
+# round back to those decimals and hand out the same float64 values a CSV
+# parse would (pass float32=True to keep the compact float32 columns).
+# save_dataset(decimals={column: n or None}) overrides the decimals for
+# values that aren't published on that grid (the gridded temperature mean);
+# the override is kept in the Parquet metadata so every loader of the file
+# restores it the same way. A column without decimals comes back as the
+# exact float32 values, and the CSV export writes those with the fewest
+# digits that read back the same.
+STORED_TYPES = {
+    'cleaned_temperature': {'Temperature': ('float32', 2)},
+    'cleaned_sea_level': {'Sea Level': ('float32', 2)},
+    'cleaned_deforestation': {'Region': ('category', None)},
+    'forecasts': {'Series': ('category', None), 'Model': ('category', None)},
+    'forecast_quantiles': {'Series': ('category', None), 'Model': ('category', None),
+                           'Quantile': ('float32', 4), 'Value': ('float32', 3)},
+    'regional_deforestation': {'Region': ('category', None)},
+    'deforestation_trends': {'Region': ('category', None)},
+}
+DECIMALS_KEY = b'skypulse.decimals'
+
+# Small enough that a decade of daily data spans a handful of row groups,
+# which is what lets Date filters skip most of the file
+ROW_GROUP_SIZE = 65_536
+
+def _stored_types(name, df, decimals=None):
+    types = {col: spec for col, spec in STORED_TYPES.get(name, {}).items() if col in df.columns}
+    for col, places in (decimals or {}).items():
+        if col in types:
+            types[col] = (types[col][0], places)
+    return types
+
+def _to_stored(name, df):
+    types = _stored_types(name, df)
+    return df.astype({col: dtype for col, (dtype, _) in types.items()}) if types else df
+
+def _restore(name, df, decimals=None, widen=True):
+    # Round float32 columns back to their decimals; widen=False leaves the
+    # ones without decimals as float32
+    restore = {}
+    for col, (dtype, places) in _stored_types(name, df, decimals).items():
+        if dtype != 'float32':
+            continue
+        if places is not None:
+            restore[col] = np.round(df[col].astype(np.float64), places)
+        elif widen:
+            restore[col] = df[col].astype(np.float64)
+    return df.assign(**restore) if restore else df
+
+def _from_stored(name, df, float32=False, decimals=None):
+    return df if float32 else _restore(name, df, decimals)
+
+def storage_frame(name, df, decimals=None):
+    """The frame dataset `name` comes back as after a save/load round trip"""
+    return _from_stored(name, _to_stored(name, df), decimals=decimals)
+
+def save_dataset(df, directory, name, export_csv=True, decimals=None):
+    """Write <name>.parquet (and <name>.csv unless export_csv=False); returns the Parquet path.
+
+    decimals ({column: n or None}) overrides the decimals STORED_TYPES
+    restores the column's values to.
+    """
+    df = _to_stored(name, df)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + '.parquet')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if decimals:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               DECIMALS_KEY: json.dumps(decimals).encode()})
+    pq.write_table(table, path + '.tmp', row_group_size=ROW_GROUP_SIZE, compression='zstd')
+    os.replace(path + '.tmp', path)
+
+    if export_csv:
+        _restore(name, df, decimals, widen=False).to_csv(os.path.join(directory, name + '.csv'), index=False)
+    return path
+
+def _date_filters(date_col, start, end):
+    filters = []
+    if start is not None:
+        filters.append((date_col, '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append((date_col, '<=', pd.Timestamp(end)))
+    return filters
+
+def load_dataset(directory, name, columns=None, start=None, end=None, date_col='Date', float32=False):
+    """Load dataset `name` from directory.
+
+    columns limits the columns read; start/end (inclusive, anything
+    pd.Timestamp accepts) keep only rows whose date_col falls in the range.
+    Both are pushed down into the Parquet reader. float32=True keeps the
+    float32 storage type instead of restoring float64 values.
+    """
+    filters = _date_filters(date_col, start, end)
+    path = os.path.join(directory, name + '.parquet')
+    if os.path.exists(path):
+        table = pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+        metadata = table.schema.metadata or {}
+        decimals = json.loads(metadata[DECIMALS_KEY]) if DECIMALS_KEY in metadata else None
+        return _from_stored(name, table.to_pandas(), float32, decimals)
+
+    # No Parquet file yet: read the CSV export the old way
+    csv_path = os.path.join(directory, name + '.csv')
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = None
+    if columns is not None:
+        usecols = list(columns) + ([date_col] if filters and date_col not in columns else [])
+    df = pd.read_csv(csv_path, usecols=usecols,
+                     parse_dates=[date_col] if date_col in header else False)
+    if filters:
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df[date_col] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df[date_col] <= pd.Timestamp(end)
+        df = df[mask].reset_index(drop=True)
+    if columns is not None:
+        df = df[list(columns)]
+    return _from_stored(name, _to_stored(name, df), float32)
@@ -0,0 +1,151 @@
+import os
+import json
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+
+from data_preparation.decimal_year import datetime64_to_decimal_year
+from timeseries import TimeSeries
+
+# Multi-resolution dashboard tiles.
+#
+# Each series is published under <tiles dir>/<series>/ as compact columnar
+# JSON (numbers, not strings, no indentation):
+#   year.json, month.json  - one point per bucket: x (bucket start as a decimal
+#                            year), mean, min, max, n
+#   full/<start>.json      - the observations themselves, one file per
+#                            TILE_YEARS span, LTTB-downsampled to MAX_POINTS
+#   index.json             - the levels present, point counts and full tiles
+# The dashboard loads index.json and the yearly level on start, and only
+# fetches the finer levels (and only the full tiles in view) when zoomed in.
+# A level that would not be finer than the one above it is left out, so a
+# yearly series only has year.json.
+
+LEVELS = [('year', 'YS'), ('month', 'MS')]
+TILE_YEARS = 10
+MAX_POINTS = 1000
+X_DECIMALS = 4
+
+def lttb(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y).
+
+    Keeps the first and last points plus, per bucket, the point forming the
+    largest triangle with the previously kept point and the mean of the
+    next bucket, which preserves peaks and troughs far better than taking
+    every n-th row.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+def _x(dates):
+    return np.round(datetime64_to_decimal_year(np.asarray(dates, dtype='datetime64[us]')), X_DECIMALS)
+
+def _values(values, decimals):
+    return [None if np.isnan(v) else v for v in np.round(np.asarray(values, dtype=np.float64), decimals).tolist()]
+
+def aggregate(series, freq, decimals=3):
+    """Bucket a dated series (DatetimeIndex) into mean/min/max/n per period"""
+    grouped = series.dropna().groupby(series.dropna().index.to_period(freq[0]))
+    stats = grouped.agg(['mean', 'min', 'max', 'count'])
+    return {
+        'x': _x(stats.index.start_time).tolist(),
+        'mean': _values(stats['mean'], decimals),
+        'min': _values(stats['min'], decimals),
+        'max': _values(stats['max'], decimals),
+        'n': stats['count'].astype(int).tolist(),
+    }
+
+def full_tiles(series, decimals=3, tile_years=TILE_YEARS, max_points=MAX_POINTS):
+    """Split the observations into tile_years spans, each downsampled with LTTB: {start year: tile}"""
+    series = series.dropna().sort_index()
+    x = _x(series.index)
+    starts = (np.floor(x) // tile_years * tile_years).astype(int)
+    tiles = {}
+    for start in np.unique(starts):
+        rows = np.flatnonzero(starts == start)
+        kept = rows[lttb(x[rows], series.to_numpy()[rows], max_points)]
+        tiles[int(start)] = {'x': x[kept].tolist(), 'y': _values(series.to_numpy()[kept], decimals)}
+    return tiles
+
+def _write_json(payload, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, separators=(',', ':'), allow_nan=False)
+
+def write_tiles(series, output_dir, name, decimals=3, tile_years=TILE_YEARS, max_points=MAX_POINTS):
+    """Write every resolution of a dated series under output_dir/name; returns the index"""
+    series_dir = os.path.join(output_dir, name)
+    # Start clean so tiles of a span that no longer exists do not linger
+    shutil.rmtree(series_dir, ignore_errors=True)
+    os.makedirs(series_dir)
+
+    index = {'series': name, 'start': None, 'end': None, 'levels': {}}
+    observations = int(series.notna().sum())
+    finest = 0
+    for level, freq in LEVELS:
+        payload = aggregate(series, freq, decimals)
+        if len(payload['x']) <= finest:
+            continue
+        _write_json(payload, os.path.join(series_dir, f'{level}.json'))
+        index['levels'][level] = {'file': f'{level}.json', 'points': len(payload['x'])}
+        finest = len(payload['x'])
+    if observations > finest:
+        tiles = full_tiles(series, decimals, tile_years, max_points)
+        os.makedirs(os.path.join(series_dir, 'full'))
+        index['levels']['full'] = {'tile_years': tile_years, 'points': observations, 'tiles': []}
+        for start, tile in tiles.items():
+            file_name = f'full/{start}.json'
+            _write_json(tile, os.path.join(series_dir, file_name))
+            index['levels']['full']['tiles'].append(
+                {'start': start, 'end': start + tile_years, 'file': file_name, 'points': len(tile['x'])})
+
+    dates = series.dropna().index
+    if len(dates):
+        index['start'], index['end'] = _x([dates.min(), dates.max()]).tolist()
+    _write_json(index, os.path.join(series_dir, 'index.json'))
+    print(f"Tiles: {name} ({observations} observations, levels {', '.join(index['levels'])})")
+    return index
+
+def dated_series(df, value_col, date_col='Date'):
+    """Value column of a frame (or the values of a TimeSeries) indexed by its dates"""
+    if isinstance(df, TimeSeries):
+        return df.to_series().sort_index()
+    return df.set_index(pd.to_datetime(df[date_col]))[value_col].astype(np.float64).sort_index()
+
+def deforestation_totals(deforestation):
+    """Total area deforested per year across regions, dated Jan 1"""
+    totals = deforestation.groupby('Year')['Area_Deforested'].sum()
+    totals.index = pd.to_datetime(totals.index.astype(str), format='%Y')
+    return totals
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write dashboard tiles for a CSV or Parquet series")
+    parser.add_argument('input', help="CSV or Parquet file with a Date column")
+    parser.add_argument('value', help="value column")
+    parser.add_argument('output_dir')
+    parser.add_argument('--name', help="series name (default: the input file name)")
+    parser.add_argument('--decimals', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.input.endswith('.parquet'):
+        df = pd.read_parquet(args.input)
+    else:
+        df = pd.read_csv(args.input, parse_dates=['Date'])
+    name = args.name or os.path.splitext(os.path.basename(args.input))[0]
+    write_tiles(dated_series(df, args.value), args.output_dir, name, args.decimals)
@@ -0,0 +1,249 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Compact in-memory time series for the cleaned SkyPulse series.
+#
+# A TimeSeries keeps its observation days as int32 days since 1970-01-01
+# and its values as float32, in one of three layouts:
+#   points  - one value per day: values[i] was observed on days[i]
+#   runs    - run-length encoded daily data: values[i] holds on each of
+#             lengths[i] consecutive days from days[i]. The cleaned
+#             temperature repeats every monthly anomaly on each day of the
+#             month, so its 53k daily rows are 1.7k runs (over 40x smaller
+#             than the DataFrame)
+#   multi   - several observations per day: values[offsets[i]:offsets[i + 1]]
+#             were all observed on days[i] (sea level has ~10 a day); daily()
+#             reduces them to one value per day explicitly
+# from_frame() picks the layout from the data. Like storage.py, values are
+# rounded back to `decimals` when converted to float64, so to_frame()
+# returns exactly the values that were encoded. The analytics and model
+# functions that take a cleaned series frame also take a TimeSeries (see
+# as_frame), and the pipeline hands the three series to them in this form.
+# save()/load() use the uncompressed Arrow IPC file format: load()
+# memory-maps the file and the arrays are read-only views into it, with
+# the multi layout stored as a list<float32> column whose offsets and
+# values are these arrays.
+
+LAYOUTS = ('points', 'runs', 'multi')
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+# Cleaned series -> (dataset, value column, decimals the values are published to)
+SERIES = {
+    'temperature': ('cleaned_temperature', 'Temperature', 2),
+    'co2': ('cleaned_co2', 'CO2', 2),
+    'sea_level': ('cleaned_sea_level', 'Sea Level', 2),
+}
+
+class TimeSeries:
+    """Observation days (int32 epoch days) and float32 values in the points, runs or multi layout"""
+
+    __slots__ = ('name', 'days', 'values', 'lengths', 'offsets', 'decimals')
+
+    def __init__(self, name, days, values, lengths=None, offsets=None, decimals=None):
+        if lengths is not None and offsets is not None:
+            raise ValueError("a TimeSeries has run lengths or observation offsets, not both")
+        self.name = name
+        self.days = np.asarray(days, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.lengths = None if lengths is None else np.asarray(lengths, dtype=np.int32)
+        self.offsets = None if offsets is None else np.asarray(offsets, dtype=np.int32)
+        self.decimals = decimals
+        if self.offsets is not None:
+            consistent = len(self.offsets) == len(self.days) + 1 and self.offsets[-1] == len(self.values)
+        else:
+            consistent = len(self.values) == len(self.days) and (self.lengths is None
+                                                                 or len(self.lengths) == len(self.days))
+        if not consistent:
+            raise ValueError(f"{self.layout} layout with mismatched array lengths")
+
+    @property
+    def layout(self):
+        if self.lengths is not None:
+            return 'runs'
+        return 'multi' if self.offsets is not None else 'points'
+
+    def __len__(self):
+        """Rows of the equivalent frame (days covered by runs, observations otherwise)"""
+        return int(self.lengths.sum()) if self.lengths is not None else len(self.values)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.days, self.values, self.lengths, self.offsets) if a is not None)
+
+    def __repr__(self):
+        return (f"TimeSeries({self.name!r}, {self.layout}, {len(self)} rows in {len(self.values)} values, "
+                f"{self.nbytes:,} bytes)")
+
+    # Encoding
+
+    @classmethod
+    def from_frame(cls, df, value_col, date_col='Date', decimals=None, layout=None):
+        """Encode df[date_col, value_col]; layout None picks multi, runs or points from the data.
+
+        Dates must be whole days. Rows are ordered by date (stable, so the
+        observations of a day keep their order).
+        """
+        dates = pd.DatetimeIndex(df[date_col]).to_numpy()
+        return cls.from_arrays(value_col, dates, df[value_col].to_numpy(), decimals, layout)
+
+    @classmethod
+    def from_series(cls, series, decimals=None, layout=None):
+        """Encode a Series indexed by date"""
+        return cls.from_arrays(series.name, pd.DatetimeIndex(series.index).to_numpy(), series.to_numpy(),
+                               decimals, layout)
+
+    @classmethod
+    def from_arrays(cls, name, dates, values, decimals=None, layout=None):
+        if layout is not None and layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}. Available: {LAYOUTS}")
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        days = dates.astype('datetime64[D]')
+        if (days != dates).any():
+            raise ValueError(f"{name}: dates must be whole days to encode")
+        days = (days - EPOCH).astype(np.int32)
+        values = np.asarray(values, dtype=np.float32)
+        if len(days) > 1 and (np.diff(days) < 0).any():
+            order = np.argsort(days, kind='stable')
+            days, values = days[order], values[order]
+
+        step = np.diff(days)
+        repeated = bool((step == 0).any())
+        if layout == 'multi' or (layout is None and repeated):
+            starts = np.flatnonzero(np.concatenate([[len(values) > 0], step != 0]))
+            return cls(name, days[starts], values, offsets=np.append(starts, len(values)), decimals=decimals)
+        if repeated:
+            raise ValueError(f"{name}: several observations on one day need the multi layout")
+
+        # A run continues while the next row is the next day with the same value
+        starts = np.flatnonzero(np.concatenate([[len(values) > 0], (step != 1) | (values[1:] != values[:-1])]))
+        lengths = np.diff(np.append(starts, len(values)))
+        # A run takes 12 bytes against 8 for a point: worth it from a third fewer values
+        if layout == 'runs' or (layout is None and len(starts) * 3 <= len(values) * 2):
+            return cls(name, days[starts], values[starts], lengths=lengths, decimals=decimals)
+        return cls(name, days, values, decimals=decimals)
+
+    # Decoding
+
+    def observation_days(self):
+        """int32 epoch day of every row"""
+        if self.lengths is not None:
+            ends = np.cumsum(self.lengths)
+            row_in_run = np.arange(ends[-1] if len(ends) else 0, dtype=np.int32) - np.repeat(ends - self.lengths,
+                                                                                               self.lengths)
+            return np.repeat(self.days, self.lengths) + row_in_run
+        if self.offsets is not None:
+            return np.repeat(self.days, np.diff(self.offsets))
+        return self.days
+
+    def dates(self):
+        """DatetimeIndex of every row"""
+        return pd.DatetimeIndex((self.observation_days() + EPOCH).astype('datetime64[ns]'), name='Date')
+
+    def _restore(self, values, float32):
+        # float32 values are returned as they are (a view for points and multi)
+        if float32:
+            return values
+        values = values.astype(np.float64)
+        return values if self.decimals is None else np.round(values, self.decimals)
+
+    def observation_values(self, float32=False):
+        """Value of every row: float64 rounded to `decimals`, or the stored float32"""
+        values = np.repeat(self.values, self.lengths) if self.lengths is not None else self.values
+        return self._restore(values, float32)
+
+    def to_frame(self, float32=False):
+        """(Date, <name>) frame of every row"""
+        return pd.DataFrame({'Date': self.dates(), self.name: self.observation_values(float32)})
+
+    def to_series(self, float32=False):
+        """Series of every row indexed by Date"""
+        return pd.Series(self.observation_values(float32), index=self.dates(), name=self.name, copy=False)
+
+    def daily(self, how='mean'):
+        """One value per day as a Series: several observations of a day are reduced with `how`
+        (mean, min, max, first, last or count); points and runs already have one per day.
+        """
+        if self.offsets is None:
+            return self.to_series()
+        dates = pd.DatetimeIndex((self.days + EPOCH).astype('datetime64[ns]'), name='Date')
+        counts = np.diff(self.offsets)
+        starts = self.offsets[:-1]
+        values = self._restore(self.values, False)
+        if how == 'count':
+            reduced = counts
+        elif how == 'first':
+            reduced = values[starts]
+        elif how == 'last':
+            reduced = values[self.offsets[1:] - 1]
+        elif how in ('mean', 'min', 'max'):
+            reduce = {'mean': np.add, 'min': np.minimum, 'max': np.maximum}[how]
+            reduced = reduce.reduceat(values, starts) if len(starts) else values[:0]
+            if how == 'mean':
+                reduced = reduced / counts
+        else:
+            raise ValueError(f"Unknown reduction {how!r}")
+        return pd.Series(reduced, index=dates, name=self.name)
+
+    # Serialization
+
+    def save(self, path):
+        """Write an uncompressed Arrow IPC file that load() memory-maps"""
+        import pyarrow as pa
+        columns = {'day': pa.array(self.days)}
+        if self.offsets is not None:
+            columns['value'] = pa.ListArray.from_arrays(pa.array(self.offsets), pa.array(self.values))
+        else:
+            columns['value'] = pa.array(self.values)
+        if self.lengths is not None:
+            columns['length'] = pa.array(self.lengths)
+        metadata = {'name': self.name, 'layout': self.layout,
+                    'decimals': '' if self.decimals is None else str(self.decimals)}
+        batch = pa.record_batch(list(columns.values()), names=list(columns), metadata=metadata)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with pa.OSFile(path + '.tmp', 'wb') as sink, pa.ipc.new_file(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        os.replace(path + '.tmp', path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """TimeSeries from save(): the arrays are read-only views of the memory-mapped file"""
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            batch = pa.ipc.open_file(source).get_batch(0)
+        metadata = {key.decode(): value.decode() for key, value in batch.schema.metadata.items()}
+        decimals = int(metadata['decimals']) if metadata['decimals'] else None
+        days = batch.column('day').to_numpy(zero_copy_only=True)
+        value = batch.column('value')
+        if metadata['layout'] == 'multi':
+            return cls(metadata['name'], days, value.values.to_numpy(zero_copy_only=True),
+                       offsets=value.offsets.to_numpy(zero_copy_only=True), decimals=decimals)
+        lengths = batch.column('length').to_numpy(zero_copy_only=True) if metadata['layout'] == 'runs' else None
+        return cls(metadata['name'], days, value.to_numpy(zero_copy_only=True), lengths=lengths, decimals=decimals)
+
+def as_frame(data):
+    """A cleaned series as its (Date, value) frame: frames pass through, TimeSeries are decoded"""
+    return data.to_frame() if isinstance(data, TimeSeries) else data
+
+def as_series(data, value_col):
+    """A cleaned series as a Series indexed by Date, from a frame or a TimeSeries"""
+    if isinstance(data, TimeSeries):
+        return data.to_series()
+    return data.set_index('Date')[value_col]
+
+if __name__ == "__main__":
+    from config import project_path
+    from storage import load_dataset
+
+    parser = argparse.ArgumentParser(description="Encode the cleaned series and compare their memory footprint")
+    parser.add_argument('--cleaned-dir', default=project_path('cleaned'))
+    args = parser.parse_args()
+
+    for dataset, column, decimals in SERIES.values():
+        df = load_dataset(args.cleaned_dir, dataset, columns=['Date', column])
+        series = TimeSeries.from_frame(df, column, decimals=decimals)
+        frame_bytes = df.memory_usage(deep=True).sum()
+        print(f"{series}: DataFrame {frame_bytes:,} bytes ({frame_bytes / series.nbytes:.0f}x), "
+              f"round trip exact: {series.to_frame().equals(df.astype({'Date': 'datetime64[ns]'}))}")